@@ -0,0 +1,129 @@
+"""
+Smoke-tests the Resolve bridge end to end, without Resolve: runs a BridgeServer on a
+free localhost port against the fake Resolve API in gvcr_resolve.fake, and checks that a
+ResolveBridgeClient can ping it, gets an error response (with the remote traceback) from
+a failing call, times out on a call that takes too long and then recovers, sees freshly
+reloaded gvcr_resolve submodules on each call, and reconnects transparently after the
+server is restarted on the same port. Also reports the round-trip time per ping. The
+server's own output (including the traceback for each failing call) is printed as-is.
+
+Usage: python -m bench.bridgesmoke [--num-pings 1000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import traceback
+
+import gvcr_resolve.fcpxml
+from gvcr_resolve.bridge import BridgeServer
+from gvcr_resolve.fake import FakeResolve, FakeApiStats
+from resolve_bridge import ResolveBridgeClient, ResolveBridgeError
+
+# Simulated latency of the API call that makes create_vhs_project slow enough to time out
+SLOW_METHOD_NAME = 'ProjectManager.ImportProject'
+SLOW_METHOD_LATENCY = 1.0
+CLIENT_TIMEOUT = 0.25
+
+
+def check(description: str, func) -> bool:
+    try:
+        func()
+    except Exception:
+        print('FAILED: %s' % description)
+        traceback.print_exc()
+        return False
+    print('ok: %s' % description)
+    return True
+
+
+def start_server(resolve: FakeResolve, port: int = 0) -> BridgeServer:
+    server = BridgeServer(resolve, '127.0.0.1', port)
+    server.start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m bench.bridgesmoke', description='smoke-tests the Resolve bridge against the fake Resolve API')
+    parser.add_argument('--num-pings', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        video_filepath = os.path.join(tempdir, 'smoke_raw.001.mkv')
+        open(video_filepath, 'wb').close()
+        videos = [{'path': video_filepath, 'cut_frames': []}]
+        stats = FakeApiStats(latency_by_method={SLOW_METHOD_NAME: SLOW_METHOD_LATENCY}, sleep=True)
+        resolve = FakeResolve(stats=stats)
+
+        server = start_server(resolve)
+        host, port = server.server_address[:2]
+        client = ResolveBridgeClient(host, port)
+        results = []
+
+        def ping():
+            result = client.call('ping', timeout=5.0)
+            assert result == 'pong', 'unexpected ping result: %r' % result
+        results.append(check('ping', ping))
+
+        def unknown_method():
+            try:
+                client.call('no_such_method', timeout=5.0)
+            except ResolveBridgeError as e:
+                assert 'unknown method' in str(e), str(e)
+            else:
+                raise AssertionError('call to unknown method succeeded')
+        results.append(check('error response for unknown method', unknown_method))
+
+        def failing_call():
+            try:
+                client.call('create_vhs_project', 'smoke', [], timeout=5.0)
+            except ResolveBridgeError as e:
+                assert 'RuntimeError' in str(e), str(e)
+                assert e.remote_traceback and 'create_vhs_project' in e.remote_traceback, e.remote_traceback
+            else:
+                raise AssertionError('create_vhs_project with no videos succeeded')
+        results.append(check('error response with traceback for failing call', failing_call))
+
+        def timeout_then_recover():
+            try:
+                client.call('create_vhs_project', 'smoke', videos, timeout=CLIENT_TIMEOUT)
+            except TimeoutError:
+                pass
+            else:
+                raise AssertionError('slow call finished within %.2fs' % CLIENT_TIMEOUT)
+            # The client hangs up after a timeout; our next call should reconnect, and a
+            # ping doesn't need to wait for the slow call to finish in the server
+            ping()
+            with server.call_lock:
+                pass
+        results.append(check('client timeout on slow call, then recovery', timeout_then_recover))
+
+        def reloads_submodules():
+            before = gvcr_resolve.fcpxml.write_timeline_fcpxml
+            try:
+                client.call('create_vhs_project', 'smoke', [], timeout=5.0)
+            except ResolveBridgeError:
+                pass
+            assert gvcr_resolve.fcpxml.write_timeline_fcpxml is not before, 'gvcr_resolve.fcpxml was not reloaded'
+        results.append(check('submodules reloaded on each call', reloads_submodules))
+
+        def reconnect_after_restart():
+            global server
+            server.stop()
+            server = start_server(resolve, port)
+            ping()
+        results.append(check('reconnect after server restart', reconnect_after_restart))
+
+        if args.num_pings > 0:
+            start = time.perf_counter()
+            for _ in range(args.num_pings):
+                client.call('ping', timeout=5.0)
+            elapsed = time.perf_counter() - start
+            print('%d pings: %.1fus per round trip' % (args.num_pings, elapsed / args.num_pings * 1e6))
+
+        client.close()
+        server.stop()
+
+    if not all(results):
+        sys.exit(1)
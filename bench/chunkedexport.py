@@ -0,0 +1,87 @@
+"""
+Exports the same clip from a video file both serially (one libx264 process) and in
+parallel chunks (as trim.py --chunks does), reporting how long each takes, and checks
+that the chunked export matches the serial one: the same number of video and audio
+packets, with each stream starting and ending within a frame of where it does in the
+serial export. Exits with a nonzero status if they don't match.
+
+Usage: python -m bench.chunkedexport <video-filepath> <in-timecode> <out-timecode> [--chunks 4] [--crf 10]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from decimal import Decimal
+
+from trim import get_keyframe_times, probe_stream_stats, trim_with_x264_reencode, trim_with_chunked_x264_reencode
+
+NTSC_DROP = Decimal('60000') / Decimal('1001')
+
+
+def compare_stream_stats(serial_filepath: str, chunked_filepath: str) -> list[str]:
+    # Return a description of each way in which the chunked export differs from the
+    # serial export, printing the stats for each stream along the way
+    frame_duration = Decimal(1) / NTSC_DROP
+    serial_stats = probe_stream_stats(serial_filepath)
+    chunked_stats = probe_stream_stats(chunked_filepath)
+    problems = []
+    print('%-8s %-8s %8s %12s %12s' % ('Stream', 'Export', 'Packets', 'Start', 'Duration'))
+    for codec_type in ('video', 'audio'):
+        for label, stats in (('serial', serial_stats), ('chunked', chunked_stats)):
+            if codec_type in stats:
+                num_packets, start, duration = stats[codec_type]
+                print('%-8s %-8s %8d %11.6fs %11.6fs' % (codec_type, label, num_packets, start, duration))
+        if (codec_type in serial_stats) != (codec_type in chunked_stats):
+            problems.append('%s stream is only present in one export' % codec_type)
+            continue
+        if codec_type not in serial_stats:
+            continue
+        serial_packets, serial_start, serial_duration = serial_stats[codec_type]
+        chunked_packets, chunked_start, chunked_duration = chunked_stats[codec_type]
+        if serial_packets != chunked_packets:
+            problems.append('%s has %d packets in chunked export; %d in serial export' % (codec_type, chunked_packets, serial_packets))
+        if abs(chunked_start - serial_start) > frame_duration:
+            problems.append('%s starts at %.6fs in chunked export; %.6fs in serial export' % (codec_type, chunked_start, serial_start))
+        if abs((chunked_start + chunked_duration) - (serial_start + serial_duration)) > frame_duration:
+            problems.append('%s ends at %.6fs in chunked export; %.6fs in serial export' % (codec_type, chunked_start + chunked_duration, serial_start + serial_duration))
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m bench.chunkedexport', description='benchmarks chunked parallel encoding of a clip against a serial encode, and checks that their streams match')
+    parser.add_argument('video_filepath')
+    parser.add_argument('in_timecode')
+    parser.add_argument('out_timecode')
+    parser.add_argument('--chunks', type=int, default=4)
+    parser.add_argument('--crf', type=int, default=10)
+    args = parser.parse_args()
+
+    num_cpus = os.cpu_count() or 1
+    keyframe_times = get_keyframe_times(args.video_filepath)
+    with tempfile.TemporaryDirectory() as tempdir:
+        serial_filepath = os.path.join(tempdir, 'serial.mp4')
+        chunked_filepath = os.path.join(tempdir, 'chunked.mp4')
+
+        print('Encoding serially...')
+        start = time.perf_counter()
+        trim_with_x264_reencode(args.video_filepath, serial_filepath, args.in_timecode, args.out_timecode, args.crf, num_cpus, lambda _: None)
+        serial_elapsed = time.perf_counter() - start
+
+        print('Encoding in %d chunks...' % args.chunks)
+        start = time.perf_counter()
+        trim_with_chunked_x264_reencode(args.video_filepath, chunked_filepath, args.in_timecode, args.out_timecode, keyframe_times, args.crf, args.chunks, max(1, num_cpus // args.chunks), lambda _: None)
+        chunked_elapsed = time.perf_counter() - start
+
+        print()
+        print('Serial:  %8.2fs' % serial_elapsed)
+        print('Chunked: %8.2fs (%.2fx)' % (chunked_elapsed, serial_elapsed / chunked_elapsed if chunked_elapsed > 0 else float('inf')))
+        print()
+        problems = compare_stream_stats(serial_filepath, chunked_filepath)
+
+    print()
+    if problems:
+        for problem in problems:
+            print('MISMATCH: %s' % problem)
+        sys.exit(1)
+    print('Chunked export matches serial export.')
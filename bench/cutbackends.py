@@ -0,0 +1,61 @@
+"""
+Compares the NumPy frame-difference backend against ffmpeg's scene filter on the same
+video file, reporting how long each takes and how closely their cuts agree.
+
+Usage: python -m bench.cutbackends <video-filepath> [--threshold 0.2]
+"""
+import os
+import time
+import argparse
+
+from edit import detect_cut_times
+from vidlib import NTSC_DROP
+from vidlib.framediff import detect_cut_frames, DEFAULT_WIDTH, DEFAULT_HEIGHT
+
+
+def compare_cut_frames(reference: list[int], candidate: list[int], tolerance: int = 1) -> tuple[int, list[int], list[int]]:
+    """
+    Matches each candidate cut to a reference cut within tolerance frames, returning
+    (num_matched, missed_reference_frames, extra_candidate_frames).
+    """
+    unmatched = list(candidate)
+    missed: list[int] = []
+    num_matched = 0
+    for frame in reference:
+        match = next((c for c in unmatched if abs(c - frame) <= tolerance), None)
+        if match is None:
+            missed.append(frame)
+        else:
+            unmatched.remove(match)
+            num_matched += 1
+    return num_matched, missed, unmatched
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m bench.cutbackends', description='benchmarks cut detection with ffmpeg showinfo scraping vs. NumPy frame differencing')
+    parser.add_argument('video_filepath')
+    parser.add_argument('--threshold', '-t', type=float, default=0.2)
+    parser.add_argument('--width', type=int, default=DEFAULT_WIDTH)
+    parser.add_argument('--height', type=int, default=DEFAULT_HEIGHT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cut_times = detect_cut_times(args.video_filepath, args.threshold, lambda *_: None)
+    ffmpeg_elapsed = time.perf_counter() - start
+    ffmpeg_frames = sorted(set(round(t * NTSC_DROP) for t in cut_times))
+
+    start = time.perf_counter()
+    numpy_frames = detect_cut_frames(args.video_filepath, args.threshold, args.width, args.height)
+    numpy_elapsed = time.perf_counter() - start
+
+    num_matched, missed, extra = compare_cut_frames(ffmpeg_frames, numpy_frames)
+    print()
+    print('File: %s' % os.path.basename(args.video_filepath))
+    print('ffmpeg scene filter:   %8.2fs, %d cuts' % (ffmpeg_elapsed, len(ffmpeg_frames)))
+    print('numpy frame diff (%dx%d): %8.2fs, %d cuts' % (args.width, args.height, numpy_elapsed, len(numpy_frames)))
+    print('Speedup: %.2fx' % (ffmpeg_elapsed / numpy_elapsed if numpy_elapsed > 0 else float('inf')))
+    print('Agreement at threshold %.3f (within 1 frame): %d matched, %d missed, %d extra' % (args.threshold, num_matched, len(missed), len(extra)))
+    if missed:
+        print('  Missed: %s' % ', '.join(str(f) for f in missed))
+    if extra:
+        print('  Extra:  %s' % ', '.join(str(f) for f in extra))
@@ -0,0 +1,65 @@
+"""
+Compares fast cut detection (decimated, low-resolution scoring with full-rate
+refinement) against scoring every frame at full resolution, reporting the throughput
+gain and any cuts that fast mode misses or adds. Since fast mode is an alternative to
+edit.py's default cut detection, it's also compared against ffmpeg's scene filter at
+the same threshold.
+
+Usage: python -m bench.fastdetect <video-filepath> [--threshold 0.2] [--decimate 2]
+"""
+import os
+import time
+import argparse
+
+import numpy as np
+
+from bench.cutbackends import compare_cut_frames
+from edit import detect_cut_times
+from vidlib import NTSC_DROP
+from vidlib.framediff import compute_frame_diff_scores, detect_cut_frames_fast, CAPTURE_WIDTH, CAPTURE_HEIGHT, FAST_WIDTH, FAST_HEIGHT, FAST_DECIMATE
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m bench.fastdetect', description='benchmarks fast cut detection against full-resolution cut detection')
+    parser.add_argument('video_filepath')
+    parser.add_argument('--threshold', '-t', type=float, default=0.2)
+    parser.add_argument('--decimate', '-d', type=int, default=FAST_DECIMATE)
+    parser.add_argument('--width', type=int, default=FAST_WIDTH)
+    parser.add_argument('--height', type=int, default=FAST_HEIGHT)
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print('Scoring every frame at %dx%d...' % (CAPTURE_WIDTH, CAPTURE_HEIGHT))
+    start = time.perf_counter()
+    scores = compute_frame_diff_scores(args.video_filepath, CAPTURE_WIDTH, CAPTURE_HEIGHT, batch_size=16)
+    full_elapsed = time.perf_counter() - start
+    full_frames = [int(f) for f in np.flatnonzero(scores > np.float32(args.threshold))]
+    num_frames = len(scores)
+
+    print('Running ffmpeg scene detection...')
+    start = time.perf_counter()
+    cut_times = detect_cut_times(args.video_filepath, args.threshold, lambda *_: None)
+    ffmpeg_elapsed = time.perf_counter() - start
+    ffmpeg_frames = sorted(set(round(t * NTSC_DROP) for t in cut_times))
+
+    print('Scoring every %d frame(s) at %dx%d, then refining...' % (args.decimate, args.width, args.height))
+    start = time.perf_counter()
+    fast_frames = detect_cut_frames_fast(args.video_filepath, args.threshold, args.decimate, args.width, args.height, jobs=args.jobs)
+    fast_elapsed = time.perf_counter() - start
+
+    print()
+    print('File: %s (%d frames), threshold %.3f' % (os.path.basename(args.video_filepath), num_frames, args.threshold))
+    print('Full resolution: %8.2fs (%7.1f fps), %d cuts' % (full_elapsed, num_frames / full_elapsed, len(full_frames)))
+    print('ffmpeg scene:    %8.2fs (%7.1f fps), %d cuts' % (ffmpeg_elapsed, num_frames / ffmpeg_elapsed, len(ffmpeg_frames)))
+    print('Fast mode:       %8.2fs (%7.1f fps), %d cuts' % (fast_elapsed, num_frames / fast_elapsed, len(fast_frames)))
+    print('Throughput gain: %.2fx vs. full resolution, %.2fx vs. ffmpeg' % (
+        full_elapsed / fast_elapsed if fast_elapsed > 0 else float('inf'),
+        ffmpeg_elapsed / fast_elapsed if fast_elapsed > 0 else float('inf'),
+    ))
+    for label, reference, tolerance in (('full resolution, exact frame', full_frames, 0), ('ffmpeg, within 1 frame', ffmpeg_frames, 1)):
+        num_matched, missed, extra = compare_cut_frames(reference, fast_frames, tolerance)
+        print('Agreement with %s: %d matched, %d missed, %d extra' % (label, num_matched, len(missed), len(extra)))
+        if missed:
+            print('  Missed: %s' % ', '.join(str(f) for f in missed))
+        if extra:
+            print('  Extra:  %s' % ', '.join(str(f) for f in extra))
@@ -0,0 +1,96 @@
+"""
+Measures how PNG frame reading and writing through imglib.frameio scales with the
+number of worker threads, on a synthetic sequence of RGBA frames shaped like a rendered
+emote (an anti-aliased subject moving across an otherwise transparent frame). Compares
+each worker count against a plain serial loop of cv2.imread / cv2.imwrite calls, and
+checks that every frame reads back exactly as written.
+
+Usage: python -m bench.frameio [--num-frames 120] [--width 1920] [--height 1080] [--max-workers 8]
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+from imglib.frameio import DEFAULT_NUM_WORKERS, FrameWriter, read_frames
+
+
+def make_synthetic_frames(num_frames: int, width: int, height: int) -> list[np.ndarray]:
+    # Draw a noisy, gradient-filled ellipse with soft edges that moves from left to right
+    rng = np.random.default_rng(0)
+    ys, xs = np.mgrid[0:height, 0:width]
+    frames = []
+    for i in range(num_frames):
+        cx = width * (0.25 + 0.5 * i / max(1, num_frames - 1))
+        cy = height * 0.5
+        d = np.sqrt(((xs - cx) / (width * 0.2)) ** 2 + ((ys - cy) / (height * 0.35)) ** 2)
+        alpha = np.clip((1.0 - d) * 8.0, 0.0, 1.0)
+        im = np.zeros((height, width, 4), np.uint8)
+        im[:,:,0] = (xs * 255 // width).astype(np.uint8)
+        im[:,:,1] = (ys * 255 // height).astype(np.uint8)
+        im[:,:,2] = rng.integers(96, 160, (height, width), dtype=np.uint8)
+        im[:,:,3] = (alpha * 255.0).astype(np.uint8)
+        im[:,:,:3] = (im[:,:,:3] * alpha[:,:,np.newaxis]).astype(np.uint8)
+        frames.append(im)
+    return frames
+
+
+def time_serial(dirpath: str, frames: list[np.ndarray]) -> tuple[float, float]:
+    filepaths = [os.path.join(dirpath, 'frame%04d.png' % i) for i in range(len(frames))]
+    start = time.perf_counter()
+    for filepath, im in zip(filepaths, frames):
+        cv2.imwrite(filepath, im)
+    write_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for filepath in filepaths:
+        cv2.imread(filepath, cv2.IMREAD_UNCHANGED)
+    read_elapsed = time.perf_counter() - start
+    return write_elapsed, read_elapsed
+
+
+def time_frameio(dirpath: str, frames: list[np.ndarray], num_workers: int) -> tuple[float, float, bool]:
+    filepaths = [os.path.join(dirpath, 'frame%04d.png' % i) for i in range(len(frames))]
+    start = time.perf_counter()
+    with FrameWriter(num_workers) as writer:
+        for filepath, im in zip(filepaths, frames):
+            writer.write(filepath, im)
+    write_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matches = True
+    for im, expected in zip(read_frames(filepaths, num_workers), frames):
+        matches = matches and np.array_equal(im, expected)
+    read_elapsed = time.perf_counter() - start
+    return write_elapsed, read_elapsed, matches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m bench.frameio', description='measures threaded PNG frame I/O throughput at various worker counts')
+    parser.add_argument('--num-frames', type=int, default=120)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_NUM_WORKERS)
+    args = parser.parse_args()
+
+    print('Generating %d synthetic %dx%d RGBA frames...' % (args.num_frames, args.width, args.height))
+    frames = make_synthetic_frames(args.num_frames, args.width, args.height)
+
+    worker_counts = []
+    num_workers = 1
+    while num_workers < args.max_workers:
+        worker_counts.append(num_workers)
+        num_workers *= 2
+    worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        serial_write, serial_read = time_serial(tempdir, frames)
+        print()
+        print('%-8s %10s %10s %10s %10s %8s' % ('Workers', 'Write fps', 'Speedup', 'Read fps', 'Speedup', 'Exact'))
+        print('%-8s %10.1f %10s %10.1f %10s %8s' % ('serial', len(frames) / serial_write, '1.00x', len(frames) / serial_read, '1.00x', ''))
+        for num_workers in worker_counts:
+            write_elapsed, read_elapsed, matches = time_frameio(tempdir, frames, num_workers)
+            print('%-8d %10.1f %9.2fx %10.1f %9.2fx %8s' % (num_workers, len(frames) / write_elapsed, serial_write / write_elapsed, len(frames) / read_elapsed, serial_read / read_elapsed, 'yes' if matches else 'NO'))
@@ -0,0 +1,103 @@
+"""
+Checks the source in and out timecodes that get_vhs_project_data (used by trim.py)
+reports for a known timeline in the fake Resolve API in gvcr_resolve.fake, both against
+hand-computed expected values and against what Resolve's CSV export of the same timeline
+says, which is where we used to read them from. The timeline's segments are cut from two
+raw files, at offsets chosen to exercise each field of the timecode (frames, seconds,
+minutes, and hours), including the boundaries where each one rolls over. Exits with a
+nonzero status if any timecode doesn't match.
+
+Usage: python -m bench.projectdata
+"""
+import io
+import os
+import csv
+import sys
+import tempfile
+import contextlib
+
+import gvcr_resolve
+from gvcr_resolve.fake import FakeResolve, FakeTimelineItem
+
+# Number of frames in each fake raw video file (just over two hours at 60 fps)
+RAW_FILE_FRAMES = 60 * 60 * 60 * 2 + 600
+
+# (raw file index, left offset, duration, expected in timecode, expected out timecode)
+SEGMENTS = [
+    (0, 0, 1, '00:00:00:00', '00:00:00:01'),
+    (0, 59, 1, '00:00:00:59', '00:00:01:00'),
+    (0, 60, 3540, '00:00:01:00', '00:01:00:00'),
+    (0, 3599, 61, '00:00:59:59', '00:01:01:00'),
+    (1, 215999, 1, '00:59:59:59', '01:00:00:00'),
+    (1, 216000, 1234, '01:00:00:00', '01:00:20:34'),
+    (1, 431999, 601, '01:59:59:59', '02:00:10:00'),
+]
+
+
+def build_timeline(dirpath: str) -> FakeResolve:
+    # Create a project from two raw files, then replace its clips with our named
+    # segments, as we'd do by hand while editing
+    paths = []
+    for i in range(2):
+        path = os.path.join(dirpath, 'check_raw.%03d.mkv' % (i + 1))
+        open(path, 'wb').close()
+        paths.append(path)
+    resolve = FakeResolve({path: RAW_FILE_FRAMES for path in paths})
+    with contextlib.redirect_stdout(io.StringIO()):
+        gvcr_resolve.create_vhs_project(resolve, 'check', [{'path': path, 'cut_frames': []} for path in paths])
+    timeline = resolve.project_manager.current_project.current_timeline
+    raw_items = timeline.tracks['video'][0]
+    segments = []
+    record_frame = raw_items[0].start
+    for i, (file_index, left_offset, duration, _, _) in enumerate(SEGMENTS):
+        segment = FakeTimelineItem(raw_items[file_index].media_pool_item, 'video', record_frame, left_offset, duration)
+        segment.name = 'segment-%02d' % (i + 1)
+        segments.append(segment)
+        record_frame += duration
+    timeline.tracks['video'][0] = segments
+    return resolve
+
+
+def read_csv_timecodes(resolve: FakeResolve, dirpath: str) -> list[tuple[str, str, str]]:
+    # Export the current timeline to CSV and return (name, source in, source out) for
+    # each clip in track V1
+    timeline = resolve.GetProjectManager().GetCurrentProject().GetCurrentTimeline()
+    csv_filepath = os.path.join(dirpath, 'check.csv')
+    assert timeline.Export(csv_filepath, resolve.EXPORT_TEXT_CSV)
+    with open(csv_filepath, 'r') as fp:
+        return [(row['Name'], row['Source In'], row['Source Out']) for row in csv.DictReader(fp) if row['V'] == 'V1']
+
+
+if __name__ == '__main__':
+    problems = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        resolve = build_timeline(tempdir)
+        data = gvcr_resolve.get_vhs_project_data(resolve)
+        csv_clips = read_csv_timecodes(resolve, tempdir)
+
+    clips = data['clips']
+    if len(clips) != len(SEGMENTS):
+        problems.append('got %d clips; expected %d' % (len(clips), len(SEGMENTS)))
+    if len(csv_clips) != len(SEGMENTS):
+        problems.append('got %d clips in CSV export; expected %d' % (len(csv_clips), len(SEGMENTS)))
+
+    print('%-12s %-11s %-11s %-11s %-11s' % ('Clip', 'In', 'Out', 'CSV In', 'CSV Out'))
+    for i, (segment, clip, csv_clip) in enumerate(zip(SEGMENTS, clips, csv_clips)):
+        _, _, _, expected_in, expected_out = segment
+        csv_name, csv_in, csv_out = csv_clip
+        name = 'segment-%02d' % (i + 1)
+        print('%-12s %-11s %-11s %-11s %-11s' % (name, clip['in_timecode'], clip['out_timecode'], csv_in, csv_out))
+        if not clip['dst_filename'].endswith('_%s.mp4' % csv_name):
+            problems.append('%s is named %s; CSV export has %s' % (name, clip['dst_filename'], csv_name))
+        for label, value, expected, csv_value in (('in', clip['in_timecode'], expected_in, csv_in), ('out', clip['out_timecode'], expected_out, csv_out)):
+            if value != expected:
+                problems.append('%s has %s timecode %s; expected %s' % (name, label, value, expected))
+            if value != csv_value:
+                problems.append('%s has %s timecode %s; CSV export has %s' % (name, label, value, csv_value))
+
+    print()
+    if problems:
+        for problem in problems:
+            print('MISMATCH: %s' % problem)
+        sys.exit(1)
+    print('All timecodes match.')
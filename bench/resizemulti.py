@@ -0,0 +1,92 @@
+"""
+Compares resizing a directory of cropped emote frames to every emote size with one
+resize_frames call per size (decoding every frame once per size) against a single
+resize_frames_multi call (decoding every frame once), both resizing each size directly
+and as a cascade from the next size up. Reports the time taken by each, and how much
+each output differs, pixel by pixel, from the per-size output.
+
+Usage: python -m bench.resizemulti [--num-frames 120] [--width 1200] [--height 900] [--align middle]
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+from bench.frameio import make_synthetic_frames
+from imglib import Align
+from imglib.frameio import FrameWriter, read_frames
+from imglib.frameresize import resize_frames, resize_frames_multi
+
+SIZES = [128, 112, 56, 28]
+
+
+def diff_outputs(expected_dirpath: str, actual_dirpath: str) -> tuple[int, float, float]:
+    # Return the largest absolute difference in any channel of any pixel, the mean
+    # absolute difference, and the fraction of pixels that differ at all
+    filenames = sorted(os.listdir(expected_dirpath))
+    assert filenames == sorted(os.listdir(actual_dirpath))
+    max_diff = 0
+    total_diff = 0
+    num_values = 0
+    num_differing_pixels = 0
+    num_pixels = 0
+    expected_frames = read_frames([os.path.join(expected_dirpath, f) for f in filenames])
+    actual_frames = read_frames([os.path.join(actual_dirpath, f) for f in filenames])
+    for expected, actual in zip(expected_frames, actual_frames):
+        assert expected.shape == actual.shape
+        diff = cv2.absdiff(expected, actual)
+        max_diff = max(max_diff, int(diff.max()))
+        total_diff += int(diff.sum(dtype=np.uint64))
+        num_values += diff.size
+        num_differing_pixels += int(np.count_nonzero(diff.any(axis=2)))
+        num_pixels += diff.shape[0] * diff.shape[1]
+    return max_diff, total_diff / num_values, num_differing_pixels / num_pixels
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m bench.resizemulti', description='benchmarks resizing cropped frames to every emote size in a single pass')
+    parser.add_argument('--num-frames', type=int, default=120)
+    parser.add_argument('--width', type=int, default=1200)
+    parser.add_argument('--height', type=int, default=900)
+    parser.add_argument('--align', choices=Align.choices, default='middle')
+    parser.add_argument('--workers', '-j', type=int, default=None)
+    args = parser.parse_args()
+    align = Align.parse(args.align)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        print('Writing %d synthetic %dx%d cropped frames...' % (args.num_frames, args.width, args.height))
+        crop_dirpath = os.path.join(tempdir, 'crop')
+        os.makedirs(crop_dirpath)
+        with FrameWriter(args.workers) as writer:
+            for i, im in enumerate(make_synthetic_frames(args.num_frames, args.width, args.height)):
+                writer.write(os.path.join(crop_dirpath, 'bench.%04d.png' % i), im)
+
+        def get_output_dirpaths(name: str) -> dict[int, str]:
+            return {size: os.path.join(tempdir, name, str(size)) for size in SIZES}
+
+        start = time.perf_counter()
+        for size, output_dirpath in get_output_dirpaths('per_size').items():
+            resize_frames(crop_dirpath, output_dirpath, size, align, args.workers)
+        per_size_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        resize_frames_multi(crop_dirpath, get_output_dirpaths('multi'), align, False, args.workers)
+        multi_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        resize_frames_multi(crop_dirpath, get_output_dirpaths('cascade'), align, True, args.workers)
+        cascade_elapsed = time.perf_counter() - start
+
+        print()
+        print('Per size:        %7.2fs' % per_size_elapsed)
+        print('Multi:           %7.2fs (%.2fx)' % (multi_elapsed, per_size_elapsed / multi_elapsed))
+        print('Multi, cascaded: %7.2fs (%.2fx)' % (cascade_elapsed, per_size_elapsed / cascade_elapsed))
+        print()
+        print('%-16s %6s %9s %10s %12s' % ('Output', 'Size', 'Max diff', 'Mean diff', '% differing'))
+        for name in ('multi', 'cascade'):
+            for size in SIZES:
+                max_diff, mean_diff, fraction_differing = diff_outputs(get_output_dirpaths('per_size')[size], get_output_dirpaths(name)[size])
+                print('%-16s %6d %9d %10.4f %11.2f%%' % (name, size, max_diff, mean_diff, fraction_differing * 100.0))
@@ -0,0 +1,129 @@
+"""
+Runs our Resolve scripts against the fake Resolve API in gvcr_resolve.fake, reporting
+how many scripting API calls each one makes and how long those calls would take at a
+given latency per call, for tapes with a range of segment and marker counts:
+
+- create_vhs_project: each segment is a raw video file, with the markers spread evenly
+  across them (as cut markers), comparing bulk FCPXML import against appending each
+  clip and adding each marker individually
+- get_vhs_project_data (used by trim.py): each segment is a named clip in the edited
+  timeline, cut from raw files of 10 segments each
+- create_shorts_project: each marker is a tape marker on the shorts timeline
+
+Usage: python -m bench.resolvecalls [--latency-ms 5] [--method-latency-ms Timeline.Export=500]
+"""
+import io
+import os
+import time
+import argparse
+import tempfile
+import contextlib
+
+import gvcr_resolve
+from gvcr_resolve.fake import FakeResolve, FakeApiStats, FakeTimelineItem
+
+SEGMENT_COUNTS = [1, 5, 10, 25, 50]
+MARKER_COUNTS = [0, 100, 500, 2000]
+
+# Number of frames in each fake raw video file, and in each segment cut from one
+RAW_FILE_FRAMES = 60 * 60 * 60
+SEGMENTS_PER_RAW_FILE = 10
+
+
+def make_raw_files(dirpath: str, num_files: int, prefix: str) -> list[str]:
+    paths = []
+    for i in range(num_files):
+        path = os.path.join(dirpath, '%s_raw.%03d.mkv' % (prefix, i + 1))
+        open(path, 'wb').close()
+        paths.append(path)
+    return paths
+
+
+def run_quietly(stats: FakeApiStats, func, *args) -> tuple[int, float, float]:
+    # Run the given function with its output suppressed, returning the number of API
+    # calls it made, how long those calls would take, and how long it actually took
+    stats.reset()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+    return stats.num_calls, stats.simulated_seconds, time.perf_counter() - start
+
+
+def bench_create_vhs_project(dirpath: str, stats: FakeApiStats, num_segments: int, num_markers: int, bulk_import: bool) -> tuple[int, float, float]:
+    paths = make_raw_files(dirpath, num_segments, 'create')
+    videos = []
+    for i, path in enumerate(paths):
+        num_video_markers = num_markers // num_segments + (1 if i < num_markers % num_segments else 0)
+        step = RAW_FILE_FRAMES // (num_video_markers + 1)
+        videos.append({'path': path, 'cut_frames': [step * (j + 1) for j in range(num_video_markers)]})
+    resolve = FakeResolve({path: RAW_FILE_FRAMES for path in paths}, stats)
+    return run_quietly(stats, gvcr_resolve.create_vhs_project, resolve, 'bench', videos, bulk_import)
+
+
+def bench_get_vhs_project_data(dirpath: str, stats: FakeApiStats, num_segments: int) -> tuple[int, float, float]:
+    # Build a timeline with one clip per raw file, then split those clips up into named
+    # segments, as we'd do by hand while editing
+    num_files = (num_segments + SEGMENTS_PER_RAW_FILE - 1) // SEGMENTS_PER_RAW_FILE
+    paths = make_raw_files(dirpath, num_files, 'export')
+    resolve = FakeResolve({path: RAW_FILE_FRAMES for path in paths}, stats)
+    with contextlib.redirect_stdout(io.StringIO()):
+        gvcr_resolve.create_vhs_project(resolve, 'bench', [{'path': path, 'cut_frames': []} for path in paths])
+    timeline = resolve.project_manager.current_project.current_timeline
+    raw_items = timeline.tracks['video'][0]
+    segments = []
+    segment_frames = RAW_FILE_FRAMES // SEGMENTS_PER_RAW_FILE
+    record_frame = raw_items[0].start
+    for i in range(num_segments):
+        raw_item = raw_items[i // SEGMENTS_PER_RAW_FILE]
+        left_offset = (i % SEGMENTS_PER_RAW_FILE) * segment_frames
+        segment = FakeTimelineItem(raw_item.media_pool_item, 'video', record_frame, left_offset, segment_frames)
+        segment.name = 'segment-%02d' % (i + 1)
+        segments.append(segment)
+        record_frame += segment_frames
+    timeline.tracks['video'][0] = segments
+    return run_quietly(stats, gvcr_resolve.get_vhs_project_data, resolve)
+
+
+def bench_create_shorts_project(dirpath: str, stats: FakeApiStats, num_markers: int) -> tuple[int, float, float]:
+    mkv_filepath = os.path.join(dirpath, 'gvcr_broadcast_1.mkv')
+    open(mkv_filepath, 'wb').close()
+    resolve = FakeResolve({mkv_filepath: RAW_FILE_FRAMES}, stats)
+    markers = [(i * 600, 'Tape %d' % (i + 1)) for i in range(num_markers)]
+    return run_quietly(stats, gvcr_resolve.create_shorts_project, resolve, mkv_filepath, markers)
+
+
+def parse_method_latency(value: str) -> tuple[str, float]:
+    name, _, ms = value.partition('=')
+    if not name or not ms:
+        raise argparse.ArgumentTypeError('expected <Class>.<Method>=<ms>, e.g. Timeline.Export=500')
+    return name, float(ms) / 1000.0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m bench.resolvecalls', description='reports scripting API call counts and simulated latency for our Resolve scripts')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated latency of each API call, in milliseconds')
+    parser.add_argument('--method-latency-ms', type=parse_method_latency, action='append', default=[], metavar='CLASS.METHOD=MS', help='override the latency of a particular method; may be repeated')
+    args = parser.parse_args()
+
+    stats = FakeApiStats(latency=args.latency_ms / 1000.0, latency_by_method=dict(args.method_latency_ms))
+    rows = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        def run(label, mode, num_segments, num_markers, func, *func_args):
+            with tempfile.TemporaryDirectory(dir=tempdir) as dirpath:
+                num_calls, simulated_seconds, real_seconds = func(dirpath, stats, *func_args)
+            rows.append((label, mode, num_segments, num_markers, num_calls, simulated_seconds, real_seconds))
+
+        for num_segments in SEGMENT_COUNTS:
+            for num_markers in MARKER_COUNTS:
+                run('create_vhs_project', 'bulk', num_segments, num_markers, bench_create_vhs_project, num_segments, num_markers, True)
+                run('create_vhs_project', 'append', num_segments, num_markers, bench_create_vhs_project, num_segments, num_markers, False)
+        for num_segments in SEGMENT_COUNTS:
+            run('get_vhs_project_data', '', num_segments, 0, bench_get_vhs_project_data, num_segments)
+        for num_markers in MARKER_COUNTS:
+            run('create_shorts_project', 'bulk', 1, num_markers, bench_create_shorts_project, num_markers)
+
+    print('Simulated latency: %.1f ms per call%s' % (args.latency_ms, ''.join(', %s: %.1f ms' % (name, seconds * 1000.0) for name, seconds in args.method_latency_ms)))
+    print()
+    print('%-22s %-6s %8s %8s %8s %12s %10s' % ('Function', 'Mode', 'Segments', 'Markers', 'Calls', 'Simulated s', 'Real s'))
+    for label, mode, num_segments, num_markers, num_calls, simulated_seconds, real_seconds in rows:
+        print('%-22s %-6s %8d %8d %8d %12.2f %10.3f' % (label, mode, num_segments, num_markers, num_calls, simulated_seconds, real_seconds))
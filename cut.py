@@ -1,9 +1,13 @@
 import os
 import re
 import sys
+import time
 import argparse
 
-CAPTURE_FILENAME_REGEX = re.compile('\d{4}-\d{2}-\d{2} \d{2}-\d{2}-\d{2}\.mkv', re.IGNORECASE)
+from vidlib import move_with_sidecars
+from vidlib.scenecache import get_scene_partial_path, is_scene_analysis_in_progress
+
+CAPTURE_FILENAME_REGEX = re.compile('\d{4}-\d{2}-\d{2} \d{2}-\d{2}-\d{2}\.mkv$', re.IGNORECASE)
 
 
 if __name__ == '__main__':
@@ -21,6 +25,16 @@ if __name__ == '__main__':
         print('ERROR: No input files in capture directory; unable to cut recording to %s' % dst_dirpath)
         sys.exit(1)
 
+    # If watch.py is still analyzing any of our recordings, moving them would pull them
+    # out from under it (or fail outright while ffmpeg has them open), so wait for it to
+    # finish and cache its results
+    for src_filename in sorted(src_filenames):
+        src_filepath = os.path.join('capture', src_filename)
+        if is_scene_analysis_in_progress(src_filepath):
+            print('Waiting for watch.py to finish analyzing %s (press Ctrl+C to abort; if watch.py is not running, delete %s)...' % (src_filepath, get_scene_partial_path(src_filepath)))
+            while is_scene_analysis_in_progress(src_filepath):
+                time.sleep(1.0)
+
     os.mkdir(dst_dirpath)
 
     print('Cutting %s...' % args.tape_id)
@@ -34,6 +48,6 @@ if __name__ == '__main__':
     
     for src_filepath, dst_filepath in move_operations:
         print('%s --> %s' % (src_filepath, dst_filepath))
-        os.rename(src_filepath, dst_filepath)
+        move_with_sidecars(src_filepath, dst_filepath)
     
     print('Cut new recording to %s from %d captured video files.' % (dst_dirpath, len(src_filenames)))
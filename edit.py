@@ -3,17 +3,90 @@ import io
 import re
 import sys
 import subprocess
+import time
 import argparse
+import threading
 from decimal import Decimal
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from typing import Callable, Iterator, TypeVar
 
-from resolve_exec import resolve_exec
+from resolve_bridge import call_resolve
+from vidlib import NTSC_DROP
+from vidlib.scenecache import get_scene_cache_path, read_scene_scores, write_scene_scores, build_scene_score_array, find_cut_frames
+from vidlib.framediff import compute_frame_diff_scores, detect_cut_frames_fast, FAST_DECIMATE, DEFAULT_WIDTH as FRAME_DIFF_WIDTH, DEFAULT_HEIGHT as FRAME_DIFF_HEIGHT
+
+# Identifies the analysis used to produce cached scene scores: if we ever change how
+# scores are computed, changing this value will invalidate all existing caches
+SCENE_SCORE_PARAMS_BY_BACKEND = {
+    'ffmpeg': "ffmpeg:select='gte(scene,0)'",
+    'numpy': 'numpy:framediff-pct:gray:%dx%d' % (FRAME_DIFF_WIDTH, FRAME_DIFF_HEIGHT),
+}
+
+T = TypeVar('T')
+
+
+# Parameters for the detectors that run alongside cut detection in analyze_video
+BLACK_MIN_DURATION = 0.5
+BLACK_PIXEL_THRESHOLD = 0.10
+FREEZE_NOISE = '-60dB'
+FREEZE_MIN_DURATION = 2.0
+SILENCE_NOISE = '-50dB'
+SILENCE_MIN_DURATION = 2.0
+
+
+@dataclass
+class VideoMarker:
+    kind: str
+    frame: int
+    duration: int
 
 
 @dataclass
 class InputVideoFile:
     path: str
     cut_frames: list[int]
+    markers: list[VideoMarker] = field(default_factory=list)
+
+
+@dataclass
+class AnalysisInterval:
+    kind: str
+    start: Decimal
+    end: Decimal | None
+
+    def to_marker(self, video_duration_seconds: Decimal | None = None) -> VideoMarker:
+        end = self.end if self.end is not None else video_duration_seconds
+        start_frame = round(self.start * NTSC_DROP)
+        end_frame = round(end * NTSC_DROP) if end is not None else start_frame + 1
+        return VideoMarker(kind=self.kind, frame=start_frame, duration=max(1, end_frame - start_frame))
+
+
+def place_interval_markers(cut_frames: list[int], markers: list[VideoMarker]) -> list[VideoMarker]:
+    """
+    Returns a copy of markers in which no marker shares a frame with a cut or with any
+    other marker, since Resolve only allows one marker per frame. Intervals often start
+    on the same frame as a cut or as each other (e.g. black, frozen and silent frames
+    from one stretch of no signal), so any marker that collides is moved to the next free
+    frame, with its duration shortened to keep the same end frame where possible.
+    """
+    taken_frames = set(cut_frames)
+    placed: list[VideoMarker] = []
+    for marker in sorted(markers, key=lambda m: m.frame):
+        frame = marker.frame
+        while frame in taken_frames:
+            frame += 1
+        taken_frames.add(frame)
+        duration = max(1, marker.duration - (frame - marker.frame))
+        placed.append(VideoMarker(kind=marker.kind, frame=frame, duration=duration))
+    return placed
+
+
+@dataclass
+class VideoAnalysis:
+    cut_times: list[Decimal]
+    intervals: list[AnalysisInterval]
 
 
 def get_raw_footage(tape_id: str) -> list[str]:
@@ -41,55 +114,460 @@ def timestamp_to_seconds(timestamp: str) -> Decimal:
     return Decimal(whole_seconds) + frac
 
 
-def detect_cut_times(video_filepath: str, threshold: float) -> list[Decimal]:
+# Called with (filename, timestamp, progress_pct, num_cuts) as ffmpeg reports progress
+CutDetectionProgressCallback = Callable[[str, str, Decimal | None, int], None]
+
+
+class MergedCutDetectionProgress:
+    """
+    Collects progress reports from several concurrent detect_cut_times calls and prints
+    them as a single merged status line, with one entry per file, so that output from
+    parallel ffmpeg processes doesn't interleave into an unreadable mess.
+    """
+    def __init__(self, filenames: list[str], unit: str = 'cuts', min_interval: float = 1.0):
+        self.lock = threading.Lock()
+        self.unit = unit
+        self.status: dict[str, tuple[Decimal, int]] = {f: (Decimal(0), 0) for f in filenames}
+        self.min_interval = min_interval
+        self.last_print_time = 0.0
+
+    def update(self, filename: str, timestamp: str, progress_pct: Decimal, num_cuts: int):
+        with self.lock:
+            self.status[filename] = (progress_pct, num_cuts)
+            now = time.time()
+            if now - self.last_print_time >= self.min_interval:
+                self.last_print_time = now
+                self._print()
+
+    def finish(self, filename: str, num_cuts: int):
+        with self.lock:
+            self.status[filename] = (Decimal(100), num_cuts)
+            self._print()
+
+    def _print(self):
+        entries = ['%s: %.2f%% (%d %s)' % (f, pct, n, self.unit) for f, (pct, n) in self.status.items()]
+        print('[cut detection] %s' % ' | '.join(entries))
+
+
+def run_ffmpeg_video_analysis(video_filepath: str, video_filter: str, on_progress: Callable[[str, Decimal | None], None], start: Decimal | None = None, duration: Decimal | None = None, audio_filter: str | None = None, input_options: list[str] | None = None) -> Iterator[str]:
+    """
+    Runs ffmpeg to decode video_filepath through video_filter (and audio_filter, if
+    given), discarding the output, and yields every line that ffmpeg logs, aside from
+    the duration and progress lines which are instead reported to on_progress as
+    (timestamp, progress_pct). If start and/or duration are given, only that portion of
+    the file will be decoded. input_options are passed to ffmpeg ahead of the input
+    file; if they cause ffmpeg to read a file that's still growing, its duration won't
+    be known, and progress_pct will be None.
+    """
     DURATION_REGEX = re.compile(r'^  Duration: (\d{2}:\d{2}:\d{2}\.\d{2}), start:.*$')
     PROGRESS_REGEX = re.compile(r'^frame=.*time=(\d{2}:\d{2}:\d{2}\.\d{2}).*$')
-    CUT_FRAME_REGEX = re.compile(r'^\[Parsed_showinfo.*\spts_time:([^\s]+)\s.*$')
 
-    times: list[Decimal] = []
-    video_filter = "select='gt(scene,%f)',showinfo" % threshold
-    args = ['ffmpeg', '-i', os.path.normpath(video_filepath), '-filter:v', video_filter, '-f', 'null', '-']
+    # If we're only analyzing a portion of the file, use input seeking to jump straight
+    # to the desired start time: timestamps reported by ffmpeg will then be relative to
+    # that start time, so callers need to offset them by start to get times relative to
+    # the start of the file
+    args = ['ffmpeg']
+    if start is not None:
+        args += ['-ss', str(start)]
+    args += input_options or []
+    args += ['-i', os.path.normpath(video_filepath)]
+    if duration is not None:
+        args += ['-t', str(duration)]
+    args += ['-filter:v', video_filter]
+    if audio_filter:
+        args += ['-filter:a', audio_filter]
+    args += ['-f', 'null', '-']
 
-    filename = os.path.basename(video_filepath)
-    duration_seconds: Decimal | None = None    
-    
-    print('Detecting cuts in %s (threshold: %0.3f)...' % (filename, threshold))
+    duration_seconds: Decimal | None = None
     p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
     for line in io.TextIOWrapper(p.stdout, encoding='utf-8'):
         duration_match = DURATION_REGEX.match(line)
         progress_match = PROGRESS_REGEX.match(line)
-        cut_frame_match = CUT_FRAME_REGEX.match(line)
-        assert (int(bool(duration_match)) + int(bool(progress_match)) + int(bool(cut_frame_match))) <= 1
+        assert (int(bool(duration_match)) + int(bool(progress_match))) <= 1
 
         if duration_match:
             assert duration_seconds is None
             duration_seconds = timestamp_to_seconds(duration_match.group(1))
             assert duration_seconds > Decimal(0.0)
+
+            # ffmpeg reports the duration of the entire file, but progress is relative to
+            # the portion that we're analyzing
+            offset_seconds = start if start is not None else Decimal(0)
+            if duration is not None:
+                duration_seconds = min(duration, duration_seconds - offset_seconds)
+            else:
+                duration_seconds = duration_seconds - offset_seconds
         elif progress_match:
-            assert duration_seconds is not None
             timestamp = progress_match.group(1)
-            position_seconds = timestamp_to_seconds(timestamp)
-            progress_ratio = position_seconds / duration_seconds
-            progress_pct = progress_ratio * Decimal(100.0)
-            print('[%s @ %s]: %.2f%% finished (identified %d cut frames)' % (filename, timestamp, progress_pct, len(times)))
-        elif cut_frame_match:
-            seconds_str = cut_frame_match.group(1)
-            times.append(Decimal(seconds_str))
+            progress_pct: Decimal | None = None
+            if duration_seconds is not None:
+                position_seconds = timestamp_to_seconds(timestamp)
+                progress_ratio = position_seconds / duration_seconds
+                progress_pct = progress_ratio * Decimal(100.0)
+            on_progress(timestamp, progress_pct)
+        else:
+            yield line
 
     exitcode = p.wait()
     if exitcode != 0:
-        raise RuntimeError("cut detection failed: ffmpeg returned exit code %d" % exitcode)
+        raise RuntimeError("video analysis failed: ffmpeg returned exit code %d" % exitcode)
+
+
+def detect_cut_times(video_filepath: str, threshold: float, on_progress: CutDetectionProgressCallback | None = None, start: Decimal | None = None, duration: Decimal | None = None, label: str | None = None) -> list[Decimal]:
+    CUT_FRAME_REGEX = re.compile(r'^\[Parsed_showinfo.*\spts_time:([^\s]+)\s.*$')
+
+    times: list[Decimal] = []
+    video_filter = "select='gt(scene,%f)',showinfo" % threshold
+    offset_seconds = start if start is not None else Decimal(0)
+    filename = label or os.path.basename(video_filepath)
+
+    def report_progress(timestamp: str, progress_pct: Decimal):
+        if on_progress:
+            on_progress(filename, timestamp, progress_pct, len(times))
+        else:
+            print('[%s @ %s]: %.2f%% finished (identified %d cut frames)' % (filename, timestamp, progress_pct, len(times)))
+
+    print('Detecting cuts in %s (threshold: %0.3f)...' % (filename, threshold))
+    for line in run_ffmpeg_video_analysis(video_filepath, video_filter, report_progress, start, duration):
+        cut_frame_match = CUT_FRAME_REGEX.match(line)
+        if cut_frame_match:
+            seconds_str = cut_frame_match.group(1)
+            times.append(Decimal(seconds_str) + offset_seconds)
     return times
 
 
-def collect_input_video_files(tape_id: str, detect_cuts: bool, cut_detection_threshold: float) -> list[InputVideoFile]:
-    NTSC_DROP = Decimal('60000') / Decimal('1001')
+def analyze_video(video_filepath: str, threshold: float, on_progress: CutDetectionProgressCallback | None = None, label: str | None = None) -> VideoAnalysis:
+    """
+    Decodes video_filepath once, running scene change detection alongside ffmpeg's
+    blackdetect, freezedetect and silencedetect filters, and returns cut times along
+    with any intervals of black frames, frozen frames, and silent audio.
+    """
+    CUT_FRAME_REGEX = re.compile(r'^\[Parsed_showinfo.*\spts_time:([^\s]+)\s.*$')
+    BLACK_REGEX = re.compile(r'^\[(?:Parsed_)?blackdetect.*\sblack_start:\s*(\S+)\s+black_end:\s*(\S+).*$')
+    FREEZE_START_REGEX = re.compile(r'^\[(?:Parsed_)?freezedetect.*\slavfi\.freezedetect\.freeze_start:\s*(\S+).*$')
+    FREEZE_END_REGEX = re.compile(r'^\[(?:Parsed_)?freezedetect.*\slavfi\.freezedetect\.freeze_end:\s*(\S+).*$')
+    SILENCE_START_REGEX = re.compile(r'^\[(?:Parsed_)?silencedetect.*\ssilence_start:\s*(\S+).*$')
+    SILENCE_END_REGEX = re.compile(r'^\[(?:Parsed_)?silencedetect.*\ssilence_end:\s*(\S+).*$')
+
+    # blackdetect and freezedetect pass every frame through unmodified, so they can run
+    # ahead of select, which drops all frames except the ones we've identified as cuts
+    video_filter = ','.join([
+        'blackdetect=d=%s:pix_th=%s' % (BLACK_MIN_DURATION, BLACK_PIXEL_THRESHOLD),
+        'freezedetect=n=%s:d=%s' % (FREEZE_NOISE, FREEZE_MIN_DURATION),
+        "select='gt(scene,%f)'" % threshold,
+        'showinfo',
+    ])
+    audio_filter = 'silencedetect=n=%s:d=%s' % (SILENCE_NOISE, SILENCE_MIN_DURATION)
+
+    result = VideoAnalysis(cut_times=[], intervals=[])
+    freeze_start: Decimal | None = None
+    silence_start: Decimal | None = None
+    filename = label or os.path.basename(video_filepath)
+
+    def report_progress(timestamp: str, progress_pct: Decimal):
+        num_found = len(result.cut_times) + len(result.intervals)
+        if on_progress:
+            on_progress(filename, timestamp, progress_pct, num_found)
+        else:
+            print('[%s @ %s]: %.2f%% finished (identified %d cuts and %d intervals)' % (filename, timestamp, progress_pct, len(result.cut_times), len(result.intervals)))
+
+    print('Analyzing %s (threshold: %0.3f)...' % (filename, threshold))
+    for line in run_ffmpeg_video_analysis(video_filepath, video_filter, report_progress, audio_filter=audio_filter):
+        if match := CUT_FRAME_REGEX.match(line):
+            result.cut_times.append(Decimal(match.group(1)))
+        elif match := BLACK_REGEX.match(line):
+            result.intervals.append(AnalysisInterval('black', Decimal(match.group(1)), Decimal(match.group(2))))
+        elif match := FREEZE_START_REGEX.match(line):
+            freeze_start = Decimal(match.group(1))
+        elif match := FREEZE_END_REGEX.match(line):
+            assert freeze_start is not None
+            result.intervals.append(AnalysisInterval('freeze', freeze_start, Decimal(match.group(1))))
+            freeze_start = None
+        elif match := SILENCE_START_REGEX.match(line):
+            silence_start = Decimal(match.group(1))
+        elif match := SILENCE_END_REGEX.match(line):
+            assert silence_start is not None
+            result.intervals.append(AnalysisInterval('silence', silence_start, Decimal(match.group(1))))
+            silence_start = None
+
+    # A freeze or silence that lasts until the end of the file never gets an end time
+    if freeze_start is not None:
+        result.intervals.append(AnalysisInterval('freeze', freeze_start, None))
+    if silence_start is not None:
+        result.intervals.append(AnalysisInterval('silence', silence_start, None))
+    result.intervals.sort(key=lambda interval: interval.start)
+    return result
+
+
+def analyze_scene_scores(video_filepath: str, on_progress: CutDetectionProgressCallback | None = None, start: Decimal | None = None, duration: Decimal | None = None, label: str | None = None, input_options: list[str] | None = None) -> list[tuple[Decimal, float]]:
+    """
+    Decodes video_filepath (or the given portion of it) and returns a list of
+    (seconds, scene_score) pairs, with a scene change score for every frame. Unlike
+    detect_cut_times, the results aren't specific to any threshold value.
+    """
+    FRAME_REGEX = re.compile(r'^\[Parsed_metadata.*\sframe:\s*\d+\s+pts:\S+\s+pts_time:(\S+).*$')
+    SCORE_REGEX = re.compile(r'^\[Parsed_metadata.*\slavfi\.scene_score=(\S+).*$')
+
+    # Evaluating the scene expression in select causes it to attach a score to every
+    # frame; we select all frames and print that score from each frame's metadata
+    scores: list[tuple[Decimal, float]] = []
+    video_filter = "select='gte(scene,0)',metadata=print:key=lavfi.scene_score"
+    offset_seconds = start if start is not None else Decimal(0)
+    filename = label or os.path.basename(video_filepath)
+
+    def report_progress(timestamp: str, progress_pct: Decimal):
+        if on_progress:
+            on_progress(filename, timestamp, progress_pct, len(scores))
+        else:
+            print('[%s @ %s]: %.2f%% finished (scored %d frames)' % (filename, timestamp, progress_pct, len(scores)))
+
+    print('Computing scene scores for %s...' % filename)
+    frame_seconds: Decimal | None = None
+    for line in run_ffmpeg_video_analysis(video_filepath, video_filter, report_progress, start, duration, input_options=input_options):
+        frame_match = FRAME_REGEX.match(line)
+        if frame_match:
+            frame_seconds = Decimal(frame_match.group(1)) + offset_seconds
+            continue
+        score_match = SCORE_REGEX.match(line)
+        if score_match:
+            assert frame_seconds is not None
+            scores.append((frame_seconds, float(score_match.group(1))))
+            frame_seconds = None
+    return scores
+
+
+def get_duration_seconds(video_filepath: str) -> Decimal:
+    args = ['ffprobe', '-loglevel', 'error', '-show_entries', 'format=duration', '-of', 'csv=print_section=0', os.path.normpath(video_filepath)]
+    output = subprocess.check_output(args, encoding='utf-8').strip()
+    return Decimal(output)
+
+
+@dataclass
+class CutDetectionWindow:
+    video_index: int
+    start: Decimal | None
+    duration: Decimal | None
+    keep_from: Decimal | None
+    label: str
+
+
+def get_cut_detection_windows(video_index: int, video_filepath: str, num_shards: int) -> list[CutDetectionWindow]:
+    # Scene scores depend on the two frames preceding each frame, so every window after
+    # the first starts a little early: we discard any cuts found in the first part of
+    # that overlap, and rely on the previous window to cover the rest
+    OVERLAP_SECONDS = Decimal(2)
+    GUARD_SECONDS = Decimal(1)
+
+    filename = os.path.basename(video_filepath)
+    if num_shards <= 1:
+        return [CutDetectionWindow(video_index, None, None, None, filename)]
+
+    total_duration = get_duration_seconds(video_filepath)
+    boundaries = [total_duration * i / num_shards for i in range(num_shards)]
+    windows: list[CutDetectionWindow] = []
+    for i, boundary in enumerate(boundaries):
+        start = max(Decimal(0), boundary - OVERLAP_SECONDS)
+        keep_from = start + GUARD_SECONDS if i > 0 else None
+        duration = boundaries[i + 1] - start if i + 1 < len(boundaries) else None
+        label = '%s [%d/%d]' % (filename, i + 1, num_shards)
+        windows.append(CutDetectionWindow(video_index, start if i > 0 else None, duration, keep_from, label))
+    return windows
+
+
+def merge_cut_times(cut_times_by_window: list[list[Decimal]]) -> list[Decimal]:
+    # Windows overlap slightly, so the same cut may be reported twice, with timestamps
+    # that differ in the last digit: collapse any times that land on the same frame
+    merged: list[Decimal] = []
+    seen_frames: set[int] = set()
+    for time in sorted(t for times in cut_times_by_window for t in times):
+        frame = round(time * NTSC_DROP)
+        if frame not in seen_frames:
+            seen_frames.add(frame)
+            merged.append(time)
+    return merged
+
+
+def run_windowed_analysis(video_filepaths: list[str], jobs: int, shards_per_file: int, analyze: Callable[..., list[T]], get_seconds: Callable[[T], Decimal], unit: str) -> list[list[T]]:
+    """
+    Splits each file into one or more time windows, then calls analyze(video_filepath,
+    on_progress, start, duration, label) for each window, running up to the requested
+    number of jobs concurrently. Returns a list of results for each file, in the same
+    order as video_filepaths, with any results from a window's discarded pre-roll
+    filtered out (as determined by get_seconds).
+    """
+    windows: list[CutDetectionWindow] = []
+    for i, video_filepath in enumerate(video_filepaths):
+        windows += get_cut_detection_windows(i, video_filepath, shards_per_file)
+
+    # Run one ffmpeg process per window, up to the requested number at a time, merging
+    # their progress reports into a single status line
+    progress = MergedCutDetectionProgress([w.label for w in windows], unit)
+
+    def run(window: CutDetectionWindow) -> list[T]:
+        video_filepath = video_filepaths[window.video_index]
+        results = analyze(video_filepath, progress.update, window.start, window.duration, window.label)
+        if window.keep_from is not None:
+            results = [r for r in results if get_seconds(r) >= window.keep_from]
+        progress.finish(window.label, len(results))
+        return results
+
+    # Executor.map yields results in the order of its inputs, regardless of which job
+    # finishes first, so we can regroup our results by file in the original order
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results_by_window = list(executor.map(run, windows))
+
+    results_by_file: list[list[T]] = [[] for _ in video_filepaths]
+    for window, results in zip(windows, results_by_window):
+        results_by_file[window.video_index] += results
+    return results_by_file
+
+
+def detect_cut_times_parallel(video_filepaths: list[str], threshold: float, jobs: int, shards_per_file: int = 1) -> list[list[Decimal]]:
+    def analyze(video_filepath, on_progress, start, duration, label) -> list[Decimal]:
+        return detect_cut_times(video_filepath, threshold, on_progress, start, duration, label)
+
+    times_by_file = run_windowed_analysis(video_filepaths, jobs, shards_per_file, analyze, lambda t: t, 'cuts')
+    return [merge_cut_times([times]) for times in times_by_file]
+
+
+def compute_frame_diff_scores_parallel(video_filepaths: list[str], jobs: int) -> list[array]:
+    """
+    Computes per-frame scene scores for each file using the NumPy frame-difference
+    backend, running up to the requested number of files concurrently. Frames are
+    numbered directly as they're decoded, so no timestamps are involved.
+    """
+    progress = MergedCutDetectionProgress([os.path.basename(p) for p in video_filepaths], 'frames')
+
+    def run(video_filepath: str) -> array:
+        filename = os.path.basename(video_filepath)
+        expected_num_frames = get_duration_seconds(video_filepath) * NTSC_DROP
+
+        def report_progress(num_frames: int):
+            progress_pct = min(Decimal(100), Decimal(num_frames) / expected_num_frames * Decimal(100))
+            progress.update(filename, str(num_frames), progress_pct, num_frames)
+
+        scores = compute_frame_diff_scores(video_filepath, on_progress=report_progress)
+        progress.finish(filename, len(scores))
+        return array('f', scores.astype('<f4').tobytes())
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(run, video_filepaths))
+
+
+def detect_cut_frames_fast_parallel(video_filepaths: list[str], threshold: float, jobs: int, decimate: int) -> list[list[int]]:
+    # Each file's coarse pass runs as one job; the short refinement decodes for that
+    # file's candidates are then spread across that file's share of the jobs, so that no
+    # more than `jobs` ffmpeg processes run at once in total
+    refine_jobs = max(1, jobs // max(1, len(video_filepaths)))
+
+    def run(video_filepath: str) -> list[int]:
+        filename = os.path.basename(video_filepath)
+        print('Detecting cuts in %s (fast mode, threshold: %0.3f)...' % (filename, threshold))
+        cut_frames = detect_cut_frames_fast(video_filepath, threshold, decimate, jobs=refine_jobs)
+        print('Identified %d cut frames in %s.' % (len(cut_frames), filename))
+        return cut_frames
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(run, video_filepaths))
+
+
+def load_scene_scores(video_filepaths: list[str], jobs: int, shards_per_file: int = 1, backend: str = 'ffmpeg', use_cache: bool = True, rebuild_cache: bool = False) -> list[array]:
+    """
+    Returns an array of per-frame scene scores for each file. If use_cache is set, the
+    scores are read from each file's scene score cache if it's up-to-date, and
+    otherwise we decode the file to compute its scores and write them to the cache for
+    next time.
+    """
+    params = SCENE_SCORE_PARAMS_BY_BACKEND[backend]
+    scores_by_file: list[array | None] = [None for _ in video_filepaths]
+    if use_cache and not rebuild_cache:
+        for i, video_filepath in enumerate(video_filepaths):
+            scores_by_file[i] = read_scene_scores(video_filepath, params)
+            if scores_by_file[i] is not None:
+                print('Loaded cached scene scores for %s.' % os.path.basename(video_filepath))
+
+    stale_indices = [i for i, scores in enumerate(scores_by_file) if scores is None]
+    if stale_indices:
+        stale_filepaths = [video_filepaths[i] for i in stale_indices]
+        if backend == 'numpy':
+            if shards_per_file > 1:
+                print('NOTE: --shards is not supported by the numpy backend; analyzing each file in a single pass.')
+            stale_scores = compute_frame_diff_scores_parallel(stale_filepaths, jobs)
+        else:
+            frame_scores_by_file = run_windowed_analysis(stale_filepaths, jobs, shards_per_file, analyze_scene_scores, lambda r: r[0], 'frames')
+            stale_scores = [build_scene_score_array(frame_scores) for frame_scores in frame_scores_by_file]
+        for i, video_filepath, scores in zip(stale_indices, stale_filepaths, stale_scores):
+            if use_cache:
+                write_scene_scores(video_filepath, params, scores)
+                print('Wrote scene scores for %d frames to %s.' % (len(scores), get_scene_cache_path(video_filepath)))
+            scores_by_file[i] = scores
+    return scores_by_file
+
+
+def analyze_videos_parallel(video_filepaths: list[str], threshold: float, jobs: int) -> list[VideoAnalysis]:
+    progress = MergedCutDetectionProgress([os.path.basename(p) for p in video_filepaths], 'results')
+
+    def run(video_filepath: str) -> VideoAnalysis:
+        filename = os.path.basename(video_filepath)
+        analysis = analyze_video(video_filepath, threshold, progress.update)
+        progress.finish(filename, len(analysis.cut_times) + len(analysis.intervals))
+        return analysis
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(run, video_filepaths))
+
+
+def collect_input_video_files(tape_id: str, detect_cuts: bool, cut_detection_threshold: float, jobs: int = 1, shards_per_file: int = 1, use_cache: bool = True, rebuild_cache: bool = False, backend: str = 'ffmpeg', fast_decimate: int | None = None, analyze: bool = False) -> list[InputVideoFile]:
+    raw_video_filepaths = get_raw_footage(tape_id)
+
+    # If we want more than just cuts, run every detector together in a single decode of
+    # each file, and produce markers for the intervals they find
+    if analyze:
+        analyses = analyze_videos_parallel(raw_video_filepaths, cut_detection_threshold, jobs)
+        input_videos: list[InputVideoFile] = []
+        for raw_video_filepath, analysis in zip(raw_video_filepaths, analyses):
+            has_open_interval = any(interval.end is None for interval in analysis.intervals)
+            video_duration_seconds = get_duration_seconds(raw_video_filepath) if has_open_interval else None
+            cut_frames = sorted(set([round(time * NTSC_DROP) for time in analysis.cut_times]))
+            markers = [interval.to_marker(video_duration_seconds) for interval in analysis.intervals]
+            input_videos.append(InputVideoFile(
+                path=raw_video_filepath,
+                cut_frames=cut_frames,
+                markers=place_interval_markers(cut_frames, markers),
+            ))
+        return input_videos
+
+    # In fast mode, we only score a small, decimated version of the video, so there are
+    # no per-frame scores to cache: we go straight to cut frames
+    if detect_cuts and fast_decimate is not None:
+        cut_frames_by_file = detect_cut_frames_fast_parallel(raw_video_filepaths, cut_detection_threshold, jobs, fast_decimate)
+        return [InputVideoFile(
+            path=raw_video_filepath,
+            cut_frames=cut_frames,
+        ) for raw_video_filepath, cut_frames in zip(raw_video_filepaths, cut_frames_by_file)]
+
+    # If using the scene score cache, we can find cut frames for any threshold value
+    # just by filtering the cached scores; there's no need to re-decode anything. The
+    # numpy backend always produces per-frame scores, whether we cache them or not.
+    if detect_cuts and (use_cache or backend == 'numpy'):
+        scores_by_file = load_scene_scores(raw_video_filepaths, jobs, shards_per_file, backend, use_cache, rebuild_cache)
+        return [InputVideoFile(
+            path=raw_video_filepath,
+            cut_frames=find_cut_frames(scores, cut_detection_threshold),
+        ) for raw_video_filepath, scores in zip(raw_video_filepaths, scores_by_file)]
+
+    # Otherwise, find cut times for each file up-front, either one after another or
+    # concurrently
+    cut_times_by_file: list[list[Decimal]] = [[] for _ in raw_video_filepaths]
+    if detect_cuts:
+        if jobs > 1 or shards_per_file > 1:
+            cut_times_by_file = detect_cut_times_parallel(raw_video_filepaths, cut_detection_threshold, jobs, shards_per_file)
+        else:
+            cut_times_by_file = [detect_cut_times(p, cut_detection_threshold) for p in raw_video_filepaths]
+
     input_videos: list[InputVideoFile] = []
-    for raw_video_filepath in get_raw_footage(tape_id):
-        cut_frames: list[int] = []
-        if detect_cuts:
-            cut_times = detect_cut_times(raw_video_filepath, cut_detection_threshold)
-            cut_frames = sorted(set([round(time * NTSC_DROP) for time in cut_times]))
+    for raw_video_filepath, cut_times in zip(raw_video_filepaths, cut_times_by_file):
+        cut_frames = sorted(set([round(time * NTSC_DROP) for time in cut_times]))
         input_videos.append(InputVideoFile(
             path=raw_video_filepath,
             cut_frames=cut_frames,
@@ -102,12 +580,18 @@ if __name__ == '__main__':
     parser.add_argument('tape_id', help='tape for which footage has been captured and placed in capture/<tape-id>/<tape-id>_raw.###.mkv')
     parser.add_argument('--detect-cuts', '-c', action='store_true', help='Use ffmpeg to detect cut frames and add markers to clips in Resolve')
     parser.add_argument('--cut-detection-threshold', '-t', type=float, default=0.2, help='threshold scene change detection score (sum of absolute differences between frames); lower is more sensitive')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help='number of raw footage files to run cut detection on concurrently (defaults to number of CPU cores)')
+    parser.add_argument('--shards', '-s', type=int, default=1, help='number of time windows to split each raw footage file into, so that a single long file can be analyzed by several concurrent jobs')
+    parser.add_argument('--no-cache', action='store_true', help='run ffmpeg cut detection at the given threshold directly, rather than using cached per-frame scene scores')
+    parser.add_argument('--rebuild-cache', action='store_true', help='recompute per-frame scene scores even if an up-to-date cache exists')
+    parser.add_argument('--backend', '-b', choices=sorted(SCENE_SCORE_PARAMS_BY_BACKEND), default='ffmpeg', help="how to compute scene scores: 'ffmpeg' uses the scene score from ffmpeg's select filter; 'numpy' decodes downscaled grayscale frames and compares them with NumPy")
+    parser.add_argument('--fast', '-f', nargs='?', type=int, const=FAST_DECIMATE, default=None, metavar='DECIMATE', help='detect cuts by scoring only every nth frame (%d by default) at low resolution, then re-checking each candidate cut at full rate and resolution' % FAST_DECIMATE)
+    parser.add_argument('--analyze', '-a', action='store_true', help='in a single pass over each file, detect cuts along with black frames, frozen frames and silent audio, and add markers for all of them')
+    parser.add_argument('--no-bulk-import', action='store_true', help='build the Resolve timeline by appending each clip and adding each marker individually, rather than importing a generated FCPXML timeline in one call (which leaves cut markers in the default color instead of Sand)')
     args = parser.parse_args()
 
-    videos = collect_input_video_files(args.tape_id, args.detect_cuts, args.cut_detection_threshold)
+    videos = collect_input_video_files(args.tape_id, args.detect_cuts, args.cut_detection_threshold, args.jobs, args.shards, not args.no_cache, args.rebuild_cache, args.backend, args.fast, args.analyze)
     if not videos:
         raise RuntimeError('No input video files found for tape %s' % args.tape_id)
 
-    gvcr_resolve = os.path.join(os.path.dirname(__file__), 'gvcr_resolve')
-    script = 'create_vhs_project(resolve, %r, %r)' % (args.tape_id, [asdict(v) for v in videos])
-    resolve_exec(gvcr_resolve, script)
+    call_resolve('create_vhs_project', args.tape_id, [asdict(v) for v in videos], not args.no_bulk_import)
@@ -3,13 +3,21 @@ import re
 import shutil
 import tempfile
 import datetime
-import binascii
-import csv
 import json
 import tempfile
-import zipfile
 import time
 
+from .bridge import start_bridge, stop_bridge
+from .drp import extend_clip_duration_in_drp
+from .fcpxml import NTSC_DROP_FRAME_DURATION, FcpxmlClip, FcpxmlMarker, write_timeline_fcpxml
+
+# Colors for the markers we add for each kind of interval found by edit.py --analyze
+MARKER_COLORS_BY_KIND = {
+    'black': 'Blue',
+    'freeze': 'Red',
+    'silence': 'Green',
+}
+
 
 def _create_and_load_project_from_template(resolve, template_filename, project_name):
     # Find the blank project template that we copy and import to create our project,
@@ -61,57 +69,61 @@ def _transform_shorts_video_for_vcr(video_item):
     video_item.SetProperty('Pan', 186.0)
 
 
-def _mutate_drp_to_extend_clip_duration(drp_filepath, video_item_name, duration):
-    # Open the .drp file, which is a ZIP archive containing a few files describing the
-    # Resolve project
-    drp_tmp_filepath = drp_filepath + '.tmp'
-    with zipfile.ZipFile(drp_filepath) as drp_file:
-        # We should have exactly one timeline, with a corresponding
-        # SeqContainer/<uuid>.xml file
-        sequence_file_paths = [f for f in drp_file.namelist() if f.startswith('SeqContainer/') and f.endswith('.xml')]
-        if len(sequence_file_paths) != 1:
-            raise RuntimeError('Expected 1 SeqContainer/*.xml file in %s; got %d' % (drp_filepath, len(sequence_file_paths)))
-
-        # Read the contents of that file, which should be an XML document
-        sequence_file_path = sequence_file_paths[0]
-        with drp_file.open(sequence_file_path) as sequence_file:
-            sequence_file_data = sequence_file.read()
-
-        # Process that XML document as plain-text, iterating line-by-line and changing
-        # only the duration of the clip that matches the desired name
-        has_seen_clip_name = False
-        has_updated_clip_duration = False
-        updated_lines = []
-        sep = b'\r\n' if b'\r\n' in sequence_file_data else b'\n'
-        for line in sequence_file_data.split(sep):
-            line = line.decode()
-            updated_line = line
-            if not has_updated_clip_duration:
-                if has_seen_clip_name:
-                    if '<Duration>' in line and '</Duration>' in line:
-                        updated_line = line[:line.index('>')+1] + str(duration) + '</Duration>'
-                        has_updated_clip_duration = True
-                else:
-                    if ('<Name>%s</Name>' % video_item_name) in line:
-                        has_seen_clip_name = True
-            updated_lines.append(updated_line)
-        updated_sequence_file_data = sep.join([s.encode() for s in updated_lines]) + sep
-
-        # Write a new .drp ZIP file at a temporary location, replacing the original
-        # timeline XML file with our updated version
-        with zipfile.ZipFile(drp_tmp_filepath, 'w') as drp_tmp_file:
-            for item in drp_file.infolist():
-                if item.filename == sequence_file_path:
-                    drp_tmp_file.writestr(item, updated_sequence_file_data)
-                else:
-                    drp_tmp_file.writestr(item, drp_file.read(item))
-
-    # Replace the original .drp file with our new version
-    os.remove(drp_filepath)
-    os.rename(drp_tmp_filepath, drp_filepath)
-
-
-def create_shorts_project(resolve, mkv_filepath, markers):
+def _append_shorts_timeline(media_pool, timeline_name, media_pool_item, shortsbars_media_pool_item):
+    # Create an empty timeline, then add tracks for Video 2, Video 3 and Video 4
+    timeline = media_pool.CreateEmptyTimeline(timeline_name)
+    assert timeline
+    ok = timeline.AddTrack('video') # Create Video 2
+    assert ok
+    ok = timeline.AddTrack('video') # Create Video 3
+    assert ok
+    ok = timeline.AddTrack('video') # Create Video 4
+    assert ok
+
+    # Add our video tracks, with Track 1 last - as soon as Track 1 contains any clips,
+    # AppendToTimeline will append new clips at the end time of that track, rather than
+    # at the beginning of the sequence, when called with an implicit startFrame
+    print("Adding footage to timeline...")
+    MEDIA_TYPE_VIDEO_ONLY = 1
+    ok = media_pool.AppendToTimeline([{"mediaPoolItem": shortsbars_media_pool_item, "mediaType": MEDIA_TYPE_VIDEO_ONLY, "trackIndex": 4}])
+    assert ok
+    ok = media_pool.AppendToTimeline([{"mediaPoolItem": media_pool_item, "mediaType": MEDIA_TYPE_VIDEO_ONLY, "trackIndex": 3}])
+    assert ok
+    ok = media_pool.AppendToTimeline([{"mediaPoolItem": media_pool_item, "mediaType": MEDIA_TYPE_VIDEO_ONLY, "trackIndex": 2}])
+    assert ok
+    ok = media_pool.AppendToTimeline([{"mediaPoolItem": media_pool_item, "mediaType": MEDIA_TYPE_VIDEO_ONLY, "trackIndex": 1}])
+    assert ok
+
+    # Add the audio to track 1
+    MEDIA_TYPE_AUDIO_ONLY = 2
+    ok = media_pool.AppendToTimeline([{"mediaPoolItem": media_pool_item, "mediaType": MEDIA_TYPE_AUDIO_ONLY, "trackIndex": 1}])
+    assert ok
+    return timeline
+
+
+def _parse_clip_resolution(clip_properties):
+    # Resolve reports each clip's frame size as e.g. '1920x1080': return (None, None) if
+    # it's missing or unexpected, so that the clip is assumed to match the timeline
+    match = re.match(r'^(\d+)x(\d+)$', clip_properties.get('Resolution', ''))
+    if not match:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
+
+
+def _import_timeline_from_fcpxml(media_pool, timeline_name, clips, width, height, frame_duration=NTSC_DROP_FRAME_DURATION):
+    # Write the entire timeline, clips and markers included, to an FCPXML file, then
+    # import it in one call: the media for each clip must already be in the media pool
+    with tempfile.TemporaryDirectory() as tempdir:
+        fcpxml_filepath = os.path.join(tempdir, '%s.fcpxml' % timeline_name)
+        write_timeline_fcpxml(fcpxml_filepath, timeline_name, clips, width, height, frame_duration)
+        print('Importing timeline from %s...' % os.path.basename(fcpxml_filepath))
+        timeline = media_pool.ImportTimelineFromFile(fcpxml_filepath, {'timelineName': timeline_name, 'importSourceClips': False})
+    if not timeline:
+        raise RuntimeError('Failed to import timeline %s from FCPXML' % timeline_name)
+    return timeline
+
+
+def create_shorts_project(resolve, mkv_filepath, markers, bulk_import=True):
     # Ensure that we have a valid OBS recording of the desired broadcast
     if not os.path.isfile(mkv_filepath):
         raise ValueError('input mkv does not exist at %s' % mkv_filepath)
@@ -147,43 +159,39 @@ def create_shorts_project(resolve, mkv_filepath, markers):
     assert len(new_media_pool_items) == 1
     shortsbars_media_pool_item = new_media_pool_items[0]
 
-    # Create a timeline to contain our entire broadcast, reoriented vertically
-    timeline_name = 'gvcrs_%s' % broadcast_id
-    print("Creating timeline: %s" % timeline_name)
-    media_pool = project.GetMediaPool()
-    timeline = media_pool.CreateEmptyTimeline(timeline_name)
-    assert timeline
-
-    # We'll have a single audio track for our recording's audio, then four video tracks:
+    # Create a timeline to contain our entire broadcast, reoriented vertically. We'll
+    # have a single audio track for our recording's audio, then four video tracks:
     # - Video 4: PNG overlay containing black bars and branding
     # - Video 3: Video feed from VCR (leftmost 4:3 region of recording)
     # - Video 2: Face cam (4:3 region at top of right sidebar)
     # - Video 1: Chat (Lower region of right sidebar)
-    ok = timeline.AddTrack('video') # Create Video 2
-    assert ok
-    ok = timeline.AddTrack('video') # Create Video 3
-    assert ok
-    ok = timeline.AddTrack('video') # Create Video 4
-    assert ok
-
-    # Add our video tracks, with Track 1 last - as soon as Track 1 contains any clips,
-    # AppendToTimeline will append new clips at the end time of that track, rather than
-    # at the beginning of the sequence, when called with an implicit startFrame
-    print("Adding footage to timeline...")
-    MEDIA_TYPE_VIDEO_ONLY = 1
-    ok = media_pool.AppendToTimeline([{"mediaPoolItem": shortsbars_media_pool_item, "mediaType": MEDIA_TYPE_VIDEO_ONLY, "trackIndex": 4}])
-    assert ok
-    ok = media_pool.AppendToTimeline([{"mediaPoolItem": media_pool_item, "mediaType": MEDIA_TYPE_VIDEO_ONLY, "trackIndex": 3}])
-    assert ok
-    ok = media_pool.AppendToTimeline([{"mediaPoolItem": media_pool_item, "mediaType": MEDIA_TYPE_VIDEO_ONLY, "trackIndex": 2}])
-    assert ok
-    ok = media_pool.AppendToTimeline([{"mediaPoolItem": media_pool_item, "mediaType": MEDIA_TYPE_VIDEO_ONLY, "trackIndex": 1}])
-    assert ok
-
-    # Add the audio to track 1
-    MEDIA_TYPE_AUDIO_ONLY = 2
-    ok = media_pool.AppendToTimeline([{"mediaPoolItem": media_pool_item, "mediaType": MEDIA_TYPE_AUDIO_ONLY, "trackIndex": 1}])
-    assert ok
+    timeline_name = 'gvcrs_%s' % broadcast_id
+    print("Creating timeline: %s" % timeline_name)
+    media_pool = project.GetMediaPool()
+    if bulk_import:
+        # Generate the whole timeline offline and import it in one call: since we know
+        # the length of the recording up front, we can give our overlay image the full
+        # duration of the timeline from the start. Our tape markers go on the chat clip,
+        # which starts at the start of the timeline, so their frames line up exactly.
+        # FCPXML markers have no color, so these get Resolve's default marker color
+        # rather than Sand, but they cost no API calls.
+        clip_properties = media_pool_item.GetClipProperty()
+        num_frames = int(clip_properties['Frames'])
+        width, height = _parse_clip_resolution(clip_properties)
+        tape_markers = []
+        for marker_frame, marker_text in markers:
+            if 0 <= marker_frame < num_frames:
+                tape_markers.append(FcpxmlMarker(frame=marker_frame, name=marker_text))
+            else:
+                print('WARNING: Could not add marker %s at frame %d of %s' % (marker_text, marker_frame, mkv_filename))
+        chat_clip = FcpxmlClip(path=mkv_filepath, num_frames=num_frames, width=width, height=height, markers=tape_markers, connected_clips=[
+            FcpxmlClip(path=mkv_filepath, num_frames=num_frames, lane=1, video_only=True, width=width, height=height),
+            FcpxmlClip(path=mkv_filepath, num_frames=num_frames, lane=2, video_only=True, width=width, height=height),
+            FcpxmlClip(path=shortbars_png_filepath, num_frames=0, end_frame=num_frames, lane=3, is_still=True),
+        ])
+        timeline = _import_timeline_from_fcpxml(media_pool, timeline_name, [chat_clip], 1080, 1920, (1, 60))
+    else:
+        timeline = _append_shorts_timeline(media_pool, timeline_name, media_pool_item, shortsbars_media_pool_item)
 
     # We should now have a single shortbars graphic, a single audio clip, and three
     # identical video clips, all unlinked: get references to the corresponding
@@ -211,50 +219,54 @@ def create_shorts_project(resolve, mkv_filepath, markers):
     _transform_shorts_video_for_face(face_video_item)
     _transform_shorts_video_for_vcr(vcr_video_item)
 
-    # Iterate through our list of (marker_frame, marker_text) pairs and create a marker
-    # on the timeline to indicate where each tape starts
-    print("Adding markers to indicate start of each tape...")
-    for marker_frame, marker_text in markers:
-        timeline.AddMarker(marker_frame, 'Sand', marker_text, '', 1)
-
-    # We need to extend our _resolve_shortbars.png image overlay clip to match the
-    # full duration of the timeline, but the Resolve scripting API does not let us set
-    # the duration of a clip, so we need to export the entire project to .drp, modify
-    # that .drp on disk to set the duration of our clip, then re-import the project
-    project_name = project.GetName()
-    project_manager = resolve.GetProjectManager()
-    video_item_name = blackbars_video_item.GetName()
-    duration = int(timeline.GetEndFrame()) - int(timeline.GetStartFrame())
-    with tempfile.TemporaryDirectory() as temp_dirpath:
-        # Export the project to disk so we can manipulate the timing of clips
-        drp_filepath = os.path.join(temp_dirpath, '%s.drp' % project_name)
-        print("Exporting to %s" % drp_filepath)
-        project_manager.SaveProject()
-        project_manager.ExportProject(project_name, drp_filepath)
-
-        # Switch to a dummy project to unload the original project so we can delete it
-        project_manager.LoadProject('_blank')
-
-        # Delete the original project so we'll be able to reimport it with the same name
-        project_manager.DeleteProject(project_name)
-
-        # Modify the .drp so that the duration of our blackbars clip in this timeline is
-        # extended to match the full duration of the timeline
-        _mutate_drp_to_extend_clip_duration(drp_filepath, video_item_name, duration)
-
-        # Import and reload the project from the modified .drp
-        print("Re-importing from %s" % drp_filepath)
-        project_manager.ImportProject(drp_filepath)
-        project_manager.LoadProject(project_name)
-
-    # Re-acquire references now that we've loaded a new project
-    project = resolve.GetProjectManager().GetCurrentProject()
-    timeline = project.GetCurrentTimeline()
-    audio_item = timeline.GetItemListInTrack('audio', 1)[0]
-    chat_video_item = timeline.GetItemListInTrack('video', 1)[0]
-    face_video_item = timeline.GetItemListInTrack('video', 2)[0]
-    vcr_video_item = timeline.GetItemListInTrack('video', 3)[0]
-    blackbars_video_item = timeline.GetItemListInTrack('video', 4)[0]
+    # If we appended clips through the API, iterate through our list of (marker_frame,
+    # marker_text) pairs and create a marker on the timeline to indicate where each tape
+    # starts (bulk import has already put these markers on the chat clip)
+    if not bulk_import:
+        print("Adding markers to indicate start of each tape...")
+        for marker_frame, marker_text in markers:
+            timeline.AddMarker(marker_frame, 'Sand', marker_text, '', 1)
+
+    # If we appended clips through the API, we need to extend our _resolve_shortbars.png
+    # image overlay clip to match the full duration of the timeline, but the Resolve
+    # scripting API does not let us set the duration of a clip, so we need to export the
+    # entire project to .drp, modify that .drp on disk to set the duration of our clip,
+    # then re-import the project
+    if not bulk_import:
+        project_name = project.GetName()
+        project_manager = resolve.GetProjectManager()
+        video_item_name = blackbars_video_item.GetName()
+        duration = int(timeline.GetEndFrame()) - int(timeline.GetStartFrame())
+        with tempfile.TemporaryDirectory() as temp_dirpath:
+            # Export the project to disk so we can manipulate the timing of clips
+            drp_filepath = os.path.join(temp_dirpath, '%s.drp' % project_name)
+            print("Exporting to %s" % drp_filepath)
+            project_manager.SaveProject()
+            project_manager.ExportProject(project_name, drp_filepath)
+
+            # Switch to a dummy project to unload the original project so we can delete it
+            project_manager.LoadProject('_blank')
+
+            # Delete the original project so we'll be able to reimport it with the same name
+            project_manager.DeleteProject(project_name)
+
+            # Modify the .drp so that the duration of our blackbars clip in this timeline is
+            # extended to match the full duration of the timeline
+            extend_clip_duration_in_drp(drp_filepath, video_item_name, duration)
+
+            # Import and reload the project from the modified .drp
+            print("Re-importing from %s" % drp_filepath)
+            project_manager.ImportProject(drp_filepath)
+            project_manager.LoadProject(project_name)
+
+        # Re-acquire references now that we've loaded a new project
+        project = resolve.GetProjectManager().GetCurrentProject()
+        timeline = project.GetCurrentTimeline()
+        audio_item = timeline.GetItemListInTrack('audio', 1)[0]
+        chat_video_item = timeline.GetItemListInTrack('video', 1)[0]
+        face_video_item = timeline.GetItemListInTrack('video', 2)[0]
+        vcr_video_item = timeline.GetItemListInTrack('video', 3)[0]
+        blackbars_video_item = timeline.GetItemListInTrack('video', 4)[0]
 
     # Link all our clips together so they can be edited as a single item
     ok = timeline.SetClipsLinked([
@@ -269,7 +281,7 @@ def create_shorts_project(resolve, mkv_filepath, markers):
     print('Ready for edit.')
 
 
-def create_vhs_project(resolve, tape_id, videos):
+def create_vhs_project(resolve, tape_id, videos, bulk_import=True):
     # Verify that we have at least one input video file, and that each item is a dict
     # produced by the InputVideoFile dataclass defined in edit.py
     if not videos:
@@ -285,6 +297,11 @@ def create_vhs_project(resolve, tape_id, videos):
             raise ValueError('invalid format for InputVideoFile dict: "cut_frames" must be a list')
         if not all([isinstance(x, int) for x in video['cut_frames']]):
             raise ValueError('invalid format for InputVideoFile dict: "cut_frames" must be a list of ints')
+        for marker in video.get('markers', []):
+            if not isinstance(marker.get('kind'), str) or marker['kind'] not in MARKER_COLORS_BY_KIND:
+                raise ValueError('invalid format for InputVideoFile dict: "markers" must have a "kind" of %s' % ', '.join(MARKER_COLORS_BY_KIND))
+            if not isinstance(marker.get('frame'), int) or not isinstance(marker.get('duration'), int):
+                raise ValueError('invalid format for InputVideoFile dict: "markers" must have int "frame" and "duration" values')
         if not os.path.isfile(video['path']):
             raise RuntimeError('invalid InputVideoFile: no such file exists at %s' % video['path'])
 
@@ -305,15 +322,40 @@ def create_vhs_project(resolve, tape_id, videos):
         expected_filename = os.path.basename(video_file_paths[i])
         assert media_pool_item.GetName() == expected_filename
 
-    # Create a timeline in our project and populate it by adding each of our input
-    # clips sequentially, and dropping in markers at the noted cut frames if supplied
+    # If bulk-importing, generate the timeline offline, with every clip and every cut
+    # marker, and import it in a single call. FCPXML markers have no color, so they're
+    # imported with Resolve's default color: the (much less numerous) markers for each
+    # kind of interval found by edit.py --analyze are still added individually, so that
+    # we can color-code them.
     print('Preparing timeline for %s from %d video file(s)...' % (tape_id, len(videos)))
     media_pool = project.GetMediaPool()
+    if bulk_import:
+        clips = []
+        for video, media_pool_item in zip(videos, media_pool_items):
+            clip_properties = media_pool_item.GetClipProperty()
+            num_frames = int(clip_properties['Frames'])
+            width, height = _parse_clip_resolution(clip_properties)
+            markers = [FcpxmlMarker(frame=frame_id, name='cut') for frame_id in video['cut_frames']]
+            clips.append(FcpxmlClip(path=video['path'], num_frames=num_frames, name=media_pool_item.GetName(), markers=markers, width=width, height=height))
+        timeline = _import_timeline_from_fcpxml(media_pool, tape_id, clips, 1440, 1080)
+
+        timeline_items = timeline.GetItemListInTrack('video', 1)
+        assert len(timeline_items) == len(media_pool_items)
+        for video, media_pool_item, timeline_item in zip(videos, media_pool_items, timeline_items):
+            assert timeline_item.GetMediaPoolItem().GetMediaId() == media_pool_item.GetMediaId()
+            print('Added %s with %d cut frame marker(s) and %d other marker(s)' % (media_pool_item.GetName(), len(video['cut_frames']), len(video.get('markers', []))))
+            for marker in video.get('markers', []):
+                _add_interval_marker(timeline_item, marker)
+        print('Ready for edit.')
+        return
+
+    # Otherwise, create a timeline in our project and populate it by adding each of our
+    # input clips sequentially, and dropping in markers at the noted cut frames
     timeline = media_pool.CreateEmptyTimeline(tape_id)
     assert timeline
 
     for video, media_pool_item in zip(videos, media_pool_items):
-        print('Adding %s with %d cut frame marker(s)...' % (media_pool_item.GetName(), len(video['cut_frames'])))
+        print('Adding %s with %d cut frame marker(s) and %d other marker(s)...' % (media_pool_item.GetName(), len(video['cut_frames']), len(video.get('markers', []))))
         ok = media_pool.AppendToTimeline(media_pool_item)
         assert ok
         timeline_item = timeline.GetItemListInTrack('video', 1)[-1]
@@ -321,67 +363,95 @@ def create_vhs_project(resolve, tape_id, videos):
         for frame_id in video['cut_frames']:
             ok = timeline_item.AddMarker(frame_id, 'Sand', 'cut', '', 1)
             assert ok
+        for marker in video.get('markers', []):
+            _add_interval_marker(timeline_item, marker)
 
     print('Ready for edit.')
 
 
-def export_vhs_project_to_json(resolve, dst_filepath):
-    # Grab the currently active project and timeline, and list all video clips in track 1
-    project = resolve.GetProjectManager().GetCurrentProject()
-    tape_id = project.GetName()
-    timeline = project.GetCurrentTimeline()
-    timeline_items = timeline.GetItemListInTrack('video', 1)
+def _add_interval_marker(timeline_item, marker):
+    # Interval markers are informational, and edit.py already moves them off of any frame
+    # that has a cut or another marker on it: if Resolve still won't take one (e.g. it
+    # falls past the end of the clip), it's not worth abandoning the whole project for
+    ok = timeline_item.AddMarker(marker['frame'], MARKER_COLORS_BY_KIND[marker['kind']], marker['kind'], '', marker['duration'])
+    if not ok:
+        print('WARNING: Could not add %s marker at frame %d of %s' % (marker['kind'], marker['frame'], timeline_item.GetName()))
 
-    # Make a first pass to validate that all clips are named appropriately, and to
-    # validate that each clip has a valid source video file on disk
-    for i, timeline_item in enumerate(timeline_items):
-        clip_num = i + 1
-        clip_slug = timeline_item.GetName()
 
-        media_pool_item = timeline_item.GetMediaPoolItem()
-        assert media_pool_item
-        if clip_slug == media_pool_item.GetName():
-            raise RuntimeError('video clip at index %d (%s) has not been renamed' % (i, clip_slug))
+def _frames_to_timecode(frame, fps=60):
+    # Format a frame number as a non-drop-frame HH:MM:SS:FF timecode, as Resolve does
+    # for source timecode when exporting timelines
+    return '%02d:%02d:%02d:%02d' % (frame // (fps * 3600), (frame // (fps * 60)) % 60, (frame // fps) % 60, frame % fps)
 
-        filepath = media_pool_item.GetClipProperty('File Path')
-        assert filepath
-        assert os.path.isfile(filepath)
 
-    # Export to CSV, then parse that CSV so we have the same data in-memory (bleh)
-    csv_clips = [] # (clip_name, source_in, source_out)
-    with tempfile.TemporaryDirectory() as tempdir:
-        random_suffix = binascii.b2a_hex(os.urandom(4)).decode('ascii')
-        csv_filename = '_%s_%s.csv' % (tape_id, random_suffix)
-        csv_filepath = os.path.join(tempdir, csv_filename)
-        ok = timeline.Export(csv_filepath, resolve.EXPORT_TEXT_CSV)
-        assert ok
+def _snapshot_timeline_items(timeline_items):
+    # Collect everything we need to know about each clip in a single pass, making as few
+    # scripting API calls as possible: details of each media pool item (and whether its
+    # file exists) are only fetched once, however many clips are cut from the same file
+    media_by_id = {}
+    clips = []
+    for timeline_item in timeline_items:
+        media_pool_item = timeline_item.GetMediaPoolItem()
+        assert media_pool_item
+        media_id = media_pool_item.GetMediaId()
+        media = media_by_id.get(media_id)
+        if media is None:
+            filepath = media_pool_item.GetClipProperty('File Path')
+            media = {
+                'name': media_pool_item.GetName(),
+                'filepath': filepath,
+                'exists': bool(filepath) and os.path.isfile(filepath),
+            }
+            media_by_id[media_id] = media
+
+        # The left offset is the number of source frames trimmed from the start of the
+        # clip, so the clip covers source frames [left_offset, left_offset + duration)
+        left_offset = int(timeline_item.GetLeftOffset())
+        duration = int(timeline_item.GetDuration())
+        clips.append({
+            'name': timeline_item.GetName(),
+            'media': media,
+            'source_in_frame': left_offset,
+            'source_out_frame': left_offset + duration,
+        })
+    return clips
 
-        with open(csv_filepath, 'r') as fp:
-            reader = csv.DictReader(fp)
-            video_clip_rows = [row for row in reader if row['V'] == 'V1']
-            for row in video_clip_rows:
-                csv_clips.append((row['Name'], row['Source In'], row['Source Out']))
-    
-    # Sanity-check that our CSV data lines up 1:1 with our video clips in the timeline
-    assert len(csv_clips) == len(timeline_items)
-    for csv_clip, timeline_item in zip(csv_clips, timeline_items):
-        clip_name, _, _ = csv_clip
-        assert timeline_item.GetName() == clip_name
 
-    # Write everything to JSON
+def get_vhs_project_data(resolve):
+    # Grab the currently active project and timeline, and take a snapshot of all video
+    # clips in track 1
+    project = resolve.GetProjectManager().GetCurrentProject()
+    tape_id = project.GetName()
+    timeline = project.GetCurrentTimeline()
+    clips = _snapshot_timeline_items(timeline.GetItemListInTrack('video', 1))
+
+    # Validate that all clips are named appropriately, and that each clip has a valid
+    # source video file on disk
+    for i, clip in enumerate(clips):
+        if clip['name'] == clip['media']['name']:
+            raise RuntimeError('video clip at index %d (%s) has not been renamed' % (i, clip['name']))
+        assert clip['media']['filepath']
+        assert clip['media']['exists']
+
+    # Collect everything into a JSON-serializable dict, with source in and out points
+    # expressed as timecode (at 60 fps, non-drop-frame, as in Resolve's CSV export)
     data = {
         'type': 'vhs-project',
         'version': 1,
         'name': tape_id,
         'clips': [],
     }
-    for i, timeline_item in enumerate(timeline_items):
-        clip_name, source_in, source_out = csv_clips[i]
+    for i, clip in enumerate(clips):
         data['clips'].append({
-            'src_filepath': timeline_item.GetMediaPoolItem().GetClipProperty('File Path'),
-            'dst_filename': '%s_%02d_%s.mp4' % (tape_id, i + 1, clip_name),
-            'in_timecode': source_in,
-            'out_timecode': source_out,
+            'src_filepath': clip['media']['filepath'],
+            'dst_filename': '%s_%02d_%s.mp4' % (tape_id, i + 1, clip['name']),
+            'in_timecode': _frames_to_timecode(clip['source_in_frame']),
+            'out_timecode': _frames_to_timecode(clip['source_out_frame']),
         })
+    return data
+
+
+def export_vhs_project_to_json(resolve, dst_filepath):
+    data = get_vhs_project_data(resolve)
     with open(dst_filepath, 'w') as fp:
         json.dump(data, fp, indent=4)
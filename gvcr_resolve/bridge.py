@@ -0,0 +1,140 @@
+import json
+import socket
+import threading
+import importlib
+import traceback
+import socketserver
+
+# The bridge listens on localhost only, on a fixed port that our client scripts know
+BRIDGE_HOST = '127.0.0.1'
+BRIDGE_PORT = 52381
+
+# Functions from the gvcr_resolve package that clients may call: each one takes the
+# resolve object as its first argument, followed by the args sent in the request
+BRIDGE_FUNCTION_NAMES = [
+    'create_vhs_project',
+    'create_shorts_project',
+    'get_vhs_project_data',
+]
+
+# Submodules of the gvcr_resolve package to reload (in this order, so that each one sees
+# the fresh versions of any it imports) before reloading the package itself, which
+# would otherwise keep using the versions it imported when it was first loaded. We
+# leave this module alone, since reloading it would orphan the running server.
+BRIDGE_RELOAD_SUBMODULE_NAMES = [
+    'fcpxml',
+    'drp',
+]
+
+# The server that's currently running in this process, if any
+_server: 'BridgeServer | None' = None
+
+
+class BridgeRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Serves newline-delimited JSON requests from a single client connection. Each request
+    is an object with 'id', 'method' and (optionally) 'args' keys, and each gets a single
+    response line with the same 'id' and either a 'result' or an 'error'.
+    """
+    def setup(self):
+        super().setup()
+        with self.server.connections_lock:
+            self.server.connections.add(self.connection)
+
+    def finish(self):
+        with self.server.connections_lock:
+            self.server.connections.discard(self.connection)
+        super().finish()
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                self._send({'id': None, 'error': 'invalid request: %s' % e})
+                continue
+            self._send(self.server.dispatch(request))
+
+    def _send(self, response: dict):
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+
+class BridgeServer(socketserver.ThreadingTCPServer):
+    """
+    Socket server that runs on a background thread inside Resolve's Python console,
+    calling our gvcr_resolve functions on behalf of scripts running elsewhere. Calls are
+    made one at a time, since the Resolve scripting API isn't safe to use concurrently.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, resolve, host: str = BRIDGE_HOST, port: int = BRIDGE_PORT):
+        super().__init__((host, port), BridgeRequestHandler)
+        self.resolve = resolve
+        self.call_lock = threading.Lock()
+        self.connections_lock = threading.Lock()
+        self.connections: set[socket.socket] = set()
+        self.thread: threading.Thread | None = None
+
+    def dispatch(self, request: dict) -> dict:
+        request_id = request.get('id')
+        method = request.get('method')
+        args = request.get('args', [])
+        if method == 'ping':
+            return {'id': request_id, 'result': 'pong'}
+        if method not in BRIDGE_FUNCTION_NAMES:
+            return {'id': request_id, 'error': 'unknown method: %s' % method}
+        if not isinstance(args, list):
+            return {'id': request_id, 'error': "'args' must be a list"}
+
+        # Reload our package before each call, just as resolve_exec does, so that any
+        # changes to our scripts take effect without restarting the bridge
+        with self.call_lock:
+            try:
+                for name in BRIDGE_RELOAD_SUBMODULE_NAMES:
+                    importlib.reload(importlib.import_module('%s.%s' % (__package__, name)))
+                package = importlib.reload(importlib.import_module(__package__))
+                result = getattr(package, method)(self.resolve, *args)
+            except Exception as e:
+                traceback.print_exc()
+                return {'id': request_id, 'error': '%s: %s' % (type(e).__name__, e), 'traceback': traceback.format_exc()}
+        return {'id': request_id, 'result': result}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='gvcr-bridge', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # Stop accepting connections, then hang up on any clients that are still
+        # connected, so that they'll reconnect to whichever bridge replaces this one
+        self.shutdown()
+        self.server_close()
+        with self.connections_lock:
+            for connection in self.connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+def start_bridge(resolve, host: str = BRIDGE_HOST, port: int = BRIDGE_PORT) -> BridgeServer:
+    """
+    Starts serving bridge requests in the background, replacing any bridge that was
+    already running in this process. Intended to be run once from Resolve's console.
+    """
+    global _server
+    stop_bridge()
+    _server = BridgeServer(resolve, host, port)
+    _server.start()
+    print('gvcr bridge listening on %s:%d' % _server.server_address[:2])
+    return _server
+
+
+def stop_bridge():
+    global _server
+    if _server is not None:
+        _server.stop()
+        _server = None
@@ -0,0 +1,141 @@
+import os
+import shutil
+import struct
+import zipfile
+from typing import Callable, Iterator
+
+# Flag bit indicating that a member's CRC and sizes follow its data, rather than being
+# in its local header: we always write them in the header when copying raw members
+_FLAG_DATA_DESCRIPTOR = 0x08
+
+# Size of the fixed-length portion of a ZIP local file header
+_LOCAL_HEADER_SIZE = 30
+
+# Number of bytes to read or write at a time when copying data
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _strip_zip64_extra(extra: bytes) -> bytes:
+    # Remove any ZIP64 extended information field (header ID 1) from a member's extra
+    # data, since zipfile adds a fresh one whenever it's needed
+    result = b''
+    i = 0
+    while i + 4 <= len(extra):
+        header_id, data_size = struct.unpack('<HH', extra[i:i+4])
+        if header_id != 1:
+            result += extra[i:i+4+data_size]
+        i += 4 + data_size
+    return result
+
+
+def copy_zip_member_raw(src_zip: zipfile.ZipFile, dst_zip: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """
+    Appends a member of src_zip to dst_zip by copying its compressed bytes directly,
+    without decompressing and recompressing them. dst_zip must be open for writing, with
+    no other member currently being written.
+    """
+    # Find the start of the member's data by reading the lengths of the variable-length
+    # fields in its local header, which may differ from those in the central directory
+    src_zip.fp.seek(info.header_offset)
+    header = src_zip.fp.read(_LOCAL_HEADER_SIZE)
+    if len(header) != _LOCAL_HEADER_SIZE or header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile('bad local file header for %s' % info.filename)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    src_zip.fp.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length)
+
+    # Write a fresh local header, with the CRC and sizes we already know, followed by the
+    # compressed data, then register the member so it's listed in the central directory
+    dst_info = zipfile.ZipInfo(info.filename, info.date_time)
+    dst_info.compress_type = info.compress_type
+    dst_info.comment = info.comment
+    dst_info.extra = _strip_zip64_extra(info.extra)
+    dst_info.create_system = info.create_system
+    dst_info.create_version = info.create_version
+    dst_info.extract_version = info.extract_version
+    dst_info.flag_bits = info.flag_bits & ~_FLAG_DATA_DESCRIPTOR
+    dst_info.internal_attr = info.internal_attr
+    dst_info.external_attr = info.external_attr
+    dst_info.CRC = info.CRC
+    dst_info.compress_size = info.compress_size
+    dst_info.file_size = info.file_size
+    dst_info.header_offset = dst_zip.fp.tell()
+    zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+    dst_zip.fp.write(dst_info.FileHeader(zip64))
+
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = src_zip.fp.read(min(remaining, _COPY_CHUNK_SIZE))
+        if not chunk:
+            raise zipfile.BadZipFile('truncated data for %s' % info.filename)
+        dst_zip.fp.write(chunk)
+        remaining -= len(chunk)
+
+    dst_zip.filelist.append(dst_info)
+    dst_zip.NameToInfo[dst_info.filename] = dst_info
+    dst_zip.start_dir = dst_zip.fp.tell()
+
+
+def patch_zip_member(zip_filepath: str, member_name: str, edit_lines: Callable[[Iterator[bytes]], Iterator[bytes]]):
+    """
+    Rewrites a single member of the ZIP archive at zip_filepath, streaming its lines
+    (with line endings intact) through edit_lines and writing out the lines it yields.
+    Once edit_lines returns, any lines it didn't consume are copied through unchanged.
+    Every other member is copied without being recompressed, and the updated archive
+    atomically replaces the original once it's complete.
+    """
+    tmp_filepath = zip_filepath + '.tmp'
+    try:
+        with zipfile.ZipFile(zip_filepath) as src_zip, zipfile.ZipFile(tmp_filepath, 'w') as dst_zip:
+            for info in src_zip.infolist():
+                if info.filename != member_name:
+                    copy_zip_member_raw(src_zip, dst_zip, info)
+                    continue
+
+                dst_info = zipfile.ZipInfo(info.filename, info.date_time)
+                dst_info.compress_type = info.compress_type
+                dst_info.external_attr = info.external_attr
+                with src_zip.open(info) as src_fp, dst_zip.open(dst_info, 'w', force_zip64=info.file_size > zipfile.ZIP64_LIMIT // 2) as dst_fp:
+                    # Buffer up the edited lines so we're not compressing tiny writes
+                    buffer = bytearray()
+                    for line in edit_lines(iter(src_fp)):
+                        buffer += line
+                        if len(buffer) >= _COPY_CHUNK_SIZE:
+                            dst_fp.write(buffer)
+                            buffer.clear()
+                    dst_fp.write(buffer)
+                    shutil.copyfileobj(src_fp, dst_fp, _COPY_CHUNK_SIZE)
+        os.replace(tmp_filepath, zip_filepath)
+    finally:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+
+
+def extend_clip_duration_in_drp(drp_filepath: str, video_item_name: str, duration: int):
+    """
+    Modifies the timeline in an exported Resolve project (.drp) so that the first clip
+    with the given name has the given duration.
+    """
+    # The .drp file is a ZIP archive containing a few files describing the Resolve
+    # project: we should have exactly one timeline, with a SeqContainer/<uuid>.xml file
+    with zipfile.ZipFile(drp_filepath) as drp_file:
+        sequence_file_paths = [f for f in drp_file.namelist() if f.startswith('SeqContainer/') and f.endswith('.xml')]
+    if len(sequence_file_paths) != 1:
+        raise RuntimeError('Expected 1 SeqContainer/*.xml file in %s; got %d' % (drp_filepath, len(sequence_file_paths)))
+
+    # Process that XML document as plain-text, line-by-line, changing only the duration
+    # of the clip that matches the desired name
+    name_line = ('<Name>%s</Name>' % video_item_name).encode()
+
+    def edit_lines(lines: Iterator[bytes]) -> Iterator[bytes]:
+        has_seen_clip_name = False
+        for line in lines:
+            if has_seen_clip_name and b'<Duration>' in line and b'</Duration>' in line:
+                content = line.rstrip(b'\r\n')
+                line = content[:content.index(b'>')+1] + str(duration).encode() + b'</Duration>' + line[len(content):]
+                yield line
+                return
+            if name_line in line:
+                has_seen_clip_name = True
+            yield line
+
+    patch_zip_member(drp_filepath, sequence_file_paths[0], edit_lines)
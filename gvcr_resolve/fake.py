@@ -0,0 +1,495 @@
+import os
+import csv
+import time
+import itertools
+import threading
+import collections
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from xml.etree import ElementTree as ET
+
+from .fcpxml import parse_fcpxml_time
+
+# A pure-Python stand-in for the parts of the DaVinci Resolve scripting API that our
+# scripts use, so that they (and the bridge that serves them) can be run headless,
+# without Resolve. Clips are modeled just well enough for our own scripts: media pool
+# items know their file path and frame count, timelines hold items on numbered tracks,
+# and Timeline.Export writes the same CSV columns that Resolve does.
+
+# Resolve's default start timecode for new timelines is 01:00:00:00
+FAKE_TIMELINE_START_FRAME = 60 * 60 * 60
+
+# Frame count assumed for any file that isn't given an explicit count
+FAKE_DEFAULT_CLIP_FRAMES = 60 * 60 * 10
+
+# Frame size reported for every clip
+FAKE_CLIP_RESOLUTION = '1920x1080'
+
+
+class FakeApiStats:
+    """
+    Counts the scripting API calls made to a fake Resolve object graph, keyed by
+    '<Class>.<Method>', and adds up the time those calls would take given a fixed
+    latency per call, which can be overridden for individual methods (e.g.
+    {'Timeline.Export': 0.5}). If sleep is set, each call also actually takes that long.
+    Only calls made from outside the fake are counted.
+    """
+    def __init__(self, latency: float = 0.0, latency_by_method: dict[str, float] | None = None, sleep: bool = False):
+        self.latency = latency
+        self.latency_by_method = dict(latency_by_method or {})
+        self.sleep = sleep
+        self.calls: collections.Counter[str] = collections.Counter()
+        self.simulated_seconds = 0.0
+        self.local = threading.local()
+
+    @property
+    def num_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset(self):
+        self.calls.clear()
+        self.simulated_seconds = 0.0
+
+    def record(self, method_name: str):
+        latency = self.latency_by_method.get(method_name, self.latency)
+        self.calls[method_name] += 1
+        self.simulated_seconds += latency
+        if self.sleep and latency > 0.0:
+            time.sleep(latency)
+
+
+class _FakeApiObject:
+    # Base class for our fake API objects: any call to a capitalized method (i.e. one
+    # that's part of the Resolve API) is recorded in the shared stats, unless it's made
+    # by the fake itself while handling another call
+    stats: FakeApiStats
+
+    def __getattribute__(self, name):
+        attr = object.__getattribute__(self, name)
+        if not name[:1].isupper() or not callable(attr):
+            return attr
+
+        stats = object.__getattribute__(self, 'stats')
+        method_name = '%s.%s' % (type(self).__name__.removeprefix('Fake'), name)
+
+        def call(*args, **kwargs):
+            depth = getattr(stats.local, 'depth', 0)
+            if depth == 0:
+                stats.record(method_name)
+            stats.local.depth = depth + 1
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                stats.local.depth = depth
+        return call
+
+
+def _frames_to_timecode(frame: int, fps: int = 60) -> str:
+    return '%02d:%02d:%02d:%02d' % (frame // (fps * 3600), (frame // (fps * 60)) % 60, (frame // fps) % 60, frame % fps)
+
+
+class FakeMediaPoolItem(_FakeApiObject):
+    _next_id = itertools.count(1)
+
+    def __init__(self, filepath: str, num_frames: int, stats: FakeApiStats):
+        self.stats = stats
+        self.filepath = filepath
+        self.num_frames = num_frames
+        self.media_id = 'fake-media-%d' % next(self._next_id)
+
+    def GetName(self):
+        return os.path.basename(self.filepath)
+
+    def GetMediaId(self):
+        return self.media_id
+
+    def GetClipProperty(self, key=None):
+        props = {
+            'File Path': self.filepath,
+            'Clip Name': self.GetName(),
+            'Frames': str(self.num_frames),
+            'FPS': '59.94',
+            'Resolution': FAKE_CLIP_RESOLUTION,
+            'Duration': _frames_to_timecode(self.num_frames),
+        }
+        if key is None:
+            return props
+        return props.get(key, '')
+
+
+class FakeTimelineItem(_FakeApiObject):
+    def __init__(self, media_pool_item: FakeMediaPoolItem, media_type: str, start: int, left_offset: int, duration: int):
+        self.stats = media_pool_item.stats
+        self.media_pool_item = media_pool_item
+        self.media_type = media_type
+        self.name = media_pool_item.GetName()
+        self.start = start
+        self.left_offset = left_offset
+        self.duration = duration
+        self.markers: dict[int, dict] = {}
+        self.properties: dict[str, float] = {}
+
+    def GetName(self):
+        return self.name
+
+    def SetName(self, name):
+        self.name = name
+        return True
+
+    def GetMediaPoolItem(self):
+        return self.media_pool_item
+
+    def GetStart(self):
+        return self.start
+
+    def GetEnd(self):
+        return self.start + self.duration
+
+    def GetDuration(self):
+        return self.duration
+
+    def GetLeftOffset(self):
+        return self.left_offset
+
+    def GetRightOffset(self):
+        return self.media_pool_item.num_frames - (self.left_offset + self.duration)
+
+    def AddMarker(self, frame_id, color, name, note, duration, custom_data=''):
+        if frame_id in self.markers or not 0 <= frame_id < self.duration:
+            return False
+        self.markers[frame_id] = {'color': color, 'duration': duration, 'note': note, 'name': name, 'customData': custom_data}
+        return True
+
+    def GetMarkers(self):
+        return dict(self.markers)
+
+    def SetProperty(self, key, value):
+        self.properties[key] = value
+        return True
+
+    def GetProperty(self, key=None):
+        if key is None:
+            return dict(self.properties)
+        return self.properties.get(key)
+
+
+class FakeTimeline(_FakeApiObject):
+    def __init__(self, name: str, stats: FakeApiStats):
+        self.stats = stats
+        self.name = name
+        self.tracks: dict[str, list[list[FakeTimelineItem]]] = {'video': [[]], 'audio': [[]]}
+        self.markers: dict[int, dict] = {}
+        self.linked_groups: list[list[FakeTimelineItem]] = []
+
+    def GetName(self):
+        return self.name
+
+    def GetStartFrame(self):
+        return FAKE_TIMELINE_START_FRAME
+
+    def GetEndFrame(self):
+        ends = [item.GetEnd() for items in self.tracks.values() for track in items for item in track]
+        return max(ends, default=FAKE_TIMELINE_START_FRAME)
+
+    def GetTrackCount(self, track_type):
+        return len(self.tracks.get(track_type, []))
+
+    def AddTrack(self, track_type, sub_track_type=None):
+        if track_type not in self.tracks:
+            return False
+        self.tracks[track_type].append([])
+        return True
+
+    def GetItemListInTrack(self, track_type, index):
+        tracks = self.tracks.get(track_type, [])
+        if not 1 <= index <= len(tracks):
+            return None
+        return list(tracks[index - 1])
+
+    def AddMarker(self, frame_id, color, name, note, duration, custom_data=''):
+        if frame_id in self.markers:
+            return False
+        self.markers[frame_id] = {'color': color, 'duration': duration, 'note': note, 'name': name, 'customData': custom_data}
+        return True
+
+    def GetMarkers(self):
+        return dict(self.markers)
+
+    def SetClipsLinked(self, items, linked):
+        if linked:
+            self.linked_groups.append(list(items))
+        return True
+
+    def Export(self, filepath, export_type, export_subtype=None):
+        if export_type != FakeResolve.EXPORT_TEXT_CSV:
+            return False
+        with open(filepath, 'w', newline='') as fp:
+            writer = csv.DictWriter(fp, fieldnames=['#', 'Reel', 'Match', 'V', 'C', 'Dissolve', 'Source In', 'Source Out', 'Record In', 'Record Out', 'Name'])
+            writer.writeheader()
+            row_num = 1
+            for track_type, prefix in (('video', 'V'), ('audio', 'A')):
+                for track_index, track in enumerate(self.tracks[track_type]):
+                    for item in track:
+                        writer.writerow({
+                            '#': row_num,
+                            'Reel': '',
+                            'Match': '',
+                            'V': '%s%d' % (prefix, track_index + 1),
+                            'C': 'C',
+                            'Dissolve': '',
+                            'Source In': _frames_to_timecode(item.left_offset),
+                            'Source Out': _frames_to_timecode(item.left_offset + item.duration),
+                            'Record In': _frames_to_timecode(item.start),
+                            'Record Out': _frames_to_timecode(item.GetEnd()),
+                            'Name': item.GetName(),
+                        })
+                        row_num += 1
+        return True
+
+    def _append(self, media_pool_item: FakeMediaPoolItem, track_type: str, track_index: int, left_offset: int, duration: int, record_frame: int | None) -> FakeTimelineItem | None:
+        if not 1 <= track_index <= len(self.tracks[track_type]):
+            return None
+        track = self.tracks[track_type][track_index - 1]
+        if record_frame is None:
+            # Like Resolve, append after the last clip in video track 1, or at the start
+            # of the timeline if that track is empty
+            video_1 = self.tracks['video'][0]
+            record_frame = video_1[-1].GetEnd() if video_1 else FAKE_TIMELINE_START_FRAME
+        item = FakeTimelineItem(media_pool_item, track_type, record_frame, left_offset, duration)
+        track.append(item)
+        track.sort(key=lambda x: x.start)
+        return item
+
+
+class FakeMediaPool(_FakeApiObject):
+    MEDIA_TYPE_VIDEO_ONLY = 1
+    MEDIA_TYPE_AUDIO_ONLY = 2
+
+    def __init__(self, project: 'FakeProject'):
+        self.stats = project.stats
+        self.project = project
+        self.items: list[FakeMediaPoolItem] = []
+
+    def CreateEmptyTimeline(self, name):
+        if any(t.GetName() == name for t in self.project.timelines):
+            return None
+        timeline = FakeTimeline(name, self.stats)
+        self.project.timelines.append(timeline)
+        self.project.current_timeline = timeline
+        return timeline
+
+    def ImportTimelineFromFile(self, filepath, options=None):
+        # Only FCPXML is supported, and only as much of it as our own generator writes:
+        # every clip must refer to a file that's already in the media pool
+        options = options or {}
+        try:
+            root = ET.parse(filepath).getroot()
+        except (OSError, ET.ParseError):
+            return None
+        if root.tag != 'fcpxml':
+            return None
+
+        items_by_path = {os.path.normcase(item.filepath): item for item in self.items}
+        items_by_asset_id = {}
+        for asset in root.iter('asset'):
+            media_rep = asset.find('media-rep')
+            src = media_rep.get('src') if media_rep is not None else asset.get('src')
+            path = url2pathname(urlparse(src).path)
+            item = items_by_path.get(os.path.normcase(path))
+            if item is None:
+                return None
+            items_by_asset_id[asset.get('id')] = item
+
+        # All times are in frames of the sequence format's frame duration
+        sequence = root.find('./library/event/project/sequence')
+        frame_duration_value = root.find("./resources/format[@id='%s']" % sequence.get('format')).get('frameDuration')
+        numerator, _, denominator = frame_duration_value[:-1].partition('/')
+        frame_duration = (int(numerator), int(denominator or 1))
+
+        def parse_time(value):
+            return parse_fcpxml_time(value, frame_duration)
+
+        name = options.get('timelineName') or root.find('./library/event/project').get('name')
+        timeline = self.CreateEmptyTimeline(name)
+        if timeline is None:
+            return None
+
+        def add_clip(element, track_index, record_frame):
+            media_pool_item = items_by_asset_id[element.get('ref')]
+            start = parse_time(element.get('start', '0s'))
+            duration = parse_time(element.get('duration'))
+            while timeline.GetTrackCount('video') < track_index:
+                timeline.AddTrack('video')
+            item = timeline._append(media_pool_item, 'video', track_index, start, duration, record_frame)
+            if element.tag == 'asset-clip' and element.get('srcEnable', 'all') != 'video':
+                while timeline.GetTrackCount('audio') < track_index:
+                    timeline.AddTrack('audio')
+                timeline._append(media_pool_item, 'audio', track_index, start, duration, record_frame)
+            item.SetName(element.get('name', item.GetName()))
+            for marker in element.findall('marker'):
+                frame_id = parse_time(marker.get('start')) - start
+                item.AddMarker(frame_id, 'Blue', marker.get('value', ''), marker.get('note', ''), parse_time(marker.get('duration')))
+
+            # Connected clips are offset in this clip's source time
+            for child in element:
+                if child.tag in ('asset-clip', 'video'):
+                    child_record_frame = record_frame + parse_time(child.get('offset')) - start
+                    add_clip(child, track_index + int(child.get('lane', '0')), child_record_frame)
+
+        for element in sequence.find('spine'):
+            if element.tag in ('asset-clip', 'video'):
+                add_clip(element, 1, parse_time(element.get('offset')))
+        return timeline
+
+    def AppendToTimeline(self, items):
+        timeline = self.project.current_timeline
+        if timeline is None:
+            return False
+        if not isinstance(items, list):
+            items = [items]
+
+        results = []
+        for clip_info in items:
+            if isinstance(clip_info, FakeMediaPoolItem):
+                clip_info = {'mediaPoolItem': clip_info}
+            media_pool_item = clip_info['mediaPoolItem']
+            start_frame = clip_info.get('startFrame', 0)
+            end_frame = clip_info.get('endFrame', media_pool_item.num_frames - 1)
+            duration = end_frame - start_frame + 1
+            track_index = clip_info.get('trackIndex', 1)
+            record_frame = clip_info.get('recordFrame')
+            media_type = clip_info.get('mediaType')
+            if media_type != self.MEDIA_TYPE_AUDIO_ONLY:
+                item = timeline._append(media_pool_item, 'video', track_index, start_frame, duration, record_frame)
+                if item is None:
+                    return False
+                results.append(item)
+                record_frame = item.GetStart()
+            if media_type != self.MEDIA_TYPE_VIDEO_ONLY:
+                item = timeline._append(media_pool_item, 'audio', track_index, start_frame, duration, record_frame)
+                if item is None:
+                    return False
+                if media_type == self.MEDIA_TYPE_AUDIO_ONLY:
+                    results.append(item)
+        return results
+
+
+class FakeProject(_FakeApiObject):
+    def __init__(self, name: str, stats: FakeApiStats):
+        self.stats = stats
+        self.name = name
+        self.media_pool = FakeMediaPool(self)
+        self.timelines: list[FakeTimeline] = []
+        self.current_timeline: FakeTimeline | None = None
+
+    def GetName(self):
+        return self.name
+
+    def GetMediaPool(self):
+        return self.media_pool
+
+    def GetCurrentTimeline(self):
+        return self.current_timeline
+
+    def SetCurrentTimeline(self, timeline):
+        if timeline not in self.timelines:
+            return False
+        self.current_timeline = timeline
+        return True
+
+    def GetTimelineCount(self):
+        return len(self.timelines)
+
+    def GetTimelineByIndex(self, index):
+        if not 1 <= index <= len(self.timelines):
+            return None
+        return self.timelines[index - 1]
+
+
+class FakeProjectManager(_FakeApiObject):
+    def __init__(self, stats: FakeApiStats):
+        self.stats = stats
+        self.projects: dict[str, FakeProject] = {'_blank': FakeProject('_blank', stats)}
+        self.current_project = self.projects['_blank']
+
+    def GetCurrentProject(self):
+        return self.current_project
+
+    def CreateProject(self, name):
+        if name in self.projects:
+            return None
+        self.projects[name] = FakeProject(name, self.stats)
+        self.current_project = self.projects[name]
+        return self.current_project
+
+    def ImportProject(self, filepath, project_name=None):
+        # We don't parse .drp files: importing one just creates an empty project
+        if not os.path.isfile(filepath):
+            return False
+        name = project_name or os.path.splitext(os.path.basename(filepath))[0]
+        if name in self.projects:
+            return False
+        self.projects[name] = FakeProject(name, self.stats)
+        return True
+
+    def LoadProject(self, name):
+        project = self.projects.get(name)
+        if project is not None:
+            self.current_project = project
+        return project
+
+    def SaveProject(self):
+        return True
+
+    def DeleteProject(self, name):
+        if name not in self.projects or self.projects[name] is self.current_project:
+            return False
+        del self.projects[name]
+        return True
+
+
+class FakeMediaStorage(_FakeApiObject):
+    def __init__(self, resolve: 'FakeResolve'):
+        self.stats = resolve.stats
+        self.resolve = resolve
+
+    def AddItemListToMediaPool(self, paths):
+        if isinstance(paths, str):
+            paths = [paths]
+        media_pool = self.resolve.project_manager.GetCurrentProject().GetMediaPool()
+        items = []
+        for path in paths:
+            if not os.path.isfile(path):
+                continue
+            num_frames = self.resolve.clip_frames.get(path, FAKE_DEFAULT_CLIP_FRAMES)
+            item = FakeMediaPoolItem(path, num_frames, self.stats)
+            media_pool.items.append(item)
+            items.append(item)
+        return items
+
+
+class FakeResolve(_FakeApiObject):
+    """
+    Fake top-level Resolve object. clip_frames optionally maps file paths to the number
+    of frames that Resolve should report for each clip, and stats (if given) is used to
+    count API calls and simulate their latency.
+    """
+    EXPORT_TEXT_CSV = 'csv'
+
+    def __init__(self, clip_frames: dict[str, int] | None = None, stats: FakeApiStats | None = None):
+        self.stats = stats or FakeApiStats()
+        self.clip_frames = dict(clip_frames or {})
+        self.project_manager = FakeProjectManager(self.stats)
+        self.media_storage = FakeMediaStorage(self)
+
+    def GetProjectManager(self):
+        return self.project_manager
+
+    def GetMediaStorage(self):
+        return self.media_storage
+
+    def GetProductName(self):
+        return 'DaVinci Resolve (fake)'
+
+    def GetVersionString(self):
+        return '0.0.0'
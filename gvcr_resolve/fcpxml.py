@@ -0,0 +1,172 @@
+import pathlib
+import itertools
+from dataclasses import dataclass, field
+from xml.etree import ElementTree as ET
+
+# Our captured VHS footage is 59.94 fps: FCPXML expresses times as rational numbers of
+# seconds, so every time we write is a whole number of frames of this duration
+NTSC_DROP_FRAME_DURATION = (1001, 60000)
+
+# Timelines in Resolve start at 01:00:00:00 by default
+DEFAULT_TIMELINE_START_FRAME = 60 * 60 * 60
+
+
+@dataclass
+class FcpxmlMarker:
+    frame: int
+    name: str
+    duration: int = 1
+    note: str = ''
+
+
+@dataclass
+class FcpxmlClip:
+    """
+    A clip in a generated timeline. Clips in the list passed to build_timeline_fcpxml
+    are laid end-to-end on track 1; each may have connected_clips, which start at the
+    same time as their parent and are placed `lane` tracks above it. A clip with
+    video_only set contributes no audio, and a still image has no frames of its own
+    (num_frames is 0), so it must be given an explicit end_frame. width and height give
+    the frame size of the source file, if known; otherwise it's assumed to match the
+    timeline.
+    """
+    path: str
+    num_frames: int
+    name: str = ''
+    start_frame: int = 0
+    end_frame: int | None = None
+    markers: list[FcpxmlMarker] = field(default_factory=list)
+    lane: int = 0
+    video_only: bool = False
+    is_still: bool = False
+    width: int | None = None
+    height: int | None = None
+    connected_clips: list['FcpxmlClip'] = field(default_factory=list)
+
+    def get_name(self) -> str:
+        return self.name or pathlib.PurePath(self.path).name
+
+    def get_duration(self) -> int:
+        end_frame = self.end_frame if self.end_frame is not None else self.num_frames
+        return end_frame - self.start_frame
+
+
+def format_fcpxml_time(num_frames: int, frame_duration: tuple[int, int] = NTSC_DROP_FRAME_DURATION) -> str:
+    """
+    Formats a number of frames as an FCPXML time value, e.g. '1001/60000s' for 1 frame.
+    """
+    numerator, denominator = frame_duration
+    if num_frames == 0:
+        return '0s'
+    return '%d/%ds' % (num_frames * numerator, denominator)
+
+
+def parse_fcpxml_time(value: str, frame_duration: tuple[int, int] = NTSC_DROP_FRAME_DURATION) -> int:
+    """
+    Parses an FCPXML time value (e.g. '1001/60000s' or '3600s'), returning the nearest
+    whole number of frames.
+    """
+    if not value.endswith('s'):
+        raise ValueError('invalid FCPXML time value: %s' % value)
+    numerator, _, denominator = value[:-1].partition('/')
+    frame_numerator, frame_denominator = frame_duration
+    return round((int(numerator) * frame_denominator) / (int(denominator or 1) * frame_numerator))
+
+
+def _iter_clips_recursive(clips: list[FcpxmlClip]):
+    for clip in clips:
+        yield clip
+        yield from _iter_clips_recursive(clip.connected_clips)
+
+
+def _add_clip_element(parent: ET.Element, clip: FcpxmlClip, offset: int, asset_ids_by_path: dict[str, str], format_ids_by_path: dict[str, str], frame_duration: tuple[int, int]):
+    # Stills are placed with a <video> element; everything else is an <asset-clip>
+    attrs = {
+        'ref': asset_ids_by_path[clip.path],
+        'name': clip.get_name(),
+        'offset': format_fcpxml_time(offset, frame_duration),
+        'start': format_fcpxml_time(clip.start_frame, frame_duration),
+        'duration': format_fcpxml_time(clip.get_duration(), frame_duration),
+    }
+    if clip.lane:
+        attrs['lane'] = str(clip.lane)
+    if clip.is_still:
+        element = ET.SubElement(parent, 'video', attrs)
+    else:
+        attrs['format'] = format_ids_by_path[clip.path]
+        attrs['tcFormat'] = 'NDF'
+        if clip.video_only:
+            attrs['srcEnable'] = 'video'
+        element = ET.SubElement(parent, 'asset-clip', attrs)
+
+    # Marker times are in the clip's source time, not the timeline's
+    for marker in sorted(clip.markers, key=lambda m: m.frame):
+        marker_attrs = {
+            'start': format_fcpxml_time(clip.start_frame + marker.frame, frame_duration),
+            'duration': format_fcpxml_time(marker.duration, frame_duration),
+            'value': marker.name,
+        }
+        if marker.note:
+            marker_attrs['note'] = marker.note
+        ET.SubElement(element, 'marker', marker_attrs)
+
+    # Connected clips are positioned in their parent's source time, so an offset equal
+    # to the parent's start lines them up with the start of the parent
+    for connected_clip in clip.connected_clips:
+        _add_clip_element(element, connected_clip, clip.start_frame, asset_ids_by_path, format_ids_by_path, frame_duration)
+
+
+def build_timeline_fcpxml(timeline_name: str, clips: list[FcpxmlClip], width: int, height: int, frame_duration: tuple[int, int] = NTSC_DROP_FRAME_DURATION, start_frame: int = DEFAULT_TIMELINE_START_FRAME) -> str:
+    """
+    Returns the text of an FCPXML document describing a single timeline that contains
+    the given clips, laid end-to-end on track 1, along with any clips connected to them
+    and all of their markers. Times are all whole frames at the given frame duration.
+    """
+    root = ET.Element('fcpxml', version='1.9')
+    resources = ET.SubElement(root, 'resources')
+    ET.SubElement(resources, 'format', id='r0', frameDuration=format_fcpxml_time(1, frame_duration), width=str(width), height=str(height))
+
+    # Declare an asset for each distinct source file. Each video asset refers to a format
+    # with its own frame size, so that Resolve doesn't take it to be the same size as the
+    # timeline (formats for sources that match the timeline just reuse its format).
+    # Stills are left without a format, so Resolve takes their size from the image.
+    asset_ids_by_path: dict[str, str] = {}
+    format_ids_by_path: dict[str, str] = {}
+    format_ids_by_size = {(width, height): 'r0'}
+    resource_ids = ('r%d' % i for i in itertools.count(1))
+    for clip in _iter_clips_recursive(clips):
+        if clip.path in asset_ids_by_path:
+            continue
+        asset_attrs = {}
+        if not clip.is_still:
+            size = (clip.width, clip.height) if clip.width and clip.height else (width, height)
+            if size not in format_ids_by_size:
+                format_ids_by_size[size] = next(resource_ids)
+                ET.SubElement(resources, 'format', id=format_ids_by_size[size], frameDuration=format_fcpxml_time(1, frame_duration), width=str(size[0]), height=str(size[1]))
+            format_ids_by_path[clip.path] = format_ids_by_size[size]
+            asset_attrs['format'] = format_ids_by_size[size]
+        asset_id = next(resource_ids)
+        asset_ids_by_path[clip.path] = asset_id
+        asset = ET.SubElement(resources, 'asset', id=asset_id, name=pathlib.PurePath(clip.path).name, start='0s', duration=format_fcpxml_time(clip.num_frames, frame_duration), hasVideo='1', hasAudio='0' if clip.is_still else '1', **asset_attrs)
+        ET.SubElement(asset, 'media-rep', kind='original-media', src=pathlib.Path(clip.path).absolute().as_uri())
+
+    # Lay out our clips sequentially in the timeline's primary storyline, starting at
+    # the timeline's start timecode
+    library = ET.SubElement(root, 'library')
+    event = ET.SubElement(library, 'event', name=timeline_name)
+    project = ET.SubElement(event, 'project', name=timeline_name)
+    total_frames = sum(clip.get_duration() for clip in clips)
+    sequence = ET.SubElement(project, 'sequence', format='r0', tcStart=format_fcpxml_time(start_frame, frame_duration), tcFormat='NDF', duration=format_fcpxml_time(total_frames, frame_duration))
+    spine = ET.SubElement(sequence, 'spine')
+    offset = start_frame
+    for clip in clips:
+        _add_clip_element(spine, clip, offset, asset_ids_by_path, format_ids_by_path, frame_duration)
+        offset += clip.get_duration()
+
+    ET.indent(root)
+    return '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE fcpxml>\n' + ET.tostring(root, encoding='unicode') + '\n'
+
+
+def write_timeline_fcpxml(filepath: str, timeline_name: str, clips: list[FcpxmlClip], width: int, height: int, frame_duration: tuple[int, int] = NTSC_DROP_FRAME_DURATION, start_frame: int = DEFAULT_TIMELINE_START_FRAME):
+    with open(filepath, 'w', encoding='utf-8') as fp:
+        fp.write(build_timeline_fcpxml(timeline_name, clips, width, height, frame_duration, start_frame))
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+from .core import Box
+
+# Default limit on the total size of frames held in memory by a FrameCache
+DEFAULT_MEMORY_BUDGET = 1024 * 1024 * 1024
+
+
+class FrameCache:
+    """
+    Holds a sequence of decoded frames, keeping as many in memory as will fit within
+    memory_budget bytes and spilling the rest to .npy files in a temporary directory,
+    which is created the first time it's needed and deleted when the cache is closed.
+
+    Each frame is stored trimmed to the bounding box of its nonzero pixels (across all
+    channels), along with that box, so a mostly-empty frame costs very little to keep.
+    Since every pixel outside that box is zero, get() can still reproduce any region of
+    the original frame exactly.
+    """
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self.spill_dirpath: str | None = None
+        self.frames: list[tuple[Box, np.ndarray | str]] = []
+        self.shape: tuple[int, ...] | None = None
+        self.dtype: np.dtype | None = None
+
+    def __enter__(self) -> 'FrameCache':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def num_spilled(self) -> int:
+        return sum(1 for _, data in self.frames if isinstance(data, str))
+
+    def append(self, im: np.ndarray):
+        """
+        Adds a frame to the end of the cache. All frames must share the same shape and
+        dtype.
+        """
+        if self.shape is None:
+            self.shape, self.dtype = im.shape, im.dtype
+        assert im.shape == self.shape and im.dtype == self.dtype
+
+        # Trim the frame down to the region that actually has any content in it, copying
+        # that region so we don't hold on to the rest of the decoded image
+        content_box = _get_content_box(im)
+        data = im[content_box.y:content_box.y+content_box.h, content_box.x:content_box.x+content_box.w].copy()
+
+        # Keep the frame in memory if we have room for it; otherwise write it to disk
+        if self.memory_used + data.nbytes <= self.memory_budget:
+            self.memory_used += data.nbytes
+            self.frames.append((content_box, data))
+        else:
+            if self.spill_dirpath is None:
+                self.spill_dirpath = tempfile.mkdtemp(prefix='framecache-')
+            spill_filepath = os.path.join(self.spill_dirpath, '%06d.npy' % len(self.frames))
+            np.save(spill_filepath, data)
+            self.frames.append((content_box, spill_filepath))
+
+    def get(self, index: int, box: Box | None = None) -> np.ndarray:
+        """
+        Returns the frame at the given index, cropped to box if given, as a new array.
+        """
+        if box is None:
+            box = Box(x=0, y=0, w=self.shape[1], h=self.shape[0])
+        content_box, data = self.frames[index]
+        if isinstance(data, str):
+            data = np.load(data)
+
+        # Start with an empty image, then copy in whatever part of the frame's content
+        # overlaps the requested box
+        im = np.zeros((box.h, box.w) + self.shape[2:], self.dtype)
+        left = max(box.x, content_box.x)
+        top = max(box.y, content_box.y)
+        right = min(box.x + box.w, content_box.x + content_box.w)
+        bottom = min(box.y + box.h, content_box.y + content_box.h)
+        if left < right and top < bottom:
+            im[top-box.y:bottom-box.y, left-box.x:right-box.x] = data[top-content_box.y:bottom-content_box.y, left-content_box.x:right-content_box.x]
+        return im
+
+    def close(self):
+        self.frames.clear()
+        self.memory_used = 0
+        if self.spill_dirpath is not None:
+            shutil.rmtree(self.spill_dirpath, ignore_errors=True)
+            self.spill_dirpath = None
+
+
+def _get_content_box(im: np.ndarray) -> Box:
+    # For 8-bit images, treat each row's channel values as a single row of bytes, so
+    # OpenCV can find the nonzero extents without us building a separate mask, then
+    # convert the byte offsets we get back into pixel offsets
+    if im.dtype == np.uint8 and im.flags.c_contiguous:
+        num_channels = im.shape[2] if im.ndim == 3 else 1
+        x, y, w, h = cv2.boundingRect(im.reshape(im.shape[0], -1))
+        left = x // num_channels
+        right = (x + w + num_channels - 1) // num_channels
+        return Box(x=left, y=y, w=right - left, h=h)
+
+    content = np.any(im, axis=2) if im.ndim == 3 else im != 0
+    x, y, w, h = cv2.boundingRect(content.view(np.uint8))
+    return Box(x=x, y=y, w=w, h=h)
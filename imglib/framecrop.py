@@ -5,39 +5,75 @@ import cv2
 import numpy as np
 
 from .core import Box
+from .framecache import DEFAULT_MEMORY_BUDGET, FrameCache
+from .frameio import FrameWriter, read_frames
 
 
-def crop_frames(input_dirpath: str, output_dirpath: str, output_filename_prefix: str):
+def crop_frames(input_dirpath: str, output_dirpath: str, output_filename_prefix: str, memory_budget: int = DEFAULT_MEMORY_BUDGET, num_workers: int | None = None):
     """
     Collects all frame images in input_dirpath, computes a bounding box that will fit
     the full extents of every frame's alpha channel, then crops each frame to that box
     and writes it to output_dirpath as '<output_filename_prefix>.####.png', with the
-    first frame starting at 0000.
+    first frame starting at 0000. Each frame is only decoded once: decoded frames are
+    held in memory until the bounding box is known, up to memory_budget bytes, beyond
+    which they're spilled to a temporary directory. Frames are read and written on
+    num_workers threads (by default, one per CPU core).
+    """
+    with FrameCache(memory_budget) as cache:
+        box = load_frames_to_crop(input_dirpath, cache, num_workers)
+        write_cropped_frames(cache, box, output_dirpath, output_filename_prefix, num_workers)
+
+
+def load_frames_to_crop(input_dirpath: str, cache: FrameCache, num_workers: int | None = None) -> Box:
+    """
+    Reads every frame image in input_dirpath into cache, returning a bounding box that
+    will fit the full extents of every frame's alpha channel: cache.get(i, box) will
+    then return the cropped copy of frame i.
     """
     # Get a list of frames in the input directory (which we assume to only contain
     # per-frame images; no other files or directories)
     filenames = sorted(os.listdir(input_dirpath))
     filepaths = [os.path.join(input_dirpath, f) for f in filenames]
 
-    # Compute a bounding box that encompasses the alpha channel of all frames
-    box = _get_box_from_frames(filepaths)
+    # Read every frame, computing a bounding box that encompasses the alpha channel of
+    # all frames as we go
+    return _get_box_from_frames(filepaths, cache, num_workers)
+
+
+def load_cropped_frames(input_dirpath: str, cache: FrameCache, num_workers: int | None = None) -> Box:
+    """
+    Reads every (already-cropped) frame image in input_dirpath into cache, returning a
+    box that covers the full extents of the first frame.
+    """
+    filenames = sorted(os.listdir(input_dirpath))
+    filepaths = [os.path.join(input_dirpath, f) for f in filenames]
+    assert filepaths
+    for im in read_frames(filepaths, num_workers):
+        cache.append(im)
+    return Box(x=0, y=0, w=cache.shape[1], h=cache.shape[0])
+
 
+def write_cropped_frames(cache: FrameCache, box: Box, output_dirpath: str, output_filename_prefix: str, num_workers: int | None = None):
+    """
+    Writes each frame in cache, cropped to box, to output_dirpath as
+    '<output_filename_prefix>.####.png', with the first frame starting at 0000.
+    """
     # Create the output directory if it doesn't exist, then write a copy of each frame,
     # cropped to that bounding box
     os.makedirs(output_dirpath, exist_ok=True)
-    for i, input_filepath in enumerate(filepaths):
-        # Figure out where to write our output file, using a naming convention that
-        # renumbers all frames starting from 0
-        output_filename = '%s.%04d.png' % (output_filename_prefix, i)
-        output_filepath = os.path.join(output_dirpath, output_filename)
+    with FrameWriter(num_workers) as writer:
+        for i in range(len(cache)):
+            # Figure out where to write our output file, using a naming convention that
+            # renumbers all frames starting from 0
+            output_filename = '%s.%04d.png' % (output_filename_prefix, i)
+            output_filepath = os.path.join(output_dirpath, output_filename)
 
-        # Open the original frame, crop it, and write it to our output path
-        im = cv2.imread(input_filepath, cv2.IMREAD_UNCHANGED)
-        im = im[box.y:box.y+box.h, box.x:box.x+box.w]
-        cv2.imwrite(output_filepath, im)
+            # Get the cropped frame from our cache and write it to our output path
+            im = cache.get(i, box)
+            writer.write(output_filepath, im)
 
 
-def _get_box_from_frames(filepaths: Sequence[str]) -> Box:
+def _get_box_from_frames(filepaths: Sequence[str], cache: FrameCache | None = None, num_workers: int | None = None) -> Box:
     # We should have at least one input image in the sequence
     assert filepaths
 
@@ -46,11 +82,13 @@ def _get_box_from_frames(filepaths: Sequence[str]) -> Box:
     min_top = 0x7fffffff
     max_right = -1
     max_bottom = -1
-    for filepath in filepaths:
-        # Read the frame, preserving (and requiring) an alpha channel
-        im = cv2.imread(filepath, cv2.IMREAD_UNCHANGED)
+    for im in read_frames(filepaths, num_workers):
+        # Check that the frame has an alpha channel, and hang on to the frame if we've
+        # been given a cache to hold it
         assert im.ndim == 3 and im.shape[2] == 4
         alpha = im[:,:,3]
+        if cache is not None:
+            cache.append(im)
 
         # Compute a bounding box for this frame's alpha channel
         box = _get_box_from_alpha(alpha)
@@ -0,0 +1,87 @@
+import os
+import itertools
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+import cv2
+import numpy as np
+
+# Default number of threads to use for reading or writing frames: decoding and encoding
+# PNGs is mostly zlib work, which OpenCV does without holding the GIL
+DEFAULT_NUM_WORKERS = os.cpu_count() or 1
+
+
+def read_frame(filepath: str, flags: int = cv2.IMREAD_UNCHANGED) -> np.ndarray:
+    im = cv2.imread(filepath, flags)
+    if im is None:
+        raise RuntimeError('Failed to read image from %s' % filepath)
+    return im
+
+
+def write_frame(filepath: str, im: np.ndarray):
+    if not cv2.imwrite(filepath, im):
+        raise RuntimeError('Failed to write image to %s' % filepath)
+
+
+def read_frames(filepaths: Iterable[str], num_workers: int | None = None, flags: int = cv2.IMREAD_UNCHANGED) -> Iterator[np.ndarray]:
+    """
+    Yields the image read from each of the given files, in order, while decoding the
+    next few images in the background on num_workers threads.
+    """
+    num_workers = num_workers or DEFAULT_NUM_WORKERS
+    executor = ThreadPoolExecutor(num_workers, thread_name_prefix='read_frames')
+    try:
+        # Keep up to two reads in flight per thread, so that every thread has another
+        # frame to start on as soon as it's finished with one
+        filepaths = iter(filepaths)
+        futures: collections.deque[Future] = collections.deque()
+        for filepath in itertools.islice(filepaths, num_workers * 2):
+            futures.append(executor.submit(read_frame, filepath, flags))
+        while futures:
+            im = futures.popleft().result()
+            for filepath in itertools.islice(filepaths, 1):
+                futures.append(executor.submit(read_frame, filepath, flags))
+            yield im
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class FrameWriter:
+    """
+    Writes images to files in the background on num_workers threads. Callers must not
+    modify an image after passing it to write(). If more than max_pending writes are in
+    flight, write() waits for the oldest to finish, which bounds the memory held by
+    images waiting to be written. Any error from a write is raised in the order that the
+    writes were requested: from a later call to write(), or from close() at the latest.
+    """
+    def __init__(self, num_workers: int | None = None, max_pending: int | None = None):
+        self.num_workers = num_workers or DEFAULT_NUM_WORKERS
+        self.max_pending = max_pending or self.num_workers * 2
+        self.executor = ThreadPoolExecutor(self.num_workers, thread_name_prefix='FrameWriter')
+        self.futures: collections.deque[Future] = collections.deque()
+
+    def __enter__(self) -> 'FrameWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # We're already raising an exception, so just stop without raising another
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def write(self, filepath: str, im: np.ndarray):
+        while len(self.futures) >= self.max_pending:
+            self.futures.popleft().result()
+        self.futures.append(self.executor.submit(write_frame, filepath, im))
+
+    def close(self):
+        """
+        Waits for all pending writes to finish.
+        """
+        try:
+            while self.futures:
+                self.futures.popleft().result()
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
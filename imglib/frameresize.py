@@ -1,19 +1,22 @@
 import os
+import itertools
 
 import cv2
 import numpy as np
 
-from .core import Align
+from .core import Align, Box
+from .frameio import FrameWriter, read_frames
 
 
-def resize_frames(input_dirpath: str, output_dirpath: str, size: int, align: Align):
+def resize_frames(input_dirpath: str, output_dirpath: str, size: int, align: Align, num_workers: int | None = None):
     """
     Collects all cropped frames in input_dirpath, then resizes each to a square image
     with the given size as both width and height, writing each resized frame to a file
     of the same name in output_dirpath. If align is Align.START, the image will be
     positioned at the top or left edge of the frame (for landscape or portrait aspect
     ratio, respectively); Align.MIDDLE corresponds to the center of the frame, and
-    Align.END will place the image at the right or bottom edge of the frame.
+    Align.END will place the image at the right or bottom edge of the frame. Frames are
+    read and written on num_workers threads (by default, one per CPU core).
     """
     # Get a list of frames in the input directory (which we assume to only contain
     # per-frame images; no other files or directories)
@@ -21,12 +24,103 @@ def resize_frames(input_dirpath: str, output_dirpath: str, size: int, align: Ali
     filepaths = [os.path.join(input_dirpath, f) for f in filenames]
     assert filepaths
 
-    # Read the first frame to get the original, unmodified size of our input frames
-    im = cv2.imread(filepaths[0], cv2.IMREAD_UNCHANGED)
-    input_h, input_w, _ = im.shape
+    # Start reading frames, and use the first frame to get the original, unmodified size
+    # of our input frames
+    frames = read_frames(filepaths, num_workers)
+    first_im = next(frames)
+    input_h, input_w, _ = first_im.shape
 
     # Determine the final size of our image once resized, and exactly how we should
     # shift it to fit in our square frame at the desired alignment
+    subject_box = get_resized_subject_box(input_w, input_h, size, align)
+
+    # Iterate over all frames, resizing them to the desired dimensions and aligning them
+    # as desired, then writing them to the output directory
+    os.makedirs(output_dirpath, exist_ok=True)
+    with FrameWriter(num_workers) as writer:
+        for input_filepath, im in zip(filepaths, itertools.chain([first_im], frames)):
+            # In the output directory, use the same filename as the input file
+            output_filepath = os.path.join(output_dirpath, os.path.basename(input_filepath))
+            writer.write(output_filepath, resize_frame(im, size, subject_box))
+
+
+def resize_frames_multi(input_dirpath: str, output_dirpaths: dict[int, str], align: Align, cascade: bool = False, num_workers: int | None = None):
+    """
+    Equivalent to calling resize_frames once for each size (and its output directory)
+    in output_dirpaths, but decodes each cropped frame only once, producing every size
+    from it. If cascade is set, each size is downscaled from the next size up (see
+    resize_frame_multi), which is faster but gives slightly different results.
+    """
+    # Get a list of frames in the input directory (which we assume to only contain
+    # per-frame images; no other files or directories)
+    filenames = sorted(os.listdir(input_dirpath))
+    filepaths = [os.path.join(input_dirpath, f) for f in filenames]
+    assert filepaths
+
+    # Start reading frames, and use the first frame to work out where our image will end
+    # up in each size of square frame
+    frames = read_frames(filepaths, num_workers)
+    first_im = next(frames)
+    input_h, input_w, _ = first_im.shape
+    subject_boxes = get_resized_subject_boxes(input_w, input_h, list(output_dirpaths), align)
+
+    # Resize each frame to every size, writing each to a file of the same name in the
+    # output directory for that size
+    for output_dirpath in output_dirpaths.values():
+        os.makedirs(output_dirpath, exist_ok=True)
+    with FrameWriter(num_workers) as writer:
+        for input_filepath, im in zip(filepaths, itertools.chain([first_im], frames)):
+            filename = os.path.basename(input_filepath)
+            for size, resized in resize_frame_multi(im, subject_boxes, cascade).items():
+                writer.write(os.path.join(output_dirpaths[size], filename), resized)
+
+
+def resize_frame_multi(im: np.ndarray, subject_boxes: dict[int, Box], cascade: bool = False) -> dict[int, np.ndarray]:
+    """
+    Resizes the given image to each size in subject_boxes (as computed by
+    get_resized_subject_boxes), returning a dict of the resulting square images by size.
+    By default, each size is resized directly from the original image, exactly as
+    resize_frame would. If cascade is set, only the largest size is resized from the
+    original: each smaller size is then resized from the next size up.
+    """
+    results = {}
+    source = im
+    for size in sorted(subject_boxes, reverse=True):
+        subject_box = subject_boxes[size]
+        resized = resize_frame(source, size, subject_box)
+        if cascade:
+            source = resized[subject_box.y:subject_box.y+subject_box.h, subject_box.x:subject_box.x+subject_box.w]
+        results[size] = resized
+    return results
+
+
+def resize_frame(im: np.ndarray, size: int, subject_box: Box) -> np.ndarray:
+    """
+    Returns a new square image with the given size as both width and height, containing
+    the given image resized to fit subject_box (as computed by get_resized_subject_box).
+    """
+    # Resize the input image in its original aspect ratio
+    im = cv2.resize(im, (subject_box.w, subject_box.h), interpolation=cv2.INTER_AREA)
+
+    # Create a new square buffer and blit the resized image into it
+    resized = np.zeros((size, size, im.shape[2]), im.dtype)
+    resized[subject_box.y:subject_box.y+subject_box.h, subject_box.x:subject_box.x+subject_box.w] = im
+    return resized
+
+
+def get_resized_subject_boxes(input_w: int, input_h: int, sizes: list[int], align: Align) -> dict[int, Box]:
+    """
+    Returns the result of get_resized_subject_box for each of the given sizes.
+    """
+    return {size: get_resized_subject_box(input_w, input_h, size, align) for size in sizes}
+
+
+def get_resized_subject_box(input_w: int, input_h: int, size: int, align: Align) -> Box:
+    """
+    Returns the region of a square frame of the given size that an input image of the
+    given dimensions will occupy once resized to fit that frame at its original aspect
+    ratio, and positioned according to align (as described in resize_frames).
+    """
     resized_shift_x = 0
     resized_shift_y = 0
     if input_h > input_w:
@@ -61,19 +155,5 @@ def resize_frames(input_dirpath: str, output_dirpath: str, size: int, align: Ali
             else:
                 assert align == Align.MIDDLE
                 resized_shift_y = h_slack // 2
-    
-    # Iterate over all frames, resizing them to the desired dimensions and aligning them
-    # as desired, then writing them to the output directory
-    os.makedirs(output_dirpath, exist_ok=True)
-    for input_filepath in filepaths:
-        # In the output directory, use the same filename as the input file
-        output_filepath = os.path.join(output_dirpath, os.path.basename(input_filepath))
-
-        # Load the input image and resize it in its original aspect ratio
-        im = cv2.imread(input_filepath, cv2.IMREAD_UNCHANGED)
-        im = cv2.resize(im, (resized_subject_w, resized_subject_h), interpolation=cv2.INTER_AREA)
-
-        # Create a new square buffer and blit the resized image into it
-        resized = np.zeros((size, size, im.shape[2]), im.dtype)
-        resized[resized_shift_y:resized_shift_y+resized_subject_h, resized_shift_x:resized_shift_x+resized_subject_w] = im
-        cv2.imwrite(output_filepath, resized)
+
+    return Box(x=resized_shift_x, y=resized_shift_y, w=resized_subject_w, h=resized_subject_h)
@@ -1,83 +1,173 @@
 import os
-import shutil
+import itertools
 import subprocess
-from contextlib import contextmanager
+from typing import Iterable, Iterator, Sequence, TypeVar
 
 import cv2
 import numpy as np
 
+from .frameio import FrameWriter, read_frames
 
-def render_gif(input_dirpath: str, output_filepath: str, frameskip: int, frameshift: int, matte_color: str, fps: int):
+T = TypeVar('T')
+
+# Framerate at which ffmpeg reads our frames: this is the default framerate for image
+# sequence inputs, which is what our fps values have always been tuned against
+INPUT_FRAMERATE = 25
+
+# Number of frames to matte at a time
+MATTE_BATCH_SIZE = 8
+
+
+def render_gif(input_dirpath: str, output_filepath: str, frameskip: int, frameshift: int, matte_color: str, fps: int, num_workers: int | None = None, matted_dirpath: str | None = None):
     """
     Assembles a GIF from all images in input_dirpath, writing the resulting file to
     output_filepath. If frameshift if nonzero, the sequence will begin that many frames
     in from zero. If frameskip is nonzero, that many frames will be skipped for each
     frame rendered. matte_color indicates the desired background color, to preserve
-    anti-aliasing (as a fringe) when rendered to a GIF with 1-bit alpha.
+    anti-aliasing (as a fringe) when rendered to a GIF with 1-bit alpha. Frames are read
+    on num_workers threads (by default, one per CPU core), and if matted_dirpath is
+    given, the matted frames fed to ffmpeg are also written there, for debugging.
 
     TODO: fps involves weird ffpmeg magic and doesn't actually directly specify playback
     framerate; a sensible default value is somewhere around 20.
     """
+    # Apply the desired skip and shift values to narrow down our set of input frames
+    filenames = select_frames(sorted(os.listdir(input_dirpath)), frameskip, frameshift)
+    filepaths = [os.path.join(input_dirpath, f) for f in filenames]
+    assert filepaths
+
+    write_gif(read_frames(filepaths, num_workers), output_filepath, matte_color, fps, matted_dirpath, num_workers)
+
+
+def select_frames(frames: Sequence[T], frameskip: int, frameshift: int) -> list[T]:
+    """
+    Returns the frames that render_gif will use from the given sequence, for the given
+    frameskip and frameshift values.
+    """
+    frames = list(frames)
+    for i in range(frameshift):
+        frames.append(frames.pop(0))
+    return frames[::1+frameskip]
+
+
+def write_gif(frames: Iterable[np.ndarray], output_filepath: str, matte_color: str, fps: int, matted_dirpath: str | None = None, num_workers: int | None = None):
+    """
+    Assembles a GIF from the given sequence of BGRA frames (all of the same size),
+    matting each frame against matte_color, and writing the resulting file to
+    output_filepath. Frames are streamed directly to ffmpeg; if matted_dirpath is given,
+    each matted frame is also written there as 'frame####.png', for debugging.
+    """
     # Parse the input color as RGB hex, then convert it to normalized BGR
     assert len(matte_color) == 7 and matte_color[0] == '#'
     matte_r, matte_g, matte_b = int(matte_color[1:3], 16), int(matte_color[3:5], 16), int(matte_color[5:7], 16)
     bg_color_float = (matte_b / 255.0, matte_g / 255.0, matte_r / 255.0)
 
-    # Create a temp directory to contain processed versions of the frames we want to
-    # assemble a GIF from
-    temp_frames_dirpath = output_filepath + '.tmp'
-    with _tempdir(temp_frames_dirpath, delete=True):
-        # Apply the desired skip and shift values to narrow down our set of input frames
-        filenames = sorted(os.listdir(input_dirpath))
-        for i in range(frameshift):
-            filenames.append(filenames.pop(0))
-        filenames = filenames[::1+frameskip]
-        filepaths = [os.path.join(input_dirpath, f) for f in filenames]
-        assert filepaths
-
-        # Iterate over the input frames, renumbering them starting from 0 and getting
-        # them ready to assemble into a GIF
-        for i, filepath in enumerate(filepaths):
-            temp_frame_filepath = os.path.join(temp_frames_dirpath, 'frame%04d.png' % i)
-
-            # Read the input image and extract its original alpha channel
-            im = cv2.imread(filepath, cv2.IMREAD_UNCHANGED)
-            alpha = im[:,:,3]
-
-            # Invert the alpha channel, normalize it to 0..1, then multiply it with the
-            # desired background color to get a cutout of our background that can be
-            # added to the original RGB values
-            bg_mask = (255 - alpha).astype(float) / 255.0
-            bg_mask_rgb = cv2.merge((bg_mask, bg_mask, bg_mask))
-            bg = (bg_mask_rgb * bg_color_float * 255.0).astype(np.uint8)
-            bg = cv2.cvtColor(bg, cv2.COLOR_RGB2RGBA)
-            
-            # Add our background cutout to the original image to get our final RGB
-            # values, then convert the original alpha-channel to a 1-bit mask: for every
-            # pixel in the input image where 0.0 < opacity < 1.0, we'll end up with a
-            # fully opaque pixel with a fringe that encompasses the anti-aliasing
-            # required to make our image look good on the desired background color
-            temp_frame = cv2.add(bg, im)
-            temp_frame[:,:,3] = (alpha != 0).astype(np.uint8) * 255
-
-            # Save our modified frame to the temporary directory for this GIF file
-            cv2.imwrite(temp_frame_filepath, temp_frame)
-
-        # Use ffmpeg to render a .gif image from our frames
-        subprocess.check_call([
-            'ffmpeg',
-            '-i', os.path.join(temp_frames_dirpath, r'frame%04d.png'),
-            '-vf', 'fps=%d,split[s0][s1];[s0]palettegen=reserve_transparent=1[p];[s1][p]paletteuse' % fps,
-            '-y',
-            output_filepath,
-        ])
-
-
-@contextmanager
-def _tempdir(path: str, delete: bool):
-    os.makedirs(path, exist_ok=True)
+    # We need to tell ffmpeg the size of our frames up front
+    frames = iter(frames)
+    first_im = next(frames, None)
+    assert first_im is not None
+    height, width = first_im.shape[:2]
+    if matted_dirpath:
+        os.makedirs(matted_dirpath, exist_ok=True)
+
+    # Use ffmpeg to render a .gif image from our frames, which we'll pipe to its stdin as
+    # raw BGRA pixels
+    p = subprocess.Popen([
+        'ffmpeg',
+        '-f', 'rawvideo',
+        '-pix_fmt', 'bgra',
+        '-video_size', '%dx%d' % (width, height),
+        '-framerate', str(INPUT_FRAMERATE),
+        '-i', '-',
+        '-vf', 'fps=%d,split[s0][s1];[s0]palettegen=reserve_transparent=1[p];[s1][p]paletteuse' % fps,
+        '-y',
+        output_filepath,
+    ], stdin=subprocess.PIPE)
     try:
-        yield
+        # Matte our frames a batch at a time, reusing the same buffers for each batch
+        compositor = MatteCompositor(bg_color_float)
+        batch = np.empty((MATTE_BATCH_SIZE, height, width, 4), np.uint8)
+        num_frames_written = 0
+        with FrameWriter(num_workers) as writer:
+            for frames_batch in _iter_batches(itertools.chain([first_im], frames), batch):
+                matted = compositor.composite(frames_batch)
+                if matted_dirpath:
+                    for i in range(len(matted)):
+                        writer.write(os.path.join(matted_dirpath, 'frame%04d.png' % (num_frames_written + i)), matted[i].copy())
+                p.stdin.write(memoryview(matted).cast('B'))
+                num_frames_written += len(matted)
+    except BrokenPipeError:
+        # ffmpeg has exited early, so let its exit code explain why
+        pass
     finally:
-        if delete:
-            shutil.rmtree(path)
+        try:
+            p.stdin.close()
+        except BrokenPipeError:
+            pass
+        exitcode = p.wait()
+    if exitcode != 0:
+        raise RuntimeError('GIF render failed: ffmpeg returned exit code %d' % exitcode)
+
+
+class MatteCompositor:
+    """
+    Composites BGRA frames over a solid background color (as normalized BGR), reducing
+    each frame's alpha channel to a 1-bit mask, with the same results as our original
+    floating-point implementation:
+
+        bg = (((255 - alpha) / 255.0) * bg_color_float * 255.0).astype(np.uint8)
+        matted = cv2.add(bgra(bg, 255), im)
+        matted[:,:,3] = (alpha != 0) * 255
+
+    Since the background value added to each pixel depends only on that pixel's alpha,
+    we precompute it for every alpha value, along with the 1-bit alpha, as a lookup
+    table of BGRA values: adding the looked-up value to each pixel (with saturation)
+    gives the final matted pixel, and alpha + 255 saturates to exactly 255 wherever
+    alpha is nonzero. The output buffer is allocated once and reused for every batch of
+    the same size.
+    """
+    def __init__(self, bg_color_float: tuple[float, float, float]):
+        alpha = np.arange(256)
+        bg_mask = (255 - alpha).astype(float) / 255.0
+        self.lut = np.empty((1, 256, 4), np.uint8)
+        for channel, value in enumerate(bg_color_float):
+            self.lut[0,:,channel] = (bg_mask * value * 255.0).astype(np.uint8)
+        self.lut[0,:,3] = (alpha != 0).astype(np.uint8) * 255
+        self.output_buffer: np.ndarray | None = None
+
+    def composite(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Mattes a batch of BGRA frames, given as an array of shape (N, height, width, 4).
+        Returns the matted frames as an array of the same shape, which is overwritten by
+        the next call.
+        """
+        assert frames.ndim == 4 and frames.shape[3] == 4 and frames.dtype == np.uint8
+        if self.output_buffer is None or self.output_buffer.shape[1:] != frames.shape[1:] or len(self.output_buffer) < len(frames):
+            self.output_buffer = np.empty(frames.shape, np.uint8)
+        output = self.output_buffer[:len(frames)]
+
+        # OpenCV works on 2D images, so treat our stack of frames as one tall image. Copy
+        # each pixel's alpha value into all 4 channels of our output, replace those with
+        # the values to add from our lookup table, then add the original pixels: each of
+        # these steps works in place, so we need no other intermediate buffers
+        height, width = frames.shape[1:3]
+        rows = output.reshape((len(frames) * height, width, 4))
+        np.copyto(output, frames[:,:,:,3:4])
+        cv2.LUT(rows, self.lut, dst=rows)
+        cv2.add(np.ascontiguousarray(frames).reshape(rows.shape), rows, dst=rows)
+        return output
+
+
+def _iter_batches(frames: Iterable[np.ndarray], batch: np.ndarray) -> Iterator[np.ndarray]:
+    # Copy frames into a preallocated buffer, yielding it each time it's full (and once
+    # more for any remaining frames): each batch overwrites the previous one
+    num_frames = 0
+    for im in frames:
+        assert im.shape == batch.shape[1:]
+        batch[num_frames] = im
+        num_frames += 1
+        if num_frames == len(batch):
+            yield batch
+            num_frames = 0
+    if num_frames:
+        yield batch[:num_frames]
@@ -2,14 +2,91 @@ import os
 import argparse
 
 from imglib import Align
-from imglib.framecrop import crop_frames
-from imglib.frameresize import resize_frames
-from imglib.gifrender import render_gif
+from imglib.framecache import FrameCache
+from imglib.framecrop import crop_frames, load_cropped_frames, load_frames_to_crop, write_cropped_frames
+from imglib.frameio import FrameWriter
+from imglib.frameresize import get_resized_subject_boxes, resize_frame_multi, resize_frames_multi
+from imglib.gifrender import render_gif, select_frames, write_gif
 
 EMOTES_ROOTDIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'emotes'))
 SIZES = [128, 112, 56, 28]
 
 
+def make_emote_on_disk(emote_name: str, emote_dir: str, align: Align, frameskip: int, frameshift: int, matte: str, fps: int, memory_budget: int, num_workers: int | None, keep_intermediates: bool, cascade: bool):
+    # Hand frames from one step to the next as PNG files in intermediate directories
+    render_dir = os.path.join(emote_dir, 'render')
+    crop_dir = os.path.join(emote_dir, 'crop')
+    resize_dir = os.path.join(emote_dir, 'resize')
+    matte_dir = os.path.join(emote_dir, 'matte')
+
+    if os.path.isdir(render_dir) and not os.path.isdir(crop_dir):
+        print('Cropping rendered frames...')
+        crop_frames(render_dir, crop_dir, emote_name, memory_budget, num_workers)
+        print('Wrote cropped images to %s.' % crop_dir)
+
+    assert os.path.isdir(crop_dir)
+    output_dirs = {size: os.path.join(resize_dir, str(size)) for size in SIZES}
+    print('Resizing all cropped frames to %s...' % ', '.join('%dx%d' % (size, size) for size in SIZES))
+    resize_frames_multi(crop_dir, output_dirs, align, cascade, num_workers)
+    print('Wrote resized images to %s.' % resize_dir)
+
+    for size in SIZES:
+        input_dir = os.path.join(resize_dir, str(size))
+        gif_path = os.path.join(emote_dir, '%s_%d.gif' % (emote_name, size))
+        print('Rendering an animated GIF at %dx%d...' % (size, size))
+        render_gif(input_dir, gif_path, frameskip, frameshift, matte, fps, num_workers, os.path.join(matte_dir, str(size)) if keep_intermediates else None)
+        print('Wrote %s.' % gif_path)
+
+
+def make_emote_in_memory(emote_name: str, emote_dir: str, align: Align, frameskip: int, frameshift: int, matte: str, fps: int, memory_budget: int, num_workers: int | None, keep_intermediates: bool, cascade: bool):
+    # Keep frames in memory from one step to the next, streaming the final frames for
+    # each GIF straight to ffmpeg, and only writing intermediate images if requested
+    render_dir = os.path.join(emote_dir, 'render')
+    crop_dir = os.path.join(emote_dir, 'crop')
+    resize_dir = os.path.join(emote_dir, 'resize')
+    matte_dir = os.path.join(emote_dir, 'matte')
+
+    with FrameCache(memory_budget) as cache:
+        # Crop our rendered frames, unless we've already got cropped frames to work from
+        if os.path.isdir(render_dir) and not os.path.isdir(crop_dir):
+            print('Cropping rendered frames...')
+            box = load_frames_to_crop(render_dir, cache, num_workers)
+            if keep_intermediates:
+                write_cropped_frames(cache, box, crop_dir, emote_name, num_workers)
+                print('Wrote cropped images to %s.' % crop_dir)
+        else:
+            assert os.path.isdir(crop_dir)
+            print('Loading cropped frames from %s...' % crop_dir)
+            box = load_cropped_frames(crop_dir, cache, num_workers)
+
+        # Unless we're writing every resized frame to disk, we only need to resize the
+        # frames that will end up in each GIF. Each cropped frame is resized to every size
+        # in one go, so we only fetch it from the cache once.
+        gif_indices = select_frames(range(len(cache)), frameskip, frameshift)
+        resize_indices = range(len(cache)) if keep_intermediates else sorted(set(gif_indices))
+        print('Resizing cropped frames to %s...' % ', '.join('%dx%d' % (size, size) for size in SIZES))
+        subject_boxes = get_resized_subject_boxes(box.w, box.h, SIZES, align)
+        resized_frames_by_size = {size: {} for size in SIZES}
+        for i in resize_indices:
+            for size, resized in resize_frame_multi(cache.get(i, box), subject_boxes, cascade).items():
+                resized_frames_by_size[size][i] = resized
+
+        for size in SIZES:
+            resized_frames = resized_frames_by_size[size]
+            if keep_intermediates:
+                output_dir = os.path.join(resize_dir, str(size))
+                os.makedirs(output_dir, exist_ok=True)
+                with FrameWriter(num_workers) as writer:
+                    for i, im in resized_frames.items():
+                        writer.write(os.path.join(output_dir, '%s.%04d.png' % (emote_name, i)), im)
+                print('Wrote resized images to %s.' % output_dir)
+
+            gif_path = os.path.join(emote_dir, '%s_%d.gif' % (emote_name, size))
+            print('Rendering an animated GIF at %dx%d...' % (size, size))
+            write_gif([resized_frames[i] for i in gif_indices], gif_path, matte, fps, os.path.join(matte_dir, str(size)) if keep_intermediates else None, num_workers)
+            print('Wrote %s.' % gif_path)
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('emote_name')
@@ -18,6 +95,11 @@ if __name__ == '__main__':
     parser.add_argument('--frameshift', '-t', type=int, default=0)
     parser.add_argument('--matte', '-m', default='#181818')
     parser.add_argument('--fps', '-r', type=int, default=20)
+    parser.add_argument('--workers', '-j', type=int, default=None, help='number of threads to use for reading and writing frames (default: one per CPU core)')
+    parser.add_argument('--memory-budget-mb', type=int, default=1024, help='max MiB of decoded frames to hold in memory while cropping, beyond which they spill to disk')
+    parser.add_argument('--keep-intermediates', '-k', action='store_true', help='also write cropped, resized and matted frames to crop/, resize/<size>/ and matte/<size>/, for debugging')
+    parser.add_argument('--cascade', action='store_true', help='downscale each emote size from the next size up, rather than from the cropped frame (faster, but not pixel-identical)')
+    parser.add_argument('--on-disk', action='store_true', help='pass frames between steps as PNGs in crop/ and resize/<size>/, rather than keeping them in memory')
     args = parser.parse_args()
     align = Align.parse(args.align)
 
@@ -25,26 +107,6 @@ if __name__ == '__main__':
     emote_dir = os.path.join(EMOTES_ROOTDIR, args.emote_name)
     assert os.path.isdir(emote_dir)
     print('Working from: %s' % emote_dir)
-    
-    render_dir = os.path.join(emote_dir, 'render')
-    crop_dir = os.path.join(emote_dir, 'crop')
-    resize_dir = os.path.join(emote_dir, 'resize')
 
-    if os.path.isdir(render_dir) and not os.path.isdir(crop_dir):
-        print('Cropping rendered frames...')
-        crop_frames(render_dir, crop_dir, args.emote_name)
-        print('Wrote cropped images to %s.' % crop_dir)
-
-    assert os.path.isdir(crop_dir)
-    for size in SIZES:
-        output_dir = os.path.join(resize_dir, str(size))
-        print('Resizing all cropped frames to to %dx%d...' % (size, size))
-        resize_frames(crop_dir, output_dir, size, align)
-        print('Wrote resized images to %s.' % output_dir)
-
-    for size in SIZES:
-        input_dir = os.path.join(resize_dir, str(size))
-        gif_path = os.path.join(emote_dir, '%s_%d.gif' % (args.emote_name, size))
-        print('Rendering an animated GIF at %dx%d...' % (size, size))
-        render_gif(input_dir, gif_path, args.frameskip, args.frameshift, args.matte, args.fps)
-        print('Wrote %s.' % gif_path)
+    make_emote = make_emote_on_disk if args.on_disk else make_emote_in_memory
+    make_emote(args.emote_name, emote_dir, align, args.frameskip, args.frameshift, args.matte, args.fps, args.memory_budget_mb * 1024 * 1024, args.workers, args.keep_intermediates, args.cascade)
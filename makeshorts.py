@@ -3,12 +3,13 @@ import argparse
 import requests
 from datetime import datetime
 
-from resolve_exec import resolve_exec
+from resolve_bridge import call_resolve
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(prog='python makeshorts.py', description='prepares a DaVinci Resolve project for cutting shorts from an OBS broadcast of a Golden VCR stream')
     parser.add_argument('broadcast_id', help='id for the broadcast, corresponding to ../../gvcr-stream-capture/gvcr_broadcast_<broadcast-id>.mkv')
+    parser.add_argument('--no-bulk-import', action='store_true', help='build the Resolve timeline with individual API calls, then export, patch and re-import the project to extend the overlay, rather than importing a generated FCPXML timeline (which leaves tape markers in the default color instead of Sand)')
     args = parser.parse_args()
 
     stream_capture_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'gvcr-stream-capture'))
@@ -32,6 +33,4 @@ if __name__ == '__main__':
         marker_text = 'Tape %d' % screening['tapeId']
         markers.append((marker_frame, marker_text))
 
-    gvcr_resolve = os.path.join(os.path.dirname(__file__), 'gvcr_resolve')
-    script = 'create_shorts_project(resolve, %r, %r)' % (mkv_filepath, markers)
-    resolve_exec(gvcr_resolve, script)
+    call_resolve('create_shorts_project', mkv_filepath, markers, not args.no_bulk_import)
@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import socket
+import argparse
+import itertools
+
+from gvcr_resolve.bridge import BRIDGE_HOST, BRIDGE_PORT
+
+
+class ResolveBridgeError(RuntimeError):
+    """
+    Raised when a function called through the bridge fails inside Resolve.
+    """
+    def __init__(self, message: str, remote_traceback: str | None = None):
+        super().__init__(message)
+        self.remote_traceback = remote_traceback
+
+
+class ResolveBridgeClient:
+    """
+    Client for the bridge server started in Resolve by gvcr_resolve.start_bridge. Sends
+    each call as a line of JSON over a persistent localhost connection, and reads the
+    result from the response line. If the connection has been dropped by the time we
+    send a request (e.g. because the bridge was restarted), we reconnect and resend it.
+    """
+    def __init__(self, host: str = BRIDGE_HOST, port: int = BRIDGE_PORT, connect_timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.sock: socket.socket | None = None
+        self.rfile = None
+        self.request_ids = itertools.count(1)
+
+    def __enter__(self) -> 'ResolveBridgeClient':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self, wait: float = 0.0):
+        """
+        Connects to the bridge, retrying for up to wait seconds if it's not listening yet.
+        Raises ConnectionError if it still can't connect after that.
+        """
+        self.close()
+        deadline = time.time() + wait
+        while True:
+            try:
+                self.sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+                break
+            except OSError as e:
+                if time.time() >= deadline:
+                    raise ConnectionError('could not connect to Resolve bridge at %s:%d: %s' % (self.host, self.port, e)) from e
+                time.sleep(0.1)
+        self.rfile = self.sock.makefile('rb')
+
+    def is_stale(self) -> bool:
+        """
+        Returns True if the bridge has closed our connection since our last call, which we
+        can detect without blocking since the bridge never sends anything unprompted.
+        """
+        self.sock.setblocking(False)
+        try:
+            self.sock.recv(1, socket.MSG_PEEK)
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+        finally:
+            self.sock.setblocking(True)
+        return True
+
+    def close(self):
+        if self.rfile is not None:
+            self.rfile.close()
+            self.rfile = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def call(self, method: str, *args, timeout: float | None = None):
+        """
+        Calls the named function in Resolve with the given (JSON-serializable) args,
+        waiting up to timeout seconds (or indefinitely, if None) for it to return.
+        """
+        request_id = next(self.request_ids)
+        line = json.dumps({'id': request_id, 'method': method, 'args': list(args)}).encode('utf-8') + b'\n'
+
+        # Send the request, reconnecting first if our existing connection has gone stale,
+        # and reconnecting once more if sending fails on a connection we'd already made:
+        # a request that couldn't be sent can't have been run, so it's safe to resend it
+        was_connected = self.sock is not None and not self.is_stale()
+        if not was_connected:
+            self.connect()
+        try:
+            self.sock.sendall(line)
+        except OSError:
+            if not was_connected:
+                raise
+            self.connect()
+            self.sock.sendall(line)
+
+        # Wait for the response. If we time out or lose our connection, we don't know
+        # whether the call finished, so we don't retry: we close the connection so that
+        # a late response can't be mistaken for the response to a later call.
+        self.sock.settimeout(timeout)
+        try:
+            response_line = self.rfile.readline()
+        except socket.timeout as e:
+            self.close()
+            raise TimeoutError('timed out after %.1fs waiting for Resolve bridge to respond to %s' % (timeout, method)) from e
+        except OSError:
+            self.close()
+            raise
+        if not response_line:
+            self.close()
+            raise ConnectionError('Resolve bridge closed the connection before responding to %s' % method)
+
+        response = json.loads(response_line)
+        if response.get('id') != request_id:
+            self.close()
+            raise ConnectionError('Resolve bridge sent a response to request %r while we were waiting for %r' % (response.get('id'), request_id))
+        if 'error' in response:
+            raise ResolveBridgeError('%s failed in Resolve: %s' % (method, response['error']), response.get('traceback'))
+        return response.get('result')
+
+
+def start_bridge_in_resolve():
+    """
+    Starts the bridge server in Resolve's Python console, by driving the Resolve UI to
+    run a one-liner. This is only needed once per Resolve session.
+    """
+    from resolve_exec import resolve_exec
+    gvcr_resolve = os.path.join(os.path.dirname(__file__), 'gvcr_resolve')
+    resolve_exec(gvcr_resolve, 'start_bridge(resolve)')
+
+
+def call_resolve(method: str, *args, timeout: float | None = None, start_timeout: float = 30.0):
+    """
+    Calls the named gvcr_resolve function in Resolve through the bridge, first starting
+    the bridge in Resolve if it isn't already running.
+    """
+    client = ResolveBridgeClient()
+    try:
+        client.connect()
+    except ConnectionError:
+        print('Resolve bridge is not running; starting it from the Resolve console...')
+        start_bridge_in_resolve()
+        client.connect(wait=start_timeout)
+    with client:
+        return client.call(method, *args, timeout=timeout)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python resolve_bridge.py', description='ensures that the gvcr bridge is running in DaVinci Resolve, starting it if needed')
+    parser.add_argument('--start-timeout', type=float, default=30.0, help='seconds to wait for the bridge to start listening after starting it')
+    args = parser.parse_args()
+
+    print('Resolve bridge says: %s' % call_resolve('ping', start_timeout=args.start_timeout))
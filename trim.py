@@ -5,12 +5,20 @@ import sys
 import time
 import json
 import tempfile
-import binascii
 import subprocess
+import bisect
 import argparse
-from decimal import Decimal
+import functools
+import threading
+from array import array
+from decimal import Decimal, ROUND_FLOOR, ROUND_CEILING
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
 
-from resolve_exec import resolve_exec
+from resolve_bridge import call_resolve
+from vidlib import FileStamp
+from vidlib.keyframeindex import read_keyframe_index, write_keyframe_index, probe_keyframe_index
 
 
 def timecode_to_seconds(timecode: str) -> Decimal:
@@ -37,38 +45,56 @@ def timecode_to_seconds(timecode: str) -> Decimal:
     return second_at_assumed_framerate / (NTSC_DROP / NTSC_FULL)
 
 
-def get_keyframe_times(video_filepath: str) -> list[Decimal]:
-    KEYFRAME_TIME_REGEX = re.compile(r'^([0-9.]+),K.*')
-    
-    args = ['ffprobe', '-loglevel', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags', '-of', 'csv=print_section=0', os.path.normpath(video_filepath)]
-    times: list[Decimal] = []
-    p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    for line in io.TextIOWrapper(p.stdout, encoding='utf-8'):
-        match = KEYFRAME_TIME_REGEX.match(line)
-        if match:
-            times.append(Decimal(match.group(1)))
-
-    exitcode = p.wait()
-    if exitcode != 0:
-        raise RuntimeError("getting keyframe times failed: ffprobe returned exit code %d" % exitcode)
-    return times
-
-
-def find_nearest_keyframe_lte(keyframe_times: list[Decimal], second: Decimal) -> Decimal:
-    left = 0
-    right = len(keyframe_times) - 1
-    result = None
-    while left <= right:
-        mid = (left + right) // 2
-        if keyframe_times[mid] <= second:
-            result = keyframe_times[mid]
-            left = mid + 1
-        else:
-            right = mid - 1
-    return result
+def get_keyframe_times(video_filepath: str) -> array:
+    # Keyframe times are stored in an index file alongside each video, so we only need
+    # to probe every packet in the file the first time we export from it
+    keyframe_us = read_keyframe_index(video_filepath)
+    if keyframe_us is None:
+        print('Building keyframe index for %s...' % os.path.basename(video_filepath))
+        keyframe_us = probe_keyframe_index(video_filepath)
+        write_keyframe_index(video_filepath, keyframe_us)
+    return keyframe_us
+
+
+def find_nearest_keyframe_lte(keyframe_times: array, second: Decimal) -> Decimal | None:
+    # keyframe_times is a sorted array of integer microseconds, so any keyframe at or
+    # before our desired time must also be at or before the floor of that time in us
+    target_us = int((second * 1000000).to_integral_value(rounding=ROUND_FLOOR))
+    i = bisect.bisect_right(keyframe_times, target_us)
+    if i == 0:
+        return None
+    return Decimal(keyframe_times[i - 1]).scaleb(-6)
+
+
+def run_ffmpeg(args: list[str], on_progress: Callable[[Decimal], None] | None = None):
+    """
+    Runs the given ffmpeg command, raising CalledProcessError if it fails. If
+    on_progress is None, ffmpeg's output is shown as-is; otherwise it's suppressed
+    (unless ffmpeg fails, in which case it's included in the exception), and
+    on_progress is called with the number of seconds of output written so far.
+    """
+    if on_progress is None:
+        print('> %s' % ' '.join(args))
+        subprocess.check_call(args)
+        return
 
+    # Have ffmpeg write machine-readable progress to stdout, and keep its error output
+    # in a temp file so that concurrent jobs don't spam the console
+    args = args[:1] + ['-nostdin', '-y', '-loglevel', 'error', '-nostats', '-progress', 'pipe:1'] + args[1:]
+    with tempfile.TemporaryFile() as stderr_fp:
+        p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=stderr_fp)
+        for line in io.TextIOWrapper(p.stdout, encoding='utf-8'):
+            if line.startswith('out_time_us='):
+                value = line.strip().split('=', 1)[1]
+                if value.isdigit():
+                    on_progress(Decimal(value) / Decimal(1000000))
+        exitcode = p.wait()
+        if exitcode != 0:
+            stderr_fp.seek(0)
+            raise subprocess.CalledProcessError(exitcode, args, stderr=stderr_fp.read().decode('utf-8', errors='replace'))
 
-def trim_without_reencode(src_filepath: str, dst_filepath: str, in_timecode: str, out_timecode: str, keyframe_times: list[Decimal]):
+
+def trim_without_reencode(src_filepath: str, dst_filepath: str, in_timecode: str, out_timecode: str, keyframe_times: array, on_progress: Callable[[Decimal], None] | None = None):
     # Since we're stream-copying an H.264 video stream, we need to go back to the
     # nearest keyframe before our desired in point, adding a little bit of lead time to
     # the segment we want to trim
@@ -91,11 +117,10 @@ def trim_without_reencode(src_filepath: str, dst_filepath: str, in_timecode: str
         '-c', 'copy',
         dst_filepath,
     ]
-    print('> %s' % ' '.join(args))
-    subprocess.check_call(args)
+    run_ffmpeg(args, on_progress)
 
 
-def trim_with_x264_reencode(src_filepath: str, dst_filepath: str, in_timecode: str, out_timecode: str, crf: int):
+def trim_with_x264_reencode(src_filepath: str, dst_filepath: str, in_timecode: str, out_timecode: str, crf: int, threads: int | None = None, on_progress: Callable[[Decimal], None] | None = None):
     # Given timecode exported from Resolve, convert to the exact times in the input
     # video where we want to start and end our clip
     in_point = timecode_to_seconds(in_timecode)
@@ -113,80 +138,795 @@ def trim_with_x264_reencode(src_filepath: str, dst_filepath: str, in_timecode: s
         '-c:v', 'libx264',
         '-preset', 'slow',
         '-crf', str(crf),
+    ]
+    if threads is not None:
+        args += ['-threads:v', str(threads)]
+    args += [
         '-c:a', 'copy',
         dst_filepath,
     ]
-    print('> %s' % ' '.join(args))
-    subprocess.check_call(args)
+    run_ffmpeg(args, on_progress)
+
+
+# Containers that can hold the H.264 video and stream-copied audio of a rendition
+RENDITION_EXTS = ('mp4', 'mkv', 'mov')
+
+
+@dataclass
+class Rendition:
+    """
+    An additional output to encode alongside each exported clip, written next to the
+    clip as '<name>.<rendition-name>.<ext>'. width and height are passed to ffmpeg's
+    scale filter (so -2 preserves the aspect ratio), or None to keep the source size.
+    ext must be one of RENDITION_EXTS: every rendition is encoded with libx264 and
+    stream-copies the source audio, so it needs a container that can hold both.
+    """
+    name: str
+    width: int | None
+    height: int | None
+    crf: int
+    preset: str
+    ext: str
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Rendition':
+        """
+        Parses a rendition from a string of the form 'NAME:WxH[:CRF[:PRESET[:EXT]]]',
+        e.g. 'web:-2x720:23:medium:mp4'. Size may be 'source' to skip scaling.
+        """
+        parts = spec.split(':')
+        if len(parts) < 2 or len(parts) > 5 or not re.match(r'^[\w-]+$', parts[0]):
+            raise ValueError('invalid rendition spec: %s' % spec)
+        width, height = None, None
+        if parts[1] != 'source':
+            match = re.match(r'^(-?\d+)x(-?\d+)$', parts[1])
+            if not match:
+                raise ValueError('invalid rendition size in spec: %s' % spec)
+            width, height = int(match.group(1)), int(match.group(2))
+        crf = int(parts[2]) if len(parts) > 2 else 23
+        preset = parts[3] if len(parts) > 3 else 'medium'
+        ext = parts[4] if len(parts) > 4 else 'mp4'
+        if ext not in RENDITION_EXTS:
+            raise ValueError('invalid rendition extension in spec: %s (must be one of %s)' % (spec, ', '.join(RENDITION_EXTS)))
+        return cls(name=parts[0], width=width, height=height, crf=crf, preset=preset, ext=ext)
+
+    @property
+    def spec(self) -> str:
+        size = 'source' if self.width is None else '%dx%d' % (self.width, self.height)
+        return ':'.join([self.name, size, str(self.crf), self.preset, self.ext])
+
+    def get_filepath(self, dst_filepath: str) -> str:
+        return '%s.%s.%s' % (os.path.splitext(dst_filepath)[0], self.name, self.ext)
+
+
+def get_thumbnails_filepath(dst_filepath: str) -> str:
+    return os.path.splitext(dst_filepath)[0] + '.thumbs.png'
+
+
+def trim_with_x264_renditions(src_filepath: str, in_timecode: str, out_timecode: str, outputs: list[tuple[str, Rendition]], thumbnails_filepath: str | None = None, num_thumbnails: int = 0, thumbnail_width: int = 320, threads: int | None = None, on_progress: Callable[[Decimal], None] | None = None):
+    """
+    Exports a clip to several outputs (each a (dst_filepath, rendition) pair) from a
+    single ffmpeg process, which decodes the source range once and splits the decoded
+    video between a separate scaler and libx264 encoder for each output. If
+    thumbnails_filepath is given, a horizontal strip of num_thumbnails evenly-spaced
+    frames, each thumbnail_width pixels wide, is written there as well.
+    """
+    in_point = timecode_to_seconds(in_timecode)
+    out_point = timecode_to_seconds(out_timecode)
+    duration = out_point - in_point
+
+    # Split the decoded video into one copy per output, scaling each copy as needed
+    num_branches = len(outputs) + (1 if thumbnails_filepath else 0)
+    filters = ['[0:v]split=%d%s' % (num_branches, ''.join('[s%d]' % i for i in range(num_branches)))]
+    for i, (_, rendition) in enumerate(outputs):
+        if rendition.width is None:
+            filters.append('[s%d]null[v%d]' % (i, i))
+        else:
+            filters.append('[s%d]scale=%d:%d[v%d]' % (i, rendition.width, rendition.height, i))
+    if thumbnails_filepath:
+        thumbnail_rate = Decimal(num_thumbnails) / duration
+        filters.append('[s%d]fps=%s,scale=%d:-2,tile=%dx1[thumbs]' % (len(outputs), thumbnail_rate, thumbnail_width, num_thumbnails))
+    # Limit the input itself to our clip's range (rather than just the first output),
+    # so that every output, and the audio copied into it, ends at the out point
+    args = [
+        'ffmpeg',
+        '-ss', str(in_point),
+        '-t', str(duration),
+        '-i', src_filepath,
+        '-filter_complex', ';'.join(filters),
+    ]
+
+    # Add an output for each rendition, with the audio stream-copied into each one.
+    # Every rendition encodes every frame at the same time, so they split our threads.
+    encoder_threads = max(1, threads // len(outputs)) if threads is not None else None
+    for i, (dst_filepath, rendition) in enumerate(outputs):
+        args += [
+            '-map', '[v%d]' % i,
+            '-map', '0:a?',
+            '-c:v', 'libx264',
+            '-preset', rendition.preset,
+            '-crf', str(rendition.crf),
+        ]
+        if encoder_threads is not None:
+            args += ['-threads:v', str(encoder_threads)]
+        args += [
+            '-c:a', 'copy',
+            dst_filepath,
+        ]
+    if thumbnails_filepath:
+        args += ['-map', '[thumbs]', '-frames:v', '1', '-update', '1', thumbnails_filepath]
+    run_ffmpeg(args, on_progress)
+
+
+def find_nearest_keyframe_gte(keyframe_times: array, second: Decimal) -> Decimal | None:
+    target_us = int((second * 1000000).to_integral_value(rounding=ROUND_CEILING))
+    i = bisect.bisect_left(keyframe_times, target_us)
+    if i == len(keyframe_times):
+        return None
+    return Decimal(keyframe_times[i]).scaleb(-6)
+
+
+def get_x264_params_matching_source(src_filepath: str) -> list[str] | None:
+    """
+    Returns libx264 options that match the profile, level and pixel format of the
+    H.264 video stream in src_filepath, so that video we encode can be concatenated
+    with video stream-copied from that file. Returns None if the source video isn't
+    H.264.
+    """
+    args = ['ffprobe', '-loglevel', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=codec_name,profile,level,pix_fmt', '-of', 'default=noprint_wrappers=1', os.path.normpath(src_filepath)]
+    output = subprocess.check_output(args, encoding='utf-8')
+    props = dict(line.split('=', 1) for line in output.splitlines() if '=' in line)
+    if props.get('codec_name') != 'h264':
+        return None
+
+    x264_args = []
+    profile = props.get('profile', '').lower()
+    if profile in ('baseline', 'constrained baseline'):
+        x264_args += ['-profile:v', 'baseline']
+    elif profile in ('main', 'high'):
+        x264_args += ['-profile:v', profile]
+    level = props.get('level', '')
+    if level.isdigit() and int(level) > 0:
+        x264_args += ['-level:v', '%d.%d' % (int(level) // 10, int(level) % 10)]
+    if props.get('pix_fmt'):
+        x264_args += ['-pix_fmt', props['pix_fmt']]
+    return x264_args
+
+
+# Number of stream-copied GOPs after the join that we decode to check a smart render
+SPLICE_CHECK_NUM_GOPS = 3
+
+
+def trim_with_smart_render(src_filepath: str, dst_filepath: str, in_timecode: str, out_timecode: str, keyframe_times: array, crf: int, threads: int | None = None, on_progress: Callable[[Decimal], None] | None = None):
+    """
+    Exports a frame-accurate clip while re-encoding as little as possible: only the
+    frames from the exact in point up to the next keyframe are encoded with libx264,
+    and everything from that keyframe to the out point is stream-copied. The two parts
+    are then concatenated (along with stream-copied audio) without re-encoding. If the
+    result doesn't decode cleanly, the whole clip is re-encoded instead.
+    """
+    NTSC_DROP = Decimal('60000') / Decimal('1001')
+    in_point = timecode_to_seconds(in_timecode)
+    out_point = timecode_to_seconds(out_timecode)
+    duration = out_point - in_point
+
+    # If there's no keyframe between our in and out points, there's nothing to copy; and
+    # if the source isn't H.264, we can't make a compatible encode: in either case,
+    # just re-encode the whole clip
+    keyframe_point = find_nearest_keyframe_gte(keyframe_times, in_point)
+    x264_args = get_x264_params_matching_source(src_filepath)
+    if keyframe_point is None or keyframe_point >= out_point or x264_args is None:
+        trim_with_x264_reencode(src_filepath, dst_filepath, in_timecode, out_timecode, crf, threads, on_progress)
+        return
+
+    report_progress = on_progress or (lambda _: None)
+    head_duration = keyframe_point - in_point
+    head_num_frames = round(head_duration * NTSC_DROP)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(dst_filepath)) as tempdir:
+        head_filepath = os.path.join(tempdir, 'head.ts')
+        tail_filepath = os.path.join(tempdir, 'tail.ts')
+        concat_filepath = os.path.join(tempdir, 'concat.txt')
+
+        # Re-encode the partial GOP at the start of the clip, stopping on the frame
+        # before the keyframe: counting frames avoids any rounding at the boundary
+        segment_filepaths = []
+        if head_num_frames > 0:
+            args = ['ffmpeg', '-ss', str(in_point), '-i', src_filepath, '-map', '0:v:0', '-frames:v', str(head_num_frames), '-c:v', 'libx264', '-preset', 'slow', '-crf', str(crf)] + x264_args
+            if threads is not None:
+                args += ['-threads:v', str(threads)]
+            args += [head_filepath]
+            run_ffmpeg(args, report_progress)
+            segment_filepaths.append(head_filepath)
+
+        # Stream-copy from the keyframe to the out point: our keyframe times are rounded
+        # to the microsecond, so seek a hair past the keyframe to ensure that we don't
+        # land on the previous one
+        args = ['ffmpeg', '-ss', str(keyframe_point + Decimal('0.0005')), '-i', src_filepath, '-t', str(out_point - keyframe_point), '-map', '0:v:0', '-c', 'copy', tail_filepath]
+        run_ffmpeg(args, lambda t: report_progress(head_duration + t))
+        segment_filepaths.append(tail_filepath)
+
+        # Concatenate both video segments, and mux in the audio for the full clip. Our
+        # encode of the head can't have the same SPS/PPS as the source's, so the two
+        # segments need different parameter sets: each .ts segment carries its own
+        # in-band (ahead of its first keyframe), and tagging the output as avc3 rather
+        # than avc1 lets decoders use those instead of the single set in the header.
+        with open(concat_filepath, 'w') as fp:
+            for segment_filepath in segment_filepaths:
+                fp.write("file '%s'\n" % segment_filepath.replace('\\', '/').replace("'", "'\\''"))
+        args = [
+            'ffmpeg',
+            '-f', 'concat', '-safe', '0', '-i', concat_filepath,
+            '-ss', str(in_point), '-i', src_filepath,
+            '-t', str(duration),
+            '-map', '0:v:0',
+            '-map', '1:a?',
+            '-c', 'copy',
+            '-tag:v', 'avc3',
+            dst_filepath,
+        ]
+        run_ffmpeg(args, lambda _: None)
+
+    # Make sure that the spliced video has every frame, and that it decodes cleanly
+    # past the join: a bad splice shows up as soon as the decoder reaches the copied
+    # video, so we only need to decode the head and the first few copied GOPs, rather
+    # than the whole clip
+    num_frames = round(duration * NTSC_DROP)
+    i = bisect.bisect_left(keyframe_times, int(keyframe_point * 1000000))
+    check_end_point = out_point
+    if i + SPLICE_CHECK_NUM_GOPS < len(keyframe_times):
+        check_end_point = min(out_point, Decimal(keyframe_times[i + SPLICE_CHECK_NUM_GOPS]).scaleb(-6))
+    try:
+        seam_points = [Decimal(head_num_frames) / NTSC_DROP] if head_num_frames > 0 else []
+        verify_spliced_export(dst_filepath, num_frames, Decimal(num_frames) / NTSC_DROP, decode_until=check_end_point - in_point, seam_points=seam_points)
+    except RuntimeError as e:
+        print('WARNING: Smart render of %s failed verification (%s); re-encoding the whole clip.' % (os.path.basename(dst_filepath), e))
+        os.remove(dst_filepath)
+        trim_with_x264_reencode(src_filepath, dst_filepath, in_timecode, out_timecode, crf, threads, on_progress)
+        return
+    report_progress(duration)
+
+
+# How far either side of each seam in a spliced export we check for continuity
+SEAM_CHECK_SECONDS = Decimal('0.25')
+
+
+def probe_stream_stats(video_filepath: str) -> dict[str, tuple[int, Decimal, Decimal]]:
+    """
+    Counts the packets in the first video and audio streams of video_filepath,
+    returning (num_packets, start_time, duration) for each, keyed by codec type.
+    """
+    stats: dict[str, tuple[int, Decimal, Decimal]] = {}
+    for codec_type in ('v', 'a'):
+        args = ['ffprobe', '-loglevel', 'error', '-count_packets', '-select_streams', '%s:0' % codec_type, '-show_entries', 'stream=codec_type,nb_read_packets,start_time,duration', '-of', 'default=noprint_wrappers=1', os.path.normpath(video_filepath)]
+        output = subprocess.check_output(args, encoding='utf-8')
+        props = dict(line.split('=', 1) for line in output.splitlines() if '=' in line)
+        if props.get('nb_read_packets', 'N/A').isdigit():
+            start_time = Decimal(props['start_time']) if props.get('start_time', 'N/A') != 'N/A' else Decimal(0)
+            duration = Decimal(props['duration']) if props.get('duration', 'N/A') != 'N/A' else Decimal(0)
+            stats[props['codec_type']] = (int(props['nb_read_packets']), start_time, duration)
+    return stats
+
+
+def count_decoded_frames(video_filepath: str, end: Decimal | None = None) -> int:
+    """
+    Decodes the first video stream of video_filepath (in full, or only its first end
+    seconds), returning the number of frames decoded. Raises RuntimeError if the
+    decoder reports any errors along the way.
+    """
+    args = ['ffprobe', '-loglevel', 'error', '-count_frames', '-select_streams', 'v:0', '-show_entries', 'stream=nb_read_frames', '-of', 'default=noprint_wrappers=1:nokey=1']
+    if end is not None:
+        args += ['-read_intervals', '%%+%s' % end]
+    args += [os.path.normpath(video_filepath)]
+    p = subprocess.run(args, capture_output=True, encoding='utf-8')
+    if p.returncode != 0 or p.stderr.strip():
+        raise RuntimeError('failed to decode %s: %s' % (video_filepath, p.stderr.strip() or 'ffprobe returned exit code %d' % p.returncode))
+    output = p.stdout.strip()
+    return int(output) if output.isdigit() else 0
+
+
+def probe_video_packet_times(video_filepath: str, start: Decimal, duration: Decimal) -> list[Decimal]:
+    """
+    Returns the presentation times of the video packets that ffprobe reads from
+    video_filepath when asked for the given range, in presentation order. Reading starts
+    at the keyframe before start, and stops at the first packet (in decode order) past
+    the end of the range, so packets close to the end may be missing.
+    """
+    args = ['ffprobe', '-loglevel', 'error', '-select_streams', 'v:0', '-read_intervals', '%s%%+%s' % (max(Decimal(0), start), duration), '-show_entries', 'packet=pts_time', '-of', 'csv=p=0', os.path.normpath(video_filepath)]
+    output = subprocess.check_output(args, encoding='utf-8')
+    return sorted(Decimal(line.strip().rstrip(',')) for line in output.splitlines() if line.strip() and line.strip() != 'N/A')
+
+
+def verify_seam_continuity(dst_filepath: str, seam_point: Decimal):
+    """
+    Checks that the video frames in dst_filepath on either side of seam_point (a time in
+    the video, where two separately-encoded segments join) are exactly one frame apart,
+    with no frames duplicated or dropped at the join.
+    """
+    NTSC_DROP = Decimal('60000') / Decimal('1001')
+    frame_duration = Decimal(1) / NTSC_DROP
+
+    # Read well past either end of the range we check, so that reordered frames near
+    # the ends of what ffprobe reads can't look like gaps
+    check_start = seam_point - SEAM_CHECK_SECONDS
+    check_end = seam_point + SEAM_CHECK_SECONDS
+    read_margin = Decimal(1)
+    times = [t for t in probe_video_packet_times(dst_filepath, check_start - read_margin, 2 * (SEAM_CHECK_SECONDS + read_margin)) if check_start <= t <= check_end]
+    if not times or times[0] - max(check_start, Decimal(0)) > frame_duration or check_end - times[-1] > frame_duration:
+        raise RuntimeError('spliced export %s is missing frames around its seam at %.6fs' % (dst_filepath, seam_point))
+    for prev_time, packet_time in zip(times, times[1:]):
+        if abs((packet_time - prev_time) - frame_duration) > frame_duration / 2:
+            raise RuntimeError('spliced export %s has a %.6fs gap between frames at %.6fs, near its seam at %.6fs; expected %.6fs' % (dst_filepath, packet_time - prev_time, prev_time, seam_point, frame_duration))
+
+
+def verify_spliced_export(dst_filepath: str, expected_num_frames: int, expected_duration: Decimal, decode_until: Decimal | None = None, seam_points: list[Decimal] | None = None):
+    """
+    Checks that a video assembled from separately-encoded segments has exactly the
+    expected number of frames, the expected duration, and audio that's still in sync
+    with its video. seam_points gives the times (relative to the start of the video)
+    where segments join: at each one, we check that no frames were duplicated or
+    dropped. If decode_until is given, also checks that the first decode_until seconds
+    of video decode cleanly, for segments that weren't all encoded with the same
+    settings.
+    """
+    NTSC_DROP = Decimal('60000') / Decimal('1001')
+    frame_duration = Decimal(1) / NTSC_DROP
+    stats = probe_stream_stats(dst_filepath)
+    if 'video' not in stats:
+        raise RuntimeError('spliced export %s has no video stream' % dst_filepath)
+
+    num_frames, video_start, video_duration = stats['video']
+    if num_frames != expected_num_frames:
+        raise RuntimeError('spliced export %s has %d frames; expected %d' % (dst_filepath, num_frames, expected_num_frames))
+    if abs(video_duration - expected_duration) > frame_duration:
+        raise RuntimeError('spliced export %s has duration %s; expected %s' % (dst_filepath, video_duration, expected_duration))
+    if decode_until is not None:
+        # ffprobe stops reading at the first packet past the end of the interval, so
+        # allow for it to decode a frame less than we'd expect
+        num_decoded_frames = count_decoded_frames(dst_filepath, decode_until)
+        expected_num_decoded_frames = min(expected_num_frames, round(decode_until * NTSC_DROP)) - 1
+        if num_decoded_frames < expected_num_decoded_frames:
+            raise RuntimeError('spliced export %s decodes to %d frames in its first %ss; expected %d' % (dst_filepath, num_decoded_frames, decode_until, expected_num_decoded_frames))
+    for seam_point in seam_points or []:
+        verify_seam_continuity(dst_filepath, video_start + seam_point)
+
+    # Audio is stream-copied from the source just as it is for a serial encode, so it
+    # should start and end within a frame or so of the video
+    if 'audio' in stats:
+        _, audio_start, audio_duration = stats['audio']
+        start_offset = abs(audio_start - video_start)
+        end_offset = abs((audio_start + audio_duration) - (video_start + video_duration))
+        if start_offset > 2 * frame_duration or end_offset > 2 * frame_duration:
+            raise RuntimeError('spliced export %s has audio out of sync with video (start offset %.3fs, end offset %.3fs)' % (dst_filepath, start_offset, end_offset))
+
+
+def trim_with_chunked_x264_reencode(src_filepath: str, dst_filepath: str, in_timecode: str, out_timecode: str, keyframe_times: array, crf: int, num_chunks: int, threads: int | None = None, on_progress: Callable[[Decimal], None] | None = None):
+    """
+    Exports a clip by splitting it into num_chunks chunks at source keyframes, encoding
+    each chunk with identical libx264 settings in its own concurrent ffmpeg process,
+    then concatenating the encoded chunks (along with the stream-copied audio for the
+    whole clip) without re-encoding. threads is the number of threads for each chunk.
+    """
+    NTSC_DROP = Decimal('60000') / Decimal('1001')
+    in_point = timecode_to_seconds(in_timecode)
+    out_point = timecode_to_seconds(out_timecode)
+    duration = out_point - in_point
+    total_num_frames = round(duration * NTSC_DROP)
+
+    # Choose evenly-spaced boundaries, moved back to the nearest keyframe so that each
+    # chunk's ffmpeg process can seek straight there without decoding much, then work
+    # out how many frames belong to each chunk so that no frame is encoded twice
+    boundaries = [in_point]
+    for i in range(1, num_chunks):
+        keyframe_point = find_nearest_keyframe_lte(keyframe_times, in_point + duration * i / num_chunks)
+        if keyframe_point is not None and boundaries[-1] < keyframe_point < out_point:
+            boundaries.append(keyframe_point)
+    boundary_frames = [round((b - in_point) * NTSC_DROP) for b in boundaries] + [total_num_frames]
+    chunk_num_frames = [end - start for start, end in zip(boundary_frames, boundary_frames[1:])]
+
+    report_progress = on_progress or (lambda _: None)
+    progress_lock = threading.Lock()
+    progress_by_chunk = [Decimal(0) for _ in boundaries]
+
+    def report_chunk_progress(chunk_index: int, seconds: Decimal):
+        with progress_lock:
+            progress_by_chunk[chunk_index] = seconds
+            report_progress(sum(progress_by_chunk))
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(dst_filepath)) as tempdir:
+        chunk_filepaths = [os.path.join(tempdir, 'chunk%03d.ts' % i) for i in range(len(boundaries))]
+        concat_filepath = os.path.join(tempdir, 'concat.txt')
+
+        def encode_chunk(chunk_index: int):
+            args = [
+                'ffmpeg',
+                '-ss', str(boundaries[chunk_index]),
+                '-i', src_filepath,
+                '-map', '0:v:0',
+                '-frames:v', str(chunk_num_frames[chunk_index]),
+                '-c:v', 'libx264',
+                '-preset', 'slow',
+                '-crf', str(crf),
+            ]
+            if threads is not None:
+                args += ['-threads:v', str(threads)]
+            args += [chunk_filepaths[chunk_index]]
+            run_ffmpeg(args, lambda seconds: report_chunk_progress(chunk_index, seconds))
+
+        with ThreadPoolExecutor(max_workers=len(boundaries)) as executor:
+            list(executor.map(encode_chunk, range(len(boundaries))))
+
+        # Make sure that each chunk has exactly its share of frames before joining them:
+        # otherwise, a frame duplicated at one seam could hide a frame dropped at another
+        for chunk_index, chunk_filepath in enumerate(chunk_filepaths):
+            num_packets = probe_stream_stats(chunk_filepath).get('video', (0,))[0]
+            if num_packets != chunk_num_frames[chunk_index]:
+                raise RuntimeError('chunk %d of %s has %d frames; expected %d' % (chunk_index, os.path.basename(dst_filepath), num_packets, chunk_num_frames[chunk_index]))
+
+        # Concatenate all chunks, and mux in the audio for the full clip
+        with open(concat_filepath, 'w') as fp:
+            for chunk_filepath in chunk_filepaths:
+                fp.write("file '%s'\n" % chunk_filepath.replace('\\', '/').replace("'", "'\\''"))
+        args = [
+            'ffmpeg',
+            '-f', 'concat', '-safe', '0', '-i', concat_filepath,
+            '-ss', str(in_point), '-i', src_filepath,
+            '-t', str(duration),
+            '-map', '0:v:0',
+            '-map', '1:a?',
+            '-c', 'copy',
+            dst_filepath,
+        ]
+        run_ffmpeg(args, lambda _: None)
+
+    seam_points = [Decimal(frame) / NTSC_DROP for frame in boundary_frames[1:-1]]
+    verify_spliced_export(dst_filepath, total_num_frames, Decimal(total_num_frames) / NTSC_DROP, seam_points=seam_points)
+    report_progress(duration)
+
+
+@dataclass
+class ClipRange:
+    dst_filepath: str
+    in_timecode: str
+    out_timecode: str
+
+
+def trim_multiple_with_x264_reencode(src_filepath: str, clips: list[ClipRange], crf: int, threads: int | None = None, on_progress: Callable[[Decimal], None] | None = None):
+    """
+    Exports several clips from the same source file in a single ffmpeg process, which
+    decodes the source once, from the earliest in point to the latest out point, and
+    feeds every decoded frame to a separate libx264 encoder for each clip. Each output
+    is trimmed to its own in and out points, so clips may overlap.
+    """
+    in_points = [timecode_to_seconds(clip.in_timecode) for clip in clips]
+    out_points = [timecode_to_seconds(clip.out_timecode) for clip in clips]
+    base_point = min(in_points)
+    decode_duration = max(out_points) - base_point
+
+    # Seek once to the earliest in point, stopping at the latest out point, then split
+    # the decoded video into one copy per clip; output timestamps are relative to that
+    # earliest in point
+    split_filter = '[0:v]split=%d%s' % (len(clips), ''.join('[v%d]' % i for i in range(len(clips))))
+    args = [
+        'ffmpeg',
+        '-ss', str(base_point),
+        '-t', str(decode_duration),
+        '-i', src_filepath,
+        '-filter_complex', split_filter,
+    ]
+
+    # Add an output for each clip, using output seeking to trim each copy of the
+    # decoded video (and the stream-copied audio) to that clip's range. Clips from one
+    # source are mostly back-to-back, so usually only one encoder is busy at a time:
+    # rather than splitting our thread budget between them, each gets all of it.
+    for i, (clip, in_point, out_point) in enumerate(zip(clips, in_points, out_points)):
+        args += [
+            '-map', '[v%d]' % i,
+            '-map', '0:a?',
+            '-ss', str(in_point - base_point),
+            '-t', str(out_point - in_point),
+            '-c:v', 'libx264',
+            '-preset', 'slow',
+            '-crf', str(crf),
+        ]
+        if threads is not None:
+            args += ['-threads:v', str(threads)]
+        args += [
+            '-c:a', 'copy',
+            clip.dst_filepath,
+        ]
+
+    # ffmpeg reports progress as the furthest point written to any output, which tracks
+    # how far through the source we've decoded: scale that to the total clip duration
+    total_duration = sum(out_point - in_point for in_point, out_point in zip(in_points, out_points))
+
+    def report_progress(seconds: Decimal):
+        if on_progress:
+            on_progress(total_duration * min(Decimal(1), seconds / decode_duration))
+
+    run_ffmpeg(args, report_progress if on_progress else None)
+
+
+def get_temp_filepath(dst_filepath: str) -> str:
+    """
+    Returns the path that an export to dst_filepath should be written to before it's
+    complete: '<name>.tmp<ext>', keeping the extension so ffmpeg picks the same format.
+    """
+    root, ext = os.path.splitext(dst_filepath)
+    return root + '.tmp' + ext
+
+
+def make_manifest_entry(src_filepath: str, in_timecode: str, out_timecode: str, mode: str, crf: int | None) -> dict:
+    """
+    Returns a manifest entry describing everything that determines the contents of an
+    exported clip: if a later export would produce the same entry, it can be skipped.
+    """
+    stamp = FileStamp.of(src_filepath)
+    return {
+        'src_filepath': src_filepath,
+        'src_size': stamp.size,
+        'src_mtime_ns': stamp.mtime_ns,
+        'in_timecode': in_timecode,
+        'out_timecode': out_timecode,
+        'mode': mode,
+        'crf': crf,
+    }
+
+
+class RenderManifest:
+    """
+    Records how each clip in an output directory was rendered, in a '.manifest.json'
+    file alongside the clips. The file is rewritten (atomically) as soon as each clip
+    is finished, so an interrupted export can pick up where it left off.
+    """
+    def __init__(self, dirpath: str):
+        self.filepath = os.path.join(dirpath, '.manifest.json')
+        self.lock = threading.Lock()
+        self.entries: dict[str, dict] = {}
+        if os.path.isfile(self.filepath):
+            try:
+                with open(self.filepath) as fp:
+                    self.entries = json.load(fp)
+            except (OSError, ValueError) as e:
+                print('WARNING: Ignoring unreadable manifest %s: %s' % (self.filepath, e))
+
+    def is_up_to_date(self, dst_filepath: str, entry: dict) -> bool:
+        with self.lock:
+            return self.entries.get(os.path.basename(dst_filepath)) == entry and os.path.isfile(dst_filepath)
+
+    def record(self, dst_filepath: str, entry: dict):
+        with self.lock:
+            self.entries[os.path.basename(dst_filepath)] = entry
+            tmp_filepath = get_temp_filepath(self.filepath)
+            with open(tmp_filepath, 'w') as fp:
+                json.dump(self.entries, fp, indent=2, sort_keys=True)
+            os.replace(tmp_filepath, self.filepath)
+
+
+def run_export_atomically(run: Callable[[Callable[[Decimal], None]], None], outputs: list[tuple[str, dict]], manifest: RenderManifest, on_progress: Callable[[Decimal], None]):
+    """
+    Runs an export function that writes each of the given outputs (as (dst_filepath,
+    manifest_entry) pairs) to its temp path, then moves each one into place and records
+    it in the manifest. If the export fails, any partially-written files are removed.
+    """
+    try:
+        run(on_progress)
+    except BaseException:
+        for dst_filepath, _ in outputs:
+            tmp_filepath = get_temp_filepath(dst_filepath)
+            if os.path.isfile(tmp_filepath):
+                os.remove(tmp_filepath)
+        raise
+    for dst_filepath, entry in outputs:
+        os.replace(get_temp_filepath(dst_filepath), dst_filepath)
+        manifest.record(dst_filepath, entry)
+
+
+@dataclass
+class ClipExportJob:
+    dst_filename: str
+    duration: Decimal
+    run: Callable[[Callable[[Decimal], None]], None]
+
+
+class ClipExportProgress:
+    """
+    Tracks progress across several concurrent clip exports, printing an aggregate
+    status line (weighted by clip duration) with an estimate of the time remaining.
+    """
+    def __init__(self, jobs: list[ClipExportJob], min_interval: float = 2.0):
+        self.lock = threading.Lock()
+        self.total_seconds = sum(job.duration for job in jobs) or Decimal(1)
+        self.done_seconds_by_job = {job.dst_filename: Decimal(0) for job in jobs}
+        self.num_jobs = len(jobs)
+        self.num_finished = 0
+        self.start_time = time.time()
+        self.min_interval = min_interval
+        self.last_print_time = 0.0
+
+    def update(self, job: ClipExportJob, done_seconds: Decimal):
+        with self.lock:
+            self.done_seconds_by_job[job.dst_filename] = min(done_seconds, job.duration)
+            now = time.time()
+            if now - self.last_print_time >= self.min_interval:
+                self.last_print_time = now
+                self._print()
+
+    def finish(self, job: ClipExportJob, ok: bool):
+        with self.lock:
+            self.done_seconds_by_job[job.dst_filename] = job.duration
+            self.num_finished += 1
+            print('[%d/%d] %s %s' % (self.num_finished, self.num_jobs, 'Exported' if ok else 'FAILED to export', job.dst_filename))
+            self._print()
+
+    def _print(self):
+        done_seconds = sum(self.done_seconds_by_job.values())
+        ratio = float(done_seconds / self.total_seconds)
+        elapsed = time.time() - self.start_time
+        eta = '--:--:--'
+        if ratio > 0.0:
+            remaining = int(elapsed * (1.0 - ratio) / ratio)
+            eta = '%02d:%02d:%02d' % (remaining // 3600, (remaining // 60) % 60, remaining % 60)
+        print('[export] %d/%d clips finished, %.1f%% of footage done (ETA %s)' % (self.num_finished, self.num_jobs, ratio * 100.0, eta))
+
+
+def run_clip_export_jobs(jobs: list[ClipExportJob], num_workers: int) -> dict[str, Exception]:
+    """
+    Runs the given export jobs, up to num_workers at a time, starting with the longest
+    clips so that no long encode is left running on its own at the end. A failed job
+    doesn't stop the others: returns the exception raised by each failed job, keyed by
+    output filename.
+    """
+    progress = ClipExportProgress(jobs)
+    failures: dict[str, Exception] = {}
+
+    def run(job: ClipExportJob):
+        try:
+            job.run(lambda done_seconds: progress.update(job, done_seconds))
+        except Exception as e:
+            failures[job.dst_filename] = e
+            progress.finish(job, False)
+        else:
+            progress.finish(job, True)
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        list(executor.map(run, sorted(jobs, key=lambda job: job.duration, reverse=True)))
+    return failures
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(prog='python trim.py', description='examines the current timeline in DaVinci resolve and exports clips using ffmpeg')
     parser.add_argument('--copy', '-c', action='store_true', help='copy video streams rather than re-encoding (faster and no quality loss, but pads out start of video to nearest keyframe)')
-    parser.add_argument('--crf', '-crf', type=int, default=10, help='CRF for libx264 reencodes, only used when --copy is not passed (lower is higher quality, higher file size)')
+    parser.add_argument('--smart', '-s', action='store_true', help='re-encode only the frames from the in point up to the next keyframe, and copy the rest of the video stream (nearly as fast as --copy, but frame-accurate)')
+    parser.add_argument('--group', '-g', action='store_true', help='when reencoding, export all clips from the same source file in a single ffmpeg process, so that each source is only decoded once')
+    parser.add_argument('--chunks', type=int, default=1, help='when reencoding, split each long clip into this many chunks at keyframes and encode them concurrently')
+    parser.add_argument('--chunk-min-minutes', type=float, default=10.0, help='only split clips into chunks if they are at least this many minutes long')
+    parser.add_argument('--rendition', '-r', dest='renditions', metavar='NAME:WxH[:CRF[:PRESET[:EXT]]]', type=Rendition.parse, action='append', default=[], help='when reencoding, also encode each clip to this rendition (e.g. web:-2x720:23:medium:mp4) from the same decode; may be repeated')
+    parser.add_argument('--thumbnails', type=int, default=0, help='when reencoding, also write a strip of this many evenly-spaced thumbnails for each clip')
+    parser.add_argument('--thumbnail-width', type=int, default=320, help='width of each thumbnail, in pixels')
+    parser.add_argument('--crf', '-crf', type=int, default=10, help='CRF for libx264 reencodes, not used when --copy is passed (lower is higher quality, higher file size)')
+    parser.add_argument('--force', action='store_true', help='export every clip, even if the manifest shows that an identical export already exists')
+    parser.add_argument('--jobs', '-j', type=int, help='number of clips to export concurrently (by default, 4 when copying, or 1 per 4 CPU cores when reencoding)')
     args = parser.parse_args()
+    if args.copy and args.smart:
+        parser.error('--copy and --smart are mutually exclusive')
+    if args.group and (args.copy or args.smart):
+        parser.error('--group is only supported when reencoding')
+    if args.chunks > 1 and (args.copy or args.smart or args.group):
+        parser.error('--chunks is only supported when reencoding, without --group')
+    if (args.renditions or args.thumbnails) and (args.copy or args.smart or args.group or args.chunks > 1):
+        parser.error('--rendition and --thumbnails are only supported when reencoding, without --group or --chunks')
+
+    # Ask our script running in Resolve (via the bridge) for the details of every clip
+    # in the current timeline
+    data = call_resolve('get_vhs_project_data')
 
-    # Establish a temporary working directory so we can communicate between this
-    # process and our script running in Resolve with basic file I/O
-    with tempfile.TemporaryDirectory() as tempdir:
-        # Create an isolated directory, and construct the path to the output file that
-        # we want our Resolve script to write (but don't create the file)
-        random_suffix = binascii.b2a_hex(os.urandom(4)).decode('ascii')
-        dst_dirpath = os.path.join(tempdir, 'resolve_%s' % random_suffix)
-        os.mkdir(dst_dirpath)
-        dst_filepath = os.path.join(dst_dirpath, 'out.json')
-
-        # Kick off execution of our export_vhs_project_to_json script in Resolve
-        gvcr_resolve = os.path.join(os.path.dirname(__file__), 'gvcr_resolve')
-        script = 'export_vhs_project_to_json(resolve, %r)' % dst_filepath
-        resolve_exec(gvcr_resolve, script)
-
-        # Continually check to see whether Resolve has written the file yet
-        print('Waiting for output from Resolve script to be written to: %s' % dst_filepath)
-        timeout = 2.0
-        start = time.time()
-        while True:
-            time.sleep(0.1)
-            if os.path.isfile(dst_filepath):
-                # Once the file exists, wait a beat so ensure it's finished
-                time.sleep(1.0)
-                break
-
-            elapsed = time.time() - start
-            if elapsed > timeout:
-                raise RuntimeError('Timed out waiting for output from Resolve script')
-        
-        # Parse the data from the file before our temp directory is cleaned up
-        with open(dst_filepath) as fp:
-            data = json.load(fp)
-
-    # Run an intial loop to collect the set of input video files
+    # Prepare an output directory, and load the manifest describing any clips that
+    # have already been exported there
     tape_id = data['name']
-    src_filepaths = {clip['src_filepath'] for clip in data['clips']}
+    dst_dirpath = os.path.join(os.path.dirname(__file__), 'storage', tape_id)
+    os.makedirs(dst_dirpath, exist_ok=True)
+    manifest = RenderManifest(dst_dirpath)
+
+    # Skip any clips that were already exported from the same source file, with the
+    # same in and out points and the same settings
+    mode = 'copy' if args.copy else ('smart' if args.smart else 'reencode')
+    crf = None if args.copy else args.crf
+    clips = []
+    outputs_by_dst_filename: dict[str, list[tuple[str, dict]]] = {}
+    for clip in data['clips']:
+        dst_filepath = os.path.join(dst_dirpath, clip['dst_filename'])
+        entry = make_manifest_entry(clip['src_filepath'], clip['in_timecode'], clip['out_timecode'], mode, crf)
+        outputs = [(dst_filepath, entry)]
+        for rendition in args.renditions:
+            outputs.append((rendition.get_filepath(dst_filepath), {**entry, 'rendition': rendition.spec}))
+        if args.thumbnails:
+            outputs.append((get_thumbnails_filepath(dst_filepath), {**entry, 'thumbnails': args.thumbnails, 'thumbnail_width': args.thumbnail_width}))
+        if args.force or not all(manifest.is_up_to_date(p, e) for p, e in outputs):
+            clips.append(clip)
+            outputs_by_dst_filename[clip['dst_filename']] = outputs
+    if len(clips) < len(data['clips']):
+        print('Skipping %d clip(s) that are already up to date (use --force to export them anyway).' % (len(data['clips']) - len(clips)))
+    if not clips:
+        print('All %d clip(s) in %s are up to date.' % (len(data['clips']), dst_dirpath))
+        sys.exit(0)
 
-    # If we're copying video streams without reencoding, analyze each input video file
-    # to determine where all the keyframes are
+    # Collect the set of input video files that we need to read from
+    src_filepaths = {clip['src_filepath'] for clip in clips}
+
+    # If we're copying video streams (or parts of them) without reencoding, or splitting
+    # clips into chunks, analyze each input video file to find where the keyframes are
     keyframe_times_by_src_filepath = {}
-    if args.copy:
+    if args.copy or args.smart or args.chunks > 1:
         for src_filepath in sorted(src_filepaths):
-            print('Finding keyframe times in %s...' % os.path.basename(src_filepath))
             keyframe_times_by_src_filepath[src_filepath] = get_keyframe_times(src_filepath)
 
-    # Prepare an output directory
-    dst_dirpath = os.path.join(os.path.dirname(__file__), 'storage', tape_id)
-    os.makedirs(dst_dirpath, exist_ok=True)
+    # Decide how many clips to export at once: stream copies are mostly I/O-bound, but
+    # each libx264 encode can make good use of several cores, so we split the available
+    # cores evenly between the concurrent encodes. When grouping, there's one job per
+    # source file, so there's no point in having more workers than that.
+    num_cpus = os.cpu_count() or 1
+    num_workers = args.jobs or (4 if args.copy else max(1, num_cpus // 4))
+    if args.group:
+        num_workers = max(1, min(num_workers, len(src_filepaths)))
+    x264_threads = max(1, num_cpus // num_workers)
 
-    # Iterate over each clip from our Resolve timeline, and export a separate video for
-    # each clip
-    for clip in data['clips']:
-        src_filepath = clip['src_filepath']
-        dst_filename = clip['dst_filename']
-        in_timecode = clip['in_timecode']
-        out_timecode = clip['out_timecode']
-
-        dst_filepath = os.path.join(dst_dirpath, dst_filename)
-        if args.copy:
-            keyframe_times = keyframe_times_by_src_filepath[src_filepath]
-            trim_without_reencode(src_filepath, dst_filepath, in_timecode, out_timecode, keyframe_times)
-        else:
-            trim_with_x264_reencode(src_filepath, dst_filepath, in_timecode, out_timecode, args.crf)
+    # Prepare a job to export a separate video for each clip from our Resolve timeline,
+    # or, if grouping, a single job to export all the clips from each source file. Each
+    # job writes to temporary files, which are only moved into place once complete.
+    jobs: list[ClipExportJob] = []
+    if args.group:
+        for src_filepath in sorted(src_filepaths):
+            src_clips = [c for c in clips if c['src_filepath'] == src_filepath]
+            dst_filepaths = [os.path.join(dst_dirpath, c['dst_filename']) for c in src_clips]
+            clip_ranges = [ClipRange(get_temp_filepath(p), c['in_timecode'], c['out_timecode']) for p, c in zip(dst_filepaths, src_clips)]
+            outputs = [o for c in src_clips for o in outputs_by_dst_filename[c['dst_filename']]]
+            duration = sum(timecode_to_seconds(c.out_timecode) - timecode_to_seconds(c.in_timecode) for c in clip_ranges)
+            label = '%d clip(s) from %s' % (len(src_clips), os.path.basename(src_filepath))
+            run = functools.partial(trim_multiple_with_x264_reencode, src_filepath, clip_ranges, args.crf, x264_threads)
+            run = functools.partial(run_export_atomically, run, outputs, manifest)
+            jobs.append(ClipExportJob(dst_filename=label, duration=duration, run=run))
+    else:
+        for clip in clips:
+            src_filepath = clip['src_filepath']
+            dst_filename = clip['dst_filename']
+            in_timecode = clip['in_timecode']
+            out_timecode = clip['out_timecode']
+
+            dst_filepath = os.path.join(dst_dirpath, dst_filename)
+            tmp_filepath = get_temp_filepath(dst_filepath)
+            duration = timecode_to_seconds(out_timecode) - timecode_to_seconds(in_timecode)
+            if args.copy:
+                keyframe_times = keyframe_times_by_src_filepath[src_filepath]
+                run = functools.partial(trim_without_reencode, src_filepath, tmp_filepath, in_timecode, out_timecode, keyframe_times)
+            elif args.smart:
+                keyframe_times = keyframe_times_by_src_filepath[src_filepath]
+                run = functools.partial(trim_with_smart_render, src_filepath, tmp_filepath, in_timecode, out_timecode, keyframe_times, args.crf, x264_threads)
+            elif args.chunks > 1 and duration >= Decimal(args.chunk_min_minutes * 60):
+                # Each chunk gets an even share of all cores, since chunked encodes tend
+                # to be the long pole that's still running after shorter clips finish
+                keyframe_times = keyframe_times_by_src_filepath[src_filepath]
+                chunk_threads = max(1, num_cpus // args.chunks)
+                run = functools.partial(trim_with_chunked_x264_reencode, src_filepath, tmp_filepath, in_timecode, out_timecode, keyframe_times, args.crf, args.chunks, chunk_threads)
+            elif args.renditions or args.thumbnails:
+                # Encode the archive copy and every other rendition from a single decode,
+                # giving each output its own temp path
+                archive = Rendition(name='', width=None, height=None, crf=args.crf, preset='slow', ext=os.path.splitext(dst_filename)[1][1:])
+                rendition_outputs = [(tmp_filepath, archive)] + [(get_temp_filepath(r.get_filepath(dst_filepath)), r) for r in args.renditions]
+                thumbnails_filepath = get_temp_filepath(get_thumbnails_filepath(dst_filepath)) if args.thumbnails else None
+                run = functools.partial(trim_with_x264_renditions, src_filepath, in_timecode, out_timecode, rendition_outputs, thumbnails_filepath, args.thumbnails, args.thumbnail_width, x264_threads)
+            else:
+                run = functools.partial(trim_with_x264_reencode, src_filepath, tmp_filepath, in_timecode, out_timecode, args.crf, x264_threads)
+            run = functools.partial(run_export_atomically, run, outputs_by_dst_filename[dst_filename], manifest)
+            jobs.append(ClipExportJob(dst_filename=dst_filename, duration=duration, run=run))
+
+    # Run all our jobs, then report on any that failed
+    print('Running %d export job(s), %d at a time...' % (len(jobs), num_workers))
+    failures = run_clip_export_jobs(jobs, num_workers)
+    for dst_filename, e in failures.items():
+        print('ERROR: Failed to export %s: %s' % (dst_filename, e))
+        if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+            print(e.stderr.rstrip())
+    if failures:
+        print('%d of %d export job(s) failed.' % (len(failures), len(jobs)))
+        sys.exit(1)
+    print('Exported %d clip(s) to %s.' % (len(clips), dst_dirpath))
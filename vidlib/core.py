@@ -0,0 +1,39 @@
+import os
+import glob
+from decimal import Decimal
+from dataclasses import dataclass
+
+# Our captured VHS footage is 59.94 fps
+NTSC_DROP = Decimal('60000') / Decimal('1001')
+
+
+@dataclass
+class FileStamp:
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def of(cls, filepath: str) -> 'FileStamp':
+        st = os.stat(filepath)
+        return cls(size=st.st_size, mtime_ns=st.st_mtime_ns)
+
+
+def find_sidecar_paths(filepath: str) -> list[str]:
+    """
+    Returns the paths of any sidecar files we've written alongside filepath (e.g. cached
+    analysis results), which are named '<filename>.<suffix>'.
+    """
+    return sorted(glob.glob(glob.escape(filepath) + '.*'))
+
+
+def move_with_sidecars(src_filepath: str, dst_filepath: str):
+    """
+    Renames src_filepath to dst_filepath, carrying along any sidecar files so that
+    they're still associated with the file at its new path. Renaming doesn't change
+    the file's size or mtime, so sidecars remain valid.
+    """
+    sidecar_paths = find_sidecar_paths(src_filepath)
+    os.rename(src_filepath, dst_filepath)
+    for sidecar_path in sidecar_paths:
+        suffix = sidecar_path[len(src_filepath):]
+        os.rename(sidecar_path, dst_filepath + suffix)
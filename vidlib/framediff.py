@@ -0,0 +1,197 @@
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Callable, Iterator
+
+import numpy as np
+
+from .core import NTSC_DROP
+
+# Default size that frames are downscaled to before scoring: a quarter of the width
+# and height of our 1440x1080 captures is plenty to spot full-frame scene changes
+DEFAULT_WIDTH = 360
+DEFAULT_HEIGHT = 270
+DEFAULT_BATCH_SIZE = 256
+
+# Converts a mean absolute difference between 8-bit pixels to a percentage, as ffmpeg's
+# select filter does (mafd = sad * 100 / count / (1 << depth)) before scoring
+MAFD_SCALE = 100.0 / 256.0
+
+# Native size of our VHS captures, used when we want to score frames at full resolution
+CAPTURE_WIDTH = 1440
+CAPTURE_HEIGHT = 1080
+
+# Defaults for fast detection: candidates are found by scoring every other frame at
+# a tiny size, then refined by re-scoring a few frames around each one at full size
+FAST_WIDTH = 160
+FAST_HEIGHT = 120
+FAST_DECIMATE = 2
+FAST_CANDIDATE_RATIO = 0.5
+
+
+def read_gray_frames(video_filepath: str, width: int, height: int, batch_size: int = DEFAULT_BATCH_SIZE, start: Decimal | None = None, num_frames: int | None = None, extra_filters: str = '', input_options: list[str] | None = None) -> Iterator[np.ndarray]:
+    """
+    Decodes video_filepath with ffmpeg, downscaled to width x height and converted to
+    8-bit grayscale, and yields those frames in batches, each an array with shape
+    (n, height, width) where n <= batch_size. If start is given, decoding begins at that
+    time; if num_frames is given, only that many frames will be decoded. extra_filters
+    may be used to prepend additional ffmpeg video filters (e.g. to drop frames), and
+    input_options are passed to ffmpeg ahead of the input file.
+
+    The yielded array is reused for the next batch, so callers must copy any frames
+    they want to keep.
+    """
+    args = ['ffmpeg', '-loglevel', 'error', '-nostdin']
+    if start is not None:
+        args += ['-ss', str(start)]
+    args += input_options or []
+    args += ['-i', os.path.normpath(video_filepath), '-map', '0:v:0']
+    if num_frames is not None:
+        args += ['-frames:v', str(num_frames)]
+    video_filter = 'scale=%d:%d:flags=area,format=gray' % (width, height)
+    if extra_filters:
+        video_filter = extra_filters + ',' + video_filter
+    # Pass frames through as-is, so ffmpeg doesn't duplicate or drop any frames to
+    # maintain a constant output framerate: frame numbers must follow decode order
+    args += ['-filter:v', video_filter, '-fps_mode', 'passthrough', '-f', 'rawvideo', '-pix_fmt', 'gray', '-']
+
+    # Read raw frames from ffmpeg's stdout directly into a preallocated buffer
+    frame_size = width * height
+    buf = np.empty((batch_size, height, width), np.uint8)
+    view = memoryview(buf).cast('B')
+    p = subprocess.Popen(args, stdout=subprocess.PIPE)
+    try:
+        while True:
+            num_bytes = 0
+            while num_bytes < len(view):
+                n = p.stdout.readinto(view[num_bytes:])
+                if not n:
+                    break
+                num_bytes += n
+            num_frames_read = num_bytes // frame_size
+            if num_frames_read > 0:
+                yield buf[:num_frames_read]
+            if num_bytes < len(view):
+                break
+    finally:
+        p.stdout.close()
+        exitcode = p.wait()
+    if exitcode != 0:
+        raise RuntimeError("frame decode failed: ffmpeg returned exit code %d" % exitcode)
+
+
+class FrameDiffScorer:
+    """
+    Computes a scene change score for each frame in a sequence of grayscale frames,
+    using the same formula as ffmpeg's select filter: the mean absolute difference
+    from the previous frame (MAFD) as a percentage of the full 8-bit range, reduced by
+    how much that differs from the previous frame's MAFD, scaled to 0..1. Frames are fed in batches, and the scorer carries
+    over whatever state is needed to score the first frame of the next batch.
+    """
+    def __init__(self):
+        self.prev_frame: np.ndarray | None = None
+        self.prev_mafd = 0.0
+
+    def score(self, frames: np.ndarray) -> np.ndarray:
+        n = len(frames)
+        if n == 0:
+            return np.empty(0, np.float32)
+
+        # Compute the MAFD of every frame in the batch against its predecessor, with the
+        # first frame compared against the last frame of the previous batch: the very
+        # first frame in the sequence has nothing to compare against, so it's scored 0.
+        # Like ffmpeg, we express MAFD on a scale of 0..100 rather than 0..255.
+        mafd = np.empty(n, np.float64)
+        if n > 1:
+            diffs = np.abs(frames[1:].astype(np.int16) - frames[:-1])
+            mafd[1:] = diffs.reshape(n - 1, -1).mean(axis=1)
+        if self.prev_frame is None:
+            mafd[0] = 0.0
+        else:
+            mafd[0] = np.abs(frames[0].astype(np.int16) - self.prev_frame).mean()
+        mafd *= MAFD_SCALE
+
+        # A cut shows up as a spike in MAFD, whereas motion causes a sustained high
+        # MAFD: take the smaller of MAFD and its change from the previous frame
+        prev_mafd = np.empty(n, np.float64)
+        prev_mafd[0] = self.prev_mafd
+        prev_mafd[1:] = mafd[:-1]
+        scores = np.clip(np.minimum(mafd, np.abs(mafd - prev_mafd)) / 100.0, 0.0, 1.0)
+
+        self.prev_frame = frames[-1].copy()
+        self.prev_mafd = float(mafd[-1])
+        return scores.astype(np.float32)
+
+
+def compute_frame_diff_scores(video_filepath: str, width: int = DEFAULT_WIDTH, height: int = DEFAULT_HEIGHT, batch_size: int = DEFAULT_BATCH_SIZE, start: Decimal | None = None, num_frames: int | None = None, extra_filters: str = '', on_progress: Callable[[int], None] | None = None, input_options: list[str] | None = None) -> np.ndarray:
+    """
+    Decodes video_filepath (or num_frames from start, if given) and returns a float32
+    array containing a scene change score for each decoded frame, indexed by frame
+    number relative to the first decoded frame. on_progress, if given, is called with
+    the number of frames scored so far after each batch.
+    """
+    scorer = FrameDiffScorer()
+    chunks: list[np.ndarray] = []
+    num_scored = 0
+    for frames in read_gray_frames(video_filepath, width, height, batch_size, start, num_frames, extra_filters, input_options):
+        chunks.append(scorer.score(frames))
+        num_scored += len(frames)
+        if on_progress:
+            on_progress(num_scored)
+    if not chunks:
+        return np.empty(0, np.float32)
+    return np.concatenate(chunks)
+
+
+def detect_cut_frames(video_filepath: str, threshold: float, width: int = DEFAULT_WIDTH, height: int = DEFAULT_HEIGHT, batch_size: int = DEFAULT_BATCH_SIZE) -> list[int]:
+    """
+    Returns the frame numbers of every frame in video_filepath whose scene change
+    score is greater than threshold.
+    """
+    scores = compute_frame_diff_scores(video_filepath, width, height, batch_size)
+    return [int(frame) for frame in np.flatnonzero(scores > np.float32(threshold))]
+
+
+def detect_cut_frames_fast(video_filepath: str, threshold: float, decimate: int = FAST_DECIMATE, width: int = FAST_WIDTH, height: int = FAST_HEIGHT, refine_width: int = CAPTURE_WIDTH, refine_height: int = CAPTURE_HEIGHT, candidate_ratio: float = FAST_CANDIDATE_RATIO, jobs: int = 1) -> list[int]:
+    """
+    Returns the frame numbers of every frame in video_filepath whose scene change
+    score is greater than threshold, as detect_cut_frames would when run at
+    refine_width x refine_height, but without scoring every frame at that size.
+
+    We first score only every nth frame (where n is decimate), downscaled to
+    width x height, and treat any of those frames scoring above threshold *
+    candidate_ratio as a candidate cut. Since the cut may lie on any of the frames
+    skipped since the previous sample, we then decode that short span at full rate and
+    at the refined size to find the exact frame(s) whose score exceeds threshold.
+    """
+    assert decimate >= 1
+    extra_filters = "select='not(mod(n,%d))'" % decimate if decimate > 1 else ''
+    coarse_scores = compute_frame_diff_scores(video_filepath, width, height, extra_filters=extra_filters)
+    candidate_indices = np.flatnonzero(coarse_scores > np.float32(threshold * candidate_ratio))
+
+    # A candidate at sample k means the cut lies somewhere in frames (k-1)*n+1 .. k*n
+    spans = [(max(1, (int(k) - 1) * decimate + 1), int(k) * decimate) for k in candidate_indices]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        refined = executor.map(lambda span: _refine_cut_frames(video_filepath, threshold, span[0], span[1], refine_width, refine_height), spans)
+        return sorted(set(frame for frames in refined for frame in frames))
+
+
+def _refine_cut_frames(video_filepath: str, threshold: float, first_frame: int, last_frame: int, width: int, height: int) -> list[int]:
+    # A frame's score depends on its two predecessors, so start decoding two frames
+    # early; we seek to halfway between frames so that the first frame decoded is
+    # exactly the one we want, regardless of rounding in frame timestamps
+    CONTEXT_FRAMES = 2
+    start_frame = max(0, first_frame - CONTEXT_FRAMES)
+    start_seconds = (Decimal(start_frame) - Decimal('0.5')) / NTSC_DROP if start_frame > 0 else None
+    num_frames = last_frame - start_frame + 1
+    scores = compute_frame_diff_scores(video_filepath, width, height, batch_size=num_frames, start=start_seconds, num_frames=num_frames)
+
+    # Only report frames within the candidate span: the frames before it were decoded
+    # just to provide context for scoring the first frame in the span
+    cut_frames: list[int] = []
+    for i, score in enumerate(scores):
+        frame = start_frame + i
+        if first_frame <= frame <= last_frame and score > np.float32(threshold):
+            cut_frames.append(frame)
+    return cut_frames
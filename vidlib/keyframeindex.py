@@ -0,0 +1,95 @@
+import os
+import io
+import sys
+import struct
+import subprocess
+from array import array
+
+from .core import FileStamp
+
+KEYFRAME_INDEX_SUFFIX = '.keyframes'
+KEYFRAME_INDEX_MAGIC = b'GVKF'
+KEYFRAME_INDEX_VERSION = 1
+
+# magic, version, file size, file mtime (ns)
+HEADER_FORMAT = '<4sIQq'
+
+
+def get_keyframe_index_path(video_filepath: str) -> str:
+    return video_filepath + KEYFRAME_INDEX_SUFFIX
+
+
+def read_keyframe_index(video_filepath: str) -> array | None:
+    """
+    Reads the keyframe index stored alongside video_filepath, returning a sorted array
+    of int64 keyframe timestamps in microseconds. Returns None if there's no index, or
+    if it was written for a different version of the video file.
+    """
+    index_filepath = get_keyframe_index_path(video_filepath)
+    if not os.path.isfile(index_filepath):
+        return None
+
+    stamp = FileStamp.of(video_filepath)
+    with open(index_filepath, 'rb') as fp:
+        header = fp.read(struct.calcsize(HEADER_FORMAT))
+        if len(header) != struct.calcsize(HEADER_FORMAT):
+            return None
+        magic, version, size, mtime_ns = struct.unpack(HEADER_FORMAT, header)
+        if magic != KEYFRAME_INDEX_MAGIC or version != KEYFRAME_INDEX_VERSION:
+            return None
+        if size != stamp.size or mtime_ns != stamp.mtime_ns:
+            return None
+
+        keyframe_us = array('q')
+        keyframe_us.frombytes(fp.read())
+    if sys.byteorder != 'little':
+        keyframe_us.byteswap()
+    return keyframe_us
+
+
+def write_keyframe_index(video_filepath: str, keyframe_us: array):
+    """
+    Writes a sorted array of int64 keyframe timestamps (in microseconds) to an index
+    file alongside video_filepath, keyed to the current size and mtime of that file.
+    """
+    assert keyframe_us.typecode == 'q'
+    stamp = FileStamp.of(video_filepath)
+    header = struct.pack(HEADER_FORMAT, KEYFRAME_INDEX_MAGIC, KEYFRAME_INDEX_VERSION, stamp.size, stamp.mtime_ns)
+
+    data = keyframe_us
+    if sys.byteorder != 'little':
+        data = array('q', keyframe_us)
+        data.byteswap()
+
+    index_filepath = get_keyframe_index_path(video_filepath)
+    tmp_filepath = index_filepath + '.tmp'
+    with open(tmp_filepath, 'wb') as fp:
+        fp.write(header)
+        fp.write(data.tobytes())
+    os.replace(tmp_filepath, index_filepath)
+
+
+def probe_keyframe_index(video_filepath: str) -> array:
+    """
+    Runs ffprobe over every video packet in video_filepath, and returns a sorted array
+    of the timestamps of all keyframes, in microseconds.
+    """
+    args = ['ffprobe', '-loglevel', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags', '-of', 'csv=print_section=0', os.path.normpath(video_filepath)]
+    keyframe_us = array('q')
+    p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    for line in io.TextIOWrapper(p.stdout, encoding='utf-8'):
+        # Each line is '<pts_time>,<flags>', e.g. '12.345000,K__': we only care about
+        # keyframes, and we convert to integer microseconds without going via floats
+        pts_time, _, flags = line.partition(',')
+        if not flags.startswith('K'):
+            continue
+        whole, _, frac = pts_time.partition('.')
+        if not whole.isdigit():
+            continue
+        keyframe_us.append(int(whole) * 1000000 + int((frac + '000000')[:6]))
+
+    exitcode = p.wait()
+    if exitcode != 0:
+        raise RuntimeError("getting keyframe times failed: ffprobe returned exit code %d" % exitcode)
+    return array('q', sorted(keyframe_us))
+
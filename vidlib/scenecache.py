@@ -0,0 +1,116 @@
+import os
+import sys
+import struct
+from array import array
+from decimal import Decimal
+
+from .core import NTSC_DROP, FileStamp
+
+SCENE_CACHE_SUFFIX = '.scenes'
+SCENE_PARTIAL_SUFFIX = '.scenes.partial'
+SCENE_CACHE_MAGIC = b'GVSS'
+SCENE_CACHE_VERSION = 1
+
+# magic, version, file size, file mtime (ns), length of params string
+HEADER_FORMAT = '<4sIQqI'
+
+
+def get_scene_cache_path(video_filepath: str) -> str:
+    return video_filepath + SCENE_CACHE_SUFFIX
+
+
+def get_scene_partial_path(video_filepath: str) -> str:
+    """
+    Returns the path of the marker file that exists alongside video_filepath for as long
+    as its scene scores are being computed (i.e. by watch.py), so that other scripts
+    know not to move the file out from under the analysis.
+    """
+    return video_filepath + SCENE_PARTIAL_SUFFIX
+
+
+def is_scene_analysis_in_progress(video_filepath: str) -> bool:
+    return os.path.isfile(get_scene_partial_path(video_filepath))
+
+
+def read_scene_scores(video_filepath: str, params: str) -> array | None:
+    """
+    Reads the per-frame scene scores cached alongside video_filepath, returning an array
+    of float32 values indexed by frame number. Returns None if there's no cache, or if
+    the cache was written for a different version of the video file (i.e. its size or
+    mtime has changed) or with different analysis parameters.
+    """
+    cache_filepath = get_scene_cache_path(video_filepath)
+    if not os.path.isfile(cache_filepath):
+        return None
+
+    stamp = FileStamp.of(video_filepath)
+    with open(cache_filepath, 'rb') as fp:
+        header = fp.read(struct.calcsize(HEADER_FORMAT))
+        if len(header) != struct.calcsize(HEADER_FORMAT):
+            return None
+        magic, version, size, mtime_ns, params_len = struct.unpack(HEADER_FORMAT, header)
+        if magic != SCENE_CACHE_MAGIC or version != SCENE_CACHE_VERSION:
+            return None
+        if size != stamp.size or mtime_ns != stamp.mtime_ns:
+            return None
+        if fp.read(params_len) != params.encode('utf-8'):
+            return None
+
+        scores = array('f')
+        scores.frombytes(fp.read())
+    if sys.byteorder != 'little':
+        scores.byteswap()
+    return scores
+
+
+def write_scene_scores(video_filepath: str, params: str, scores: array):
+    """
+    Writes an array of per-frame float32 scene scores to a cache file alongside
+    video_filepath, keyed to the current size and mtime of that file and to the given
+    analysis parameters.
+    """
+    assert scores.typecode == 'f'
+    stamp = FileStamp.of(video_filepath)
+    params_bytes = params.encode('utf-8')
+    header = struct.pack(HEADER_FORMAT, SCENE_CACHE_MAGIC, SCENE_CACHE_VERSION, stamp.size, stamp.mtime_ns, len(params_bytes))
+
+    data = scores
+    if sys.byteorder != 'little':
+        data = array('f', scores)
+        data.byteswap()
+
+    # Write to a temporary file and then swap it into place, so an interrupted write
+    # can't leave behind a truncated cache that looks valid
+    cache_filepath = get_scene_cache_path(video_filepath)
+    tmp_filepath = cache_filepath + '.tmp'
+    with open(tmp_filepath, 'wb') as fp:
+        fp.write(header)
+        fp.write(params_bytes)
+        fp.write(data.tobytes())
+    os.replace(tmp_filepath, cache_filepath)
+
+
+def build_scene_score_array(frame_scores: list[tuple[Decimal, float]]) -> array:
+    """
+    Converts a list of (seconds, scene_score) pairs into an array of scores indexed by
+    frame number. Frames that weren't scored (which shouldn't happen for a complete
+    analysis) get a score of 0.
+    """
+    scores = array('f')
+    for seconds, score in frame_scores:
+        frame = round(seconds * NTSC_DROP)
+        if frame >= len(scores):
+            scores.extend(array('f', bytes(4 * (frame + 1 - len(scores)))))
+        scores[frame] = score
+    return scores
+
+
+def find_cut_frames(scores: array, threshold: float) -> list[int]:
+    """
+    Returns the frame numbers whose scene score is greater than threshold, matching the
+    results of ffmpeg's select='gt(scene,<threshold>)'.
+    """
+    # Compare at float32 precision, so that a score that's exactly equal to the
+    # threshold isn't considered a cut just because it was rounded up when stored
+    threshold_f32 = array('f', [threshold])[0]
+    return [frame for frame, score in enumerate(scores) if score > threshold_f32]
@@ -0,0 +1,169 @@
+import os
+import time
+import argparse
+import threading
+from array import array
+from decimal import Decimal
+
+from cut import CAPTURE_FILENAME_REGEX
+from edit import SCENE_SCORE_PARAMS_BY_BACKEND, analyze_scene_scores
+from vidlib import NTSC_DROP, FileStamp
+from vidlib.scenecache import SCENE_PARTIAL_SUFFIX, get_scene_cache_path, get_scene_partial_path, read_scene_scores, write_scene_scores, build_scene_score_array
+from vidlib.framediff import compute_frame_diff_scores
+
+CAPTURE_DIRPATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'capture'))
+
+
+# When we resume analyzing a file whose recording stalled, we re-score the last second
+# or so of frames we'd already scored, in case the stall cut off the last frame we read
+RESUME_REWIND_FRAMES = 60
+
+# A frame's score depends on its two predecessors, so the first two frames scored after
+# resuming are only there to provide context for scoring the frames after them
+RESUME_CONTEXT_FRAMES = 2
+
+
+def analyze_growing_file(video_filepath: str, backend: str, idle_timeout: float, start_frame: int = 0) -> array:
+    """
+    Computes per-frame scene scores for a video file that may still be in the process
+    of being written, continuing to read new data as it's appended to the file until
+    no new data has been written for idle_timeout seconds. If start_frame is given,
+    decoding begins at that frame, and the returned scores are indexed from it.
+    """
+    # ffmpeg's file protocol can 'follow' a growing file, retrying reads at the end of
+    # the file rather than treating that as EOF; rw_timeout (in microseconds) sets how
+    # long it'll wait for new data before giving up
+    input_options = ['-follow', '1', '-rw_timeout', str(int(idle_timeout * 1000000))]
+    filename = os.path.basename(video_filepath)
+    last_print_time = 0.0
+
+    # Seek to halfway between frames so that the first frame decoded is exactly the one
+    # we want, regardless of rounding in frame timestamps
+    start = (Decimal(start_frame) - Decimal('0.5')) / NTSC_DROP if start_frame > 0 else None
+
+    def report_progress(num_frames: int, timestamp: str = ''):
+        nonlocal last_print_time
+        now = time.time()
+        if now - last_print_time >= 10.0:
+            last_print_time = now
+            print('[%s%s]: scored %d frames so far' % (filename, ' @ %s' % timestamp if timestamp else '', start_frame + num_frames))
+
+    if backend == 'numpy':
+        scores = compute_frame_diff_scores(video_filepath, start=start, on_progress=report_progress, input_options=input_options)
+        return array('f', scores.astype('<f4').tobytes())
+
+    def report_ffmpeg_progress(filename: str, timestamp: str, progress_pct: Decimal | None, num_frames: int):
+        report_progress(num_frames, timestamp)
+
+    # Frame times are relative to the start of the file, so drop the (unscored) frames
+    # before the one we started at
+    frame_scores = analyze_scene_scores(video_filepath, report_ffmpeg_progress, start=start, input_options=input_options)
+    return build_scene_score_array(frame_scores)[start_frame:]
+
+
+def analyze_and_cache(video_filepath: str, backend: str, idle_timeout: float, settle_time: float):
+    # Mark the file as being analyzed for as long as we're working on it, so cut.py knows
+    # to wait for us before moving it. If analysis fails, log the error and give up:
+    # watch() will try again once this thread has exited.
+    filename = os.path.basename(video_filepath)
+    partial_filepath = get_scene_partial_path(video_filepath)
+    open(partial_filepath, 'wb').close()
+    try:
+        analyze_and_cache_until_settled(video_filepath, backend, idle_timeout, settle_time)
+    except Exception as e:
+        print('ERROR: Failed to analyze %s: %s: %s' % (filename, type(e).__name__, e))
+    finally:
+        remove_partial_marker(partial_filepath)
+
+
+def analyze_and_cache_until_settled(video_filepath: str, backend: str, idle_timeout: float, settle_time: float):
+    filename = os.path.basename(video_filepath)
+    params = SCENE_SCORE_PARAMS_BY_BACKEND[backend]
+    scores = array('f')
+    while True:
+        # If we've already scored part of the file, pick up where we left off, keeping
+        # the scores for our context frames from the last pass, which were scored with
+        # their predecessors
+        if scores:
+            start_frame = max(0, len(scores) - RESUME_REWIND_FRAMES)
+            num_kept = min(len(scores), start_frame + RESUME_CONTEXT_FRAMES)
+            print('Resuming analysis of %s at frame %d...' % (filename, start_frame))
+            new_scores = analyze_growing_file(video_filepath, backend, idle_timeout, start_frame)
+            scores = scores[:num_kept] + new_scores[num_kept - start_frame:]
+        else:
+            print('Analyzing %s as it is recorded...' % filename)
+            scores = analyze_growing_file(video_filepath, backend, idle_timeout)
+
+        # Once ffmpeg stops getting new data, make sure the file has really stopped
+        # changing before we key our cache to its current size and mtime: if recording
+        # just stalled for a while, we go around again to score whatever's been added
+        stamp = FileStamp.of(video_filepath)
+        time.sleep(settle_time)
+        if FileStamp.of(video_filepath) == stamp:
+            write_scene_scores(video_filepath, params, scores)
+            print('Wrote scene scores for %d frames to %s.' % (len(scores), get_scene_cache_path(video_filepath)))
+            return
+        print('%s is still being written; continuing analysis.' % filename)
+
+
+def remove_partial_marker(partial_filepath: str):
+    try:
+        os.remove(partial_filepath)
+    except FileNotFoundError:
+        pass
+
+
+def watch(capture_dirpath: str, backend: str, poll_interval: float, idle_timeout: float, settle_time: float):
+    params = SCENE_SCORE_PARAMS_BY_BACKEND[backend]
+    threads: dict[str, threading.Thread] = {}
+
+    # Any in-progress markers left in the capture directory are from a previous run that
+    # was killed before it could clean up, and would otherwise block cut.py forever
+    for filename in os.listdir(capture_dirpath):
+        if filename.endswith(SCENE_PARTIAL_SUFFIX):
+            remove_partial_marker(os.path.join(capture_dirpath, filename))
+
+    print('Watching %s for new recordings (press Ctrl+C to stop)...' % capture_dirpath)
+    try:
+        while True:
+            for filename in sorted(os.listdir(capture_dirpath)):
+                video_filepath = os.path.join(capture_dirpath, filename)
+                if not CAPTURE_FILENAME_REGEX.match(filename) or video_filepath in threads:
+                    continue
+
+                # Skip any recordings that we've already finished analyzing
+                if read_scene_scores(video_filepath, params) is not None:
+                    continue
+
+                thread = threading.Thread(target=analyze_and_cache, args=(video_filepath, backend, idle_timeout, settle_time), daemon=True)
+                thread.start()
+                threads[video_filepath] = thread
+
+            # Forget about any files that were analyzed and then moved away by cut.py, and
+            # any files whose analysis failed, so that we'll try them again
+            for video_filepath in list(threads):
+                if threads[video_filepath].is_alive():
+                    continue
+                if not os.path.isfile(video_filepath) or read_scene_scores(video_filepath, params) is None:
+                    del threads[video_filepath]
+
+            time.sleep(poll_interval)
+    finally:
+        # Our analysis threads die with the process, so clean up their markers for them
+        for video_filepath, thread in threads.items():
+            if thread.is_alive():
+                remove_partial_marker(get_scene_partial_path(video_filepath))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python watch.py', description='runs cut detection on OBS recordings in capture/ while they are still being recorded, so that edit.py --detect-cuts can use the cached results')
+    parser.add_argument('--backend', '-b', choices=sorted(SCENE_SCORE_PARAMS_BY_BACKEND), default='ffmpeg', help='how to compute scene scores; must match the --backend that will be passed to edit.py')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='how often to check capture/ for new recordings, in seconds')
+    parser.add_argument('--idle-timeout', type=float, default=30.0, help='how long a recording must go without growing before we consider it finished, in seconds')
+    parser.add_argument('--settle-time', type=float, default=5.0, help='how long to confirm that a finished recording has stopped changing before caching results, in seconds')
+    args = parser.parse_args()
+
+    try:
+        watch(CAPTURE_DIRPATH, args.backend, args.poll_interval, args.idle_timeout, args.settle_time)
+    except KeyboardInterrupt:
+        pass